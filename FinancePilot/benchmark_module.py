@@ -0,0 +1,153 @@
+import time
+import argparse
+import threading
+
+import numpy as np
+
+from chat_module import HedgedBackend, OpenAICompatibleBackend, create_chat_backend
+from mock_llm_module import MockLLMServer
+
+BENCHMARK_SYSTEM_PROMPT = "You are Nunno, a friendly AI that teaches trading and investing to beginners."
+BENCHMARK_PROMPTS = [
+    "How do I start investing with $100?",
+    "What is DCA and how do I use it?",
+    "Explain what RSI means in trading",
+    "What's the difference between stocks and crypto?",
+]
+
+
+def run_turn(backend, messages_list):
+    """Stream one reply and time it: time to first token, total latency, tokens (streamed chunks)"""
+    start = time.perf_counter()
+    first = None
+    parts = []
+    for chunk in backend.stream(messages_list):
+        if first is None:
+            first = time.perf_counter()
+        parts.append(chunk)
+    end = time.perf_counter()
+    text = "".join(parts)
+    return {
+        "ttft": (first - start) if first is not None else None,
+        "latency": end - start,
+        "tokens": len(parts),
+        "error": not text or text.startswith("[Error]"),
+        "text": text,
+    }
+
+
+def run_benchmark(backend_factory, sessions=8, turns=5, think_time=0.0):
+    """Run `sessions` concurrent conversations of `turns` turns each.
+
+    `backend_factory` returns a backend per session (each keeps its own HTTP
+    connection, like separate users). Sessions start together and send their
+    next message as soon as the previous reply finished (plus `think_time`).
+    """
+    results = []
+    results_lock = threading.Lock()
+    barrier = threading.Barrier(sessions + 1)
+
+    def session(index):
+        backend = backend_factory()
+        history = [{"role": "system", "content": BENCHMARK_SYSTEM_PROMPT}]
+        barrier.wait()
+        for turn in range(turns):
+            history.append({"role": "user", "content": BENCHMARK_PROMPTS[(index + turn) % len(BENCHMARK_PROMPTS)]})
+            result = run_turn(backend, history)
+            history.append({"role": "assistant", "content": result.pop("text")})
+            with results_lock:
+                results.append(result)
+            if think_time:
+                time.sleep(think_time)
+
+    threads = [threading.Thread(target=session, args=(i,), daemon=True) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return summarize_results(results, time.perf_counter() - start, sessions)
+
+
+def _percentiles_ms(values):
+    if not values:
+        return {"p50": None, "p95": None, "max": None}
+    values = np.asarray(values) * 1000
+    return {"p50": float(np.percentile(values, 50)), "p95": float(np.percentile(values, 95)), "max": float(values.max())}
+
+
+def summarize_results(results, wall_seconds, sessions):
+    ok = [r for r in results if not r["error"]]
+    tokens = sum(r["tokens"] for r in ok)
+    per_turn_rate = [r["tokens"] / (r["latency"] - r["ttft"]) for r in ok if r["latency"] > r["ttft"]]
+    return {
+        "sessions": sessions,
+        "turns": len(results),
+        "errors": len(results) - len(ok),
+        "wall_seconds": wall_seconds,
+        "turns_per_second": len(ok) / wall_seconds if wall_seconds else 0.0,
+        "tokens_per_second": tokens / wall_seconds if wall_seconds else 0.0,
+        "stream_tokens_per_second_p50": float(np.median(per_turn_rate)) if per_turn_rate else None,
+        "ttft_ms": _percentiles_ms([r["ttft"] for r in ok]),
+        "latency_ms": _percentiles_ms([r["latency"] for r in ok]),
+    }
+
+
+def format_report(report):
+    def row(label, stats):
+        if stats["p50"] is None:
+            return f"{label:<14} n/a"
+        return f"{label:<14} p50 {stats['p50']:8.0f}   p95 {stats['p95']:8.0f}   max {stats['max']:8.0f}"
+
+    stream_rate = report["stream_tokens_per_second_p50"]
+    return "\n".join([
+        f"{report['sessions']} concurrent sessions, {report['turns']} turns, {report['errors']} errors "
+        f"in {report['wall_seconds']:.1f}s",
+        row("TTFT ms", report["ttft_ms"]),
+        row("Latency ms", report["latency_ms"]),
+        f"Throughput     {report['turns_per_second']:.2f} turns/s, {report['tokens_per_second']:.0f} tokens/s",
+        f"Stream rate    p50 {stream_rate:.0f} tokens/s per reply" if stream_rate else "Stream rate    n/a",
+    ])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat latency benchmark: TTFT, turn latency and throughput")
+    parser.add_argument("--backend", default="mock", choices=["mock", "openrouter", "openai"])
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds between a reply and the next message")
+    parser.add_argument("--token-rate", type=float, default=50.0, help="Mock backend tokens per second")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Mock backend median time to first token")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--reply-tokens", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--hedge", action="store_true",
+                        help="Mock backend: race a second model after the primary's p95 time to first token")
+    args = parser.parse_args()
+
+    if args.backend == "mock":
+        mock = MockLLMServer(token_rate=args.token_rate, latency_ms=args.latency_ms, latency_sigma=args.latency_sigma,
+                             reply_tokens=args.reply_tokens, error_rate=args.error_rate)
+        url = mock.start()
+        if args.hedge:
+            factory = lambda: HedgedBackend(OpenAICompatibleBackend(url, model="mock"),
+                                            OpenAICompatibleBackend(url, model="mock-hedge"))
+        else:
+            factory = lambda: OpenAICompatibleBackend(url, model="mock")
+    else:
+        factory = lambda: create_chat_backend(args.backend)
+
+    backends = []
+
+    def tracked_factory():
+        backend = factory()
+        backends.append(backend)
+        return backend
+
+    print(format_report(run_benchmark(tracked_factory, args.sessions, args.turns, args.think_time)))
+    hedged = [backend.metrics() for backend in backends if isinstance(backend, HedgedBackend)]
+    if hedged:
+        requests, hedges, wins = (sum(m[k] for m in hedged) for k in ("requests", "hedged", "secondary_wins"))
+        print(f"Hedging        {hedges} of {requests} requests hedged ({hedges / max(requests, 1):.0%}), "
+              f"{wins} won by the secondary")
@@ -401,12 +401,53 @@ class TradingAnalyzer:
         
         return confluences
     
-    def get_comprehensive_analysis(self, symbol="BTCUSDT", interval="15m"):
-        """Get comprehensive trading analysis"""
+    def analyze_sentiment_confluence(self, sentiment):
+        """Turn aggregated news sentiment ({"score", "articles", ...}) into a confluence"""
+        confluences = {'bullish': [], 'bearish': [], 'neutral': []}
+        
+        # Too few stories to say anything about the mood
+        if not sentiment or sentiment['articles'] < 3:
+            return confluences
+        
+        score = sentiment['score']
+        condition = f"News sentiment {score:+.2f} over {sentiment['articles']} stories"
+        if score >= 0.15:
+            confluences['bullish'].append({
+                'indicator': 'News Sentiment',
+                'condition': f"Positive {condition}",
+                'implication': "Headlines are upbeat. Can support buying interest.",
+                'strength': 'Strong' if score >= 0.5 else 'Medium',
+                'timeframe': 'Short-term'
+            })
+        elif score <= -0.15:
+            confluences['bearish'].append({
+                'indicator': 'News Sentiment',
+                'condition': f"Negative {condition}",
+                'implication': "Headlines are gloomy. Can weigh on price.",
+                'strength': 'Strong' if score <= -0.5 else 'Medium',
+                'timeframe': 'Short-term'
+            })
+        else:
+            confluences['neutral'].append({
+                'indicator': 'News Sentiment',
+                'condition': f"Mixed {condition}",
+                'implication': "No clear news bias. Technicals lead.",
+                'strength': 'Weak',
+                'timeframe': 'Short-term'
+            })
+        
+        return confluences
+    
+    def get_comprehensive_analysis(self, symbol="BTCUSDT", interval="15m", news_sentiment=None, df=None):
+        """Get comprehensive trading analysis, optionally counting news sentiment as a confluence.
+        
+        `df` takes candles that already have the indicators added; they are fetched otherwise.
+        """
         try:
             # Fetch data
-            df = self.fetch_binance_ohlcv(symbol, interval)
-            df = self.add_comprehensive_indicators(df)
+            if df is None:
+                df = self.fetch_binance_ohlcv(symbol, interval)
+                df = self.add_comprehensive_indicators(df)
             
             if df.empty:
                 return {"error": "No data available"}
@@ -419,12 +460,13 @@ class TradingAnalyzer:
             trend = self.analyze_trend_confluence(latest)
             volatility = self.analyze_volatility_confluence(latest)
             volume = self.analyze_volume_confluence(latest)
+            sentiment = self.analyze_sentiment_confluence(news_sentiment)
             
             # Combine all confluences
             all_confluences = {
-                'bullish': momentum['bullish'] + trend['bullish'] + volatility['bullish'] + volume['bullish'],
-                'bearish': momentum['bearish'] + trend['bearish'] + volatility['bearish'] + volume['bearish'],
-                'neutral': momentum['neutral'] + trend['neutral'] + volatility['neutral'] + volume['neutral']
+                'bullish': momentum['bullish'] + trend['bullish'] + volatility['bullish'] + volume['bullish'] + sentiment['bullish'],
+                'bearish': momentum['bearish'] + trend['bearish'] + volatility['bearish'] + volume['bearish'] + sentiment['bearish'],
+                'neutral': momentum['neutral'] + trend['neutral'] + volatility['neutral'] + volume['neutral'] + sentiment['neutral']
             }
             
             # Generate overall signal
@@ -443,6 +485,7 @@ class TradingAnalyzer:
             
             return {
                 "symbol": symbol,
+                "interval": interval,
                 "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 "current_price": latest['Close'],
                 "overall_signal": overall_signal,
@@ -470,6 +513,49 @@ class TradingAnalyzer:
         except Exception as e:
             return {"error": f"Analysis failed: {str(e)}"}
 
+    def compact_analysis(self, analysis, verbosity=1):
+        """Token-minimal text form of an analysis for LLM prompts.
+
+        verbosity 0: signal and confluence counts only
+        verbosity 1: plus key levels, indicator snapshot and confluence indicator names
+        verbosity 2: plus strength, timeframe and condition of every confluence
+        """
+        if "error" in analysis:
+            return f"error: {analysis['error']}"
+        
+        counts = analysis['confluence_counts']
+        header = f"{analysis['symbol']}"
+        if analysis.get('interval'):
+            header += f" {analysis['interval']}"
+        lines = [
+            f"{header} @{analysis['timestamp'][:16]} price={analysis['current_price']:.6g} "
+            f"signal={analysis['overall_signal']}/{analysis['signal_strength']} "
+            f"bull={counts['bullish']} bear={counts['bearish']} neutral={counts['neutral']}"
+        ]
+        if verbosity < 1:
+            return lines[0]
+        
+        levels = analysis['key_levels']
+        tech = analysis['technical_snapshot']
+        lines.append(f"S={levels['support']:.6g} P={levels['pivot']:.6g} R={levels['resistance']:.6g}")
+        lines.append(
+            f"RSI={tech['RSI_14']:.1f} MACD={tech['MACD']:.4g} ADX={tech['ADX']:.1f} "
+            f"ATR%={tech['ATR_Percent']:.2f} BB={tech['BB_Position']:.2f}"
+        )
+        
+        for side, mark in (('bullish', '+'), ('bearish', '-'), ('neutral', '~')):
+            confluences = analysis['confluences'][side]
+            if not confluences:
+                continue
+            if verbosity < 2:
+                lines.append(f"{mark} " + ", ".join(conf['indicator'] for conf in confluences))
+            else:
+                lines.extend(
+                    f"{mark} {conf['indicator']}|{conf['strength']}|{conf['timeframe']}|{conf['condition']}"
+                    for conf in confluences
+                )
+        return "\n".join(lines)
+
     def format_confluence_analysis(self, analysis):
         """Format confluence analysis for display"""
         if "error" in analysis:
@@ -0,0 +1,212 @@
+import os
+import sys
+import time
+import functools
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+MB = 1024 * 1024
+# Redis-protocol server shared by all replicas, e.g. redis://cache:6379/0; unset keeps caches in process
+CACHE_URL = os.getenv("NUNNO_CACHE_URL")
+
+# name -> (TTL in seconds, byte budget)
+DEFAULT_NAMESPACES = {
+    "candles": (60, 64 * MB),
+    "indicators": (60, 128 * MB),
+    "analyses": (60, 16 * MB),
+    "tokenomics": (300, 64 * MB),
+    "news": (60, 16 * MB),
+    "llm": (24 * 3600, 32 * MB),
+}
+
+
+def value_size(value):
+    """Approximate memory held by a cached value, in bytes"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(deep=True)))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(value_size(k) + value_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(value_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class TTLCache:
+    """Thread-safe TTL cache evicting least recently used entries beyond a byte budget.
+
+    Concurrent misses on one key compute it once. Values are shared, not copied:
+    callers must not mutate what they get back.
+    """
+
+    def __init__(self, ttl_seconds, max_bytes=64 * MB, name=None):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _lookup(self, key, count=True):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.time():
+                self._drop(key)
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                if count:
+                    self._stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            if count:
+                self._stats["hits"] += 1
+            return True, entry[2]
+
+    def get(self, key, default=None):
+        found, value = self._lookup(key)
+        return value if found else default
+
+    def put(self, key, value, ttl=None):
+        """Store a value; values larger than the whole budget are not cached"""
+        size = value_size(value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.time() + (self.ttl_seconds if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def get_or_compute(self, key, compute, should_cache=None, ttl=None):
+        found, value = self._lookup(key)
+        if found:
+            return value
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            found, value = self._lookup(key, count=False)  # Another thread may have filled it meanwhile
+            if found:
+                return value
+            try:
+                value = compute()
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+            if should_cache is None or should_cache(value):
+                self.put(key, value, ttl)
+            return value
+
+    def invalidate(self, key=None):
+        """Drop one key, or every entry"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            elif key in self._entries:
+                self._drop(key)
+
+    clear = invalidate
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), bytes=self._bytes)
+        lookups = stats["hits"] + stats["misses"]
+        stats.update(max_bytes=self.max_bytes, ttl_seconds=self.ttl_seconds,
+                     hit_rate=stats["hits"] / lookups if lookups else 0.0)
+        return stats
+
+    cache_stats = stats
+
+
+class CacheLayer:
+    """Process-wide named cache namespaces, each with its own TTL and byte budget.
+
+    Shared by every Streamlit session in the process. Given a `remote` client
+    (`remote_cache_module.RespClient`), namespaces live on the Redis-protocol
+    server instead, shared by every replica. Caches with their own
+    lookup logic (the AI response cache) can be attached under a namespace so
+    they are reported and invalidated alongside the rest; they need
+    `cache_stats()` and `clear()`.
+    """
+
+    def __init__(self, namespaces=DEFAULT_NAMESPACES, remote=None):
+        self._lock = threading.Lock()
+        self.remote = remote
+        if remote is None:
+            self._namespaces = {name: TTLCache(ttl, max_bytes, name) for name, (ttl, max_bytes) in namespaces.items()}
+        else:
+            from remote_cache_module import RemoteCache
+            self._namespaces = {name: RemoteCache(remote, name, ttl, max_bytes)
+                                for name, (ttl, max_bytes) in namespaces.items()}
+
+    def namespace(self, name):
+        with self._lock:
+            if name not in self._namespaces:
+                raise KeyError(f"Unknown cache namespace: {name}")
+            return self._namespaces[name]
+
+    def attach(self, name, cache):
+        """Put a cache of another kind under a namespace, replacing what was there"""
+        with self._lock:
+            self._namespaces[name] = cache
+        return cache
+
+    def names(self):
+        with self._lock:
+            return list(self._namespaces)
+
+    def invalidate(self, name=None):
+        """Drop every entry of one namespace, or of all of them"""
+        for cache_name in [name] if name else self.names():
+            self.namespace(cache_name).clear()
+
+    def stats(self):
+        """{namespace: {"hits", "misses", "hit_rate", "entries", "bytes", "max_bytes", "ttl_seconds", ...}}"""
+        return {name: self.namespace(name).cache_stats() for name in self.names()}
+
+    def memoize(self, name, ttl=None):
+        """Decorator caching a function's results in a namespace, keyed by its arguments.
+
+        None results are not cached, so failures that return None are retried.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+                return self.namespace(name).get_or_compute(
+                    key, lambda: func(*args, **kwargs), should_cache=lambda value: value is not None, ttl=ttl
+                )
+            return wrapper
+        return decorator
+
+
+_default_layer = None
+_default_lock = threading.Lock()
+
+
+def get_cache():
+    """Shared process-wide cache layer, on the NUNNO_CACHE_URL server when one is configured"""
+    global _default_layer
+    with _default_lock:
+        if _default_layer is None:
+            remote = None
+            if CACHE_URL:
+                from remote_cache_module import RespClient
+                remote = RespClient(CACHE_URL)
+            _default_layer = CacheLayer(remote=remote)
+        return _default_layer
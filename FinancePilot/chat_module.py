@@ -0,0 +1,573 @@
+import os
+import json
+import time
+import queue
+import socket
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+
+import requests
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+AI_API_KEY = os.getenv("AI_API_KEY", "")
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+DEFAULT_MODEL = "meta-llama/llama-3.2-11b-vision-instruct"
+
+# Backend selection: "openrouter" (default), "openai" (any OpenAI-compatible URL) or "mock" (local stand-in)
+LLM_BACKEND = os.getenv("NUNNO_LLM_BACKEND", "openrouter")
+LLM_URL = os.getenv("NUNNO_LLM_URL", "")
+LLM_MODEL = os.getenv("NUNNO_LLM_MODEL", "")
+LLM_API_KEY = os.getenv("NUNNO_LLM_API_KEY", "")
+# Secondary model raced against a slow primary on the same backend; unset leaves hedging off
+LLM_HEDGE_MODEL = os.getenv("NUNNO_LLM_HEDGE_MODEL", "")
+
+
+class ChatBackend(ABC):
+    """Interface of an LLM backend used by the chat, summarizer and tool layers.
+
+    `complete` returns the whole reply and `stream` yields it in text chunks;
+    both report failures as "[Error] ..." text instead of raising.
+    """
+
+    name = "backend"
+    model = ""
+
+    @abstractmethod
+    def complete(self, messages_list, **options):
+        """Return the whole reply text"""
+
+    @abstractmethod
+    def stream(self, messages_list, cancel_event=None, tools=None, tool_calls=None, **options):
+        """Yield the reply as text chunks"""
+
+
+class CancelToken(threading.Event):
+    """Cancel event that also hangs up the HTTP connections attached to it.
+
+    Backends attach the connection a request is sent on before sending it, so
+    setting the token shuts its socket down whether the request is still
+    waiting for response headers or reading the next chunk: the thread returns
+    at once instead of being held until the read timeout.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+    def attach(self, connection):
+        with self._connections_lock:
+            self._connections.append(connection)
+        if self.is_set():
+            _hang_up(connection)
+
+    def detach(self):
+        """Forget the attached connections, e.g. once a request is done and its connection may be reused"""
+        with self._connections_lock:
+            self._connections = []
+
+    def set(self):
+        super().set()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            _hang_up(connection)
+
+
+def _hang_up(connection):
+    sock = getattr(connection, "sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass  # Already closed
+
+
+_sending = threading.local()  # CancelToken of the request being sent on this thread
+
+
+class _TrackedPoolMixin:
+    def _get_conn(self, timeout=None):
+        connection = super()._get_conn(timeout)
+        token = getattr(_sending, "token", None)
+        if token is not None:
+            token.attach(connection)
+        return connection
+
+
+class _TrackedHTTPConnectionPool(_TrackedPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _TrackedHTTPSConnectionPool(_TrackedPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class CancellableAdapter(requests.adapters.HTTPAdapter):
+    """Transport adapter attaching each request's connection to the CancelToken it is sent with"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TrackedHTTPConnectionPool,
+            "https": _TrackedHTTPSConnectionPool,
+        }
+
+
+class OpenAICompatibleBackend(ChatBackend):
+    """Chat completions over any OpenAI-compatible HTTP endpoint, blocking or streamed token by token"""
+
+    name = "openai"
+
+    def __init__(self, url, api_key="", model="", timeout=(10, 120), extra_headers=None):
+        self.api_key = api_key
+        self.url = url
+        self.model = model
+        self.timeout = timeout  # (connect, read) seconds; read applies between streamed chunks
+        self.extra_headers = extra_headers or {}
+        self.session = requests.Session()
+        adapter = CancellableAdapter()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _headers(self):
+        headers = {"Content-Type": "application/json", **self.extra_headers}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def complete(self, messages_list, cancel_event=None, **options):
+        """Send messages and return the whole reply; `options` go into the request body (e.g. max_tokens).
+
+        With a `cancel_event` the reply is streamed and assembled, so setting the
+        event abandons the request midway (a `CancelToken` also closes its connection).
+        """
+        if cancel_event is not None:
+            chunks = []
+            for chunk in self.stream(messages_list, cancel_event, **options):
+                if chunk.startswith("[Error]"):
+                    return chunk
+                chunks.append(chunk)
+            return "[Error] Request cancelled." if cancel_event.is_set() else "".join(chunks)
+        data = {"model": self.model, "messages": messages_list, **options}
+        try:
+            response = self.session.post(self.url, headers=self._headers(), json=data, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()['choices'][0]['message']['content']
+        except requests.exceptions.RequestException as e:
+            return f"[Error] Failed to get response from AI: {e}"
+        except (KeyError, IndexError):
+            return "[Error] Invalid response from AI service."
+        except Exception as e:
+            return f"[Error] An unexpected error occurred: {e}"
+
+    def stream(self, messages_list, cancel_event=None, tools=None, tool_calls=None, **options):
+        """Yield reply text chunks as they arrive over the SSE stream.
+
+        Stops early (and closes the connection) when `cancel_event` is set or the
+        consumer closes the generator, e.g. when Streamlit interrupts a rerun.
+        Errors are yielded as "[Error] ..." text, like `complete` returns them.
+        With `tools`, any tool calls the model makes are assembled into the
+        `tool_calls` list passed by the caller.
+        """
+        data = {"model": self.model, "messages": messages_list, **options, "stream": True}
+        if tools:
+            data["tools"] = tools
+        response = None
+        token = cancel_event if isinstance(cancel_event, CancelToken) else None
+        try:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            _sending.token = token
+            try:
+                response = self.session.post(self.url, headers=self._headers(), json=data,
+                                             timeout=self.timeout, stream=True)
+            finally:
+                _sending.token = None
+            response.raise_for_status()
+            response.encoding = "utf-8"  # text/event-stream has no charset; requests would guess latin-1
+            for text in _iter_sse_content(response, tool_calls):
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                yield text
+        except requests.exceptions.HTTPError as e:
+            # The body says why (e.g. a model without tool support); the status line alone does not
+            yield f"[Error] Failed to get response from AI: {e}{_error_detail(e.response)}"
+        except requests.exceptions.RequestException as e:
+            yield f"[Error] Failed to get response from AI: {e}"
+        except (KeyError, IndexError, ValueError):
+            yield "[Error] Invalid response from AI service."
+        finally:
+            if token is not None:
+                token.detach()  # The connection may go back to the pool for other requests
+            if response is not None:
+                response.close()
+
+
+class ChatClient(OpenAICompatibleBackend):
+    """OpenRouter chat completions"""
+
+    name = "openrouter"
+
+    def __init__(self, api_key=AI_API_KEY, url=OPENROUTER_URL, model=DEFAULT_MODEL, timeout=(10, 120)):
+        super().__init__(url, api_key, model, timeout, extra_headers={
+            "HTTP-Referer": "https://yourdomain.com",
+            "X-Title": "NuminousNexusAI"
+        })
+
+
+class LatencyTracker:
+    """Rolling latency samples per backend/model, for percentiles over the last `window` requests"""
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def record_failure(self, key):
+        with self._lock:
+            self._failures[key] = self._failures.get(key, 0) + 1
+
+    def count(self, key):
+        with self._lock:
+            return len(self._samples.get(key, ()))
+
+    def percentile(self, key, q):
+        """q-th percentile in seconds, None without samples"""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q / 100 * len(samples)))]
+
+    def stats(self):
+        """{key: {"samples", "p50", "p95", "failures"}} with latencies in seconds"""
+        with self._lock:
+            failures = dict(self._failures)
+            keys = set(self._samples) | set(failures)
+        return {
+            key: {
+                "samples": self.count(key),
+                "p50": self.percentile(key, 50),
+                "p95": self.percentile(key, 95),
+                "failures": failures.get(key, 0),
+            }
+            for key in sorted(keys)
+        }
+
+
+_latency_tracker = None
+_latency_lock = threading.Lock()
+
+
+def get_latency_tracker():
+    """Shared process-wide tracker, so every backend instance learns from all requests"""
+    global _latency_tracker
+    with _latency_lock:
+        if _latency_tracker is None:
+            _latency_tracker = LatencyTracker()
+        return _latency_tracker
+
+
+def _latency_key(backend):
+    return f"{backend.name}:{backend.model}"
+
+
+class HedgedBackend(ChatBackend):
+    """Races a secondary backend against a primary that is slower than usual.
+
+    The primary gets the request alone. If it has not produced its first token
+    after its rolling `hedge_percentile` time to first token (`default_delay`
+    until `min_samples` are known, clamped to `min_delay`..`max_delay`), or it
+    fails, the same request goes to the secondary. Whichever streams text first
+    wins and the other is cancelled, its connection shut down. Every attempt
+    runs on its own thread, so stalled requests never queue up hedges. Only the slowest few percent of requests
+    are sent twice, so the tail is cut without doubling the cost.
+    """
+
+    def __init__(self, primary, secondary, tracker=None, hedge_percentile=95, default_delay=3.0,
+                 min_delay=0.5, max_delay=10.0, min_samples=20):
+        self.primary = primary
+        self.secondary = secondary
+        self.tracker = tracker or get_latency_tracker()
+        self.hedge_percentile = hedge_percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.name = f"hedged-{primary.name}"
+        self.model = primary.model
+        self.requests = 0
+        self.hedged = 0
+        self.secondary_wins = 0
+        self._counter_lock = threading.Lock()
+
+    def hedge_delay(self, suffix=""):
+        """Seconds to wait on the primary before also asking the secondary"""
+        key = _latency_key(self.primary) + suffix
+        if self.tracker.count(key) < self.min_samples:
+            return self.default_delay
+        return min(self.max_delay, max(self.min_delay, self.tracker.percentile(key, self.hedge_percentile)))
+
+    def _count(self, counter):
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def metrics(self):
+        with self._counter_lock:
+            requests, hedged, secondary_wins = self.requests, self.hedged, self.secondary_wins
+        return {
+            "requests": requests,
+            "hedged": hedged,
+            "secondary_wins": secondary_wins,
+            "hedge_rate": hedged / requests if requests else 0.0,
+            "hedge_delay": self.hedge_delay(),
+        }
+
+    def _start_complete(self, backend, replies, messages_list, options):
+        """Run `complete` on `backend` on a worker thread, putting (backend, reply) on `replies`; returns its cancel token"""
+        cancel = CancelToken()
+        key = _latency_key(backend) + "/complete"
+
+        def run():
+            start = time.perf_counter()
+            reply = backend.complete(messages_list, cancel_event=cancel, **options)
+            if cancel.is_set() or not reply.startswith("[Error]"):
+                # A cancelled loser took at least this long, which keeps the percentile honest
+                self.tracker.record(key, time.perf_counter() - start)
+            else:
+                self.tracker.record_failure(key)
+            replies.put((backend, reply))
+
+        threading.Thread(target=run, daemon=True, name="nunno-hedge-complete").start()
+        return cancel
+
+    def complete(self, messages_list, **options):
+        """Whole reply from whichever backend answers first; the loser is cancelled"""
+        self._count("requests")
+        replies = queue.Queue()
+        cancels = [self._start_complete(self.primary, replies, messages_list, options)]
+        errors = {}
+        try:
+            try:
+                backend, reply = replies.get(timeout=self.hedge_delay("/complete"))
+            except queue.Empty:
+                backend, reply = None, None
+            while True:
+                if reply is not None:
+                    if not reply.startswith("[Error]"):
+                        if backend is self.secondary:
+                            self._count("secondary_wins")
+                        return reply
+                    errors[backend] = reply
+                if len(cancels) == 1:
+                    # Slow or failed primary: ask the secondary too
+                    self._count("hedged")
+                    cancels.append(self._start_complete(self.secondary, replies, messages_list, options))
+                elif len(errors) == len(cancels):
+                    return errors[self.primary]  # Both failed; report the primary's error
+                backend, reply = replies.get()
+        finally:
+            for cancel in cancels:
+                cancel.set()
+
+    def _race(self, backend, events, messages_list, tools, options):
+        """Start streaming from `backend` on a worker thread, reporting to the `events` queue"""
+        racer = {"backend": backend, "cancel": CancelToken(), "tool_calls": [], "failed": False, "error": None}
+        key = _latency_key(backend)
+
+        def pump():
+            start = time.perf_counter()
+            first = True
+            try:
+                for chunk in backend.stream(messages_list, racer["cancel"], tools, racer["tool_calls"], **options):
+                    if first:
+                        first = False
+                        if racer["cancel"].is_set():
+                            # Hung up before its first token: it took at least this long
+                            racer["failed"] = True
+                            self.tracker.record(key, time.perf_counter() - start)
+                        elif chunk.startswith("[Error]"):
+                            racer["failed"] = True
+                            racer["error"] = chunk
+                            self.tracker.record_failure(key)
+                        else:
+                            # Losers are timed too, so the primary's percentile stays honest
+                            self.tracker.record(key, time.perf_counter() - start)
+                    events.put((racer, chunk))
+                if first and racer["cancel"].is_set():
+                    self.tracker.record(key, time.perf_counter() - start)  # Cancelled before any chunk; a lower bound
+            finally:
+                events.put((racer, None))
+
+        threading.Thread(target=pump, daemon=True, name="nunno-hedge-stream").start()
+        return racer
+
+    def stream(self, messages_list, cancel_event=None, tools=None, tool_calls=None, **options):
+        """Stream from the first backend to produce text (or finish cleanly, e.g. with only tool calls).
+
+        A cancelled loser's connection is shut down right away.
+        """
+        self._count("requests")
+        events = queue.Queue()
+        racers = [self._race(self.primary, events, messages_list, tools, options)]
+        deadline = time.monotonic() + self.hedge_delay()
+        finished = set()
+        winner = None
+        first_chunk = None
+
+        def hedge():
+            self._count("hedged")
+            racers.append(self._race(self.secondary, events, messages_list, tools, options))
+
+        try:
+            while winner is None:
+                timeout = max(0.0, deadline - time.monotonic()) if len(racers) == 1 else 0.5
+                try:
+                    racer, chunk = events.get(timeout=timeout)
+                except queue.Empty:
+                    if cancel_event is not None and cancel_event.is_set():
+                        return
+                    if len(racers) == 1:
+                        hedge()
+                    continue
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                if chunk is not None:
+                    if not racer["failed"]:
+                        winner, first_chunk = racer, chunk
+                    continue
+                finished.add(id(racer))
+                if not racer["failed"]:
+                    winner = racer  # Finished without text, e.g. a reply that only calls tools
+                elif len(racers) == 1:
+                    hedge()  # Primary failed before the hedge delay: fail over right away
+                elif len(finished) == len(racers):
+                    yield racers[0]["error"]  # Both failed; report the primary's error
+                    return
+
+            for racer in racers:
+                if racer is not winner:
+                    racer["cancel"].set()
+            if winner is not racers[0]:
+                self._count("secondary_wins")
+            if first_chunk is not None:
+                yield first_chunk
+            while id(winner) not in finished:
+                racer, chunk = events.get()
+                if racer is not winner:
+                    continue
+                if chunk is None:
+                    break
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                yield chunk
+            if tool_calls is not None:
+                tool_calls.extend(winner["tool_calls"])
+        finally:
+            for racer in racers:
+                racer["cancel"].set()
+
+
+_mock_server = None
+_mock_lock = threading.Lock()
+
+
+def _mock_url():
+    """Start the process-wide local mock server on first use"""
+    global _mock_server
+    with _mock_lock:
+        if _mock_server is None:
+            from mock_llm_module import MockLLMServer
+            _mock_server = MockLLMServer()
+            _mock_server.start()
+        return _mock_server.url
+
+
+def create_chat_backend(kind=None, api_key=AI_API_KEY, model=None, hedge_model=None):
+    """Backend chosen by `kind` or NUNNO_LLM_BACKEND; the openai backend is set up by NUNNO_LLM_URL/MODEL/API_KEY.
+
+    With a hedge model (argument or NUNNO_LLM_HEDGE_MODEL; off by default) slow
+    requests are also sent to that model on the same backend, see HedgedBackend.
+    """
+    kind = kind or LLM_BACKEND
+    if hedge_model is None:
+        hedge_model = LLM_HEDGE_MODEL
+    primary = _create_backend(kind, api_key, model or LLM_MODEL)
+    if not hedge_model or hedge_model == primary.model:
+        return primary
+    return HedgedBackend(primary, _create_backend(kind, api_key, hedge_model))
+
+
+def _create_backend(kind, api_key, model):
+    if kind == "openrouter":
+        return ChatClient(api_key, model=model or DEFAULT_MODEL)
+    if kind == "openai":
+        if not LLM_URL:
+            raise ValueError("NUNNO_LLM_URL must be set for the openai backend")
+        return OpenAICompatibleBackend(LLM_URL, LLM_API_KEY, model)
+    if kind == "mock":
+        return OpenAICompatibleBackend(_mock_url(), model=model or "mock")
+    raise ValueError(f"Unknown LLM backend {kind!r}")
+
+
+def _error_detail(response):
+    """' (message)' from an error response's body, or ''"""
+    if response is None:
+        return ""
+    try:
+        error = response.json().get("error")
+        message = error.get("message") if isinstance(error, dict) else error
+    except (ValueError, AttributeError):
+        message = response.text[:200]
+    return f" ({message})" if message else ""
+
+
+def _iter_sse_content(response, tool_calls=None):
+    """Extract delta text from an OpenAI-style server-sent event stream.
+
+    Tool call fragments are merged into `tool_calls` (when given) by their index:
+    the first fragment carries the id and name, later ones append to the arguments.
+    """
+    # chunk_size=None hands over bytes as soon as they arrive instead of waiting for a full buffer
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        # Blank lines separate events; lines starting with ':' are keep-alive comments
+        if not line or line.startswith(":") or not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if not payload:
+            continue
+        if payload == "[DONE]":
+            break
+        chunk = json.loads(payload)
+        if "error" in chunk:
+            message = chunk["error"].get("message", "unknown error") if isinstance(chunk["error"], dict) else chunk["error"]
+            yield f"[Error] AI service error: {message}"
+            break
+        if not chunk.get("choices"):
+            continue
+        delta = chunk["choices"][0].get("delta") or {}
+        if tool_calls is not None:
+            for fragment in delta.get("tool_calls") or []:
+                _merge_tool_call(tool_calls, fragment)
+        text = delta.get("content")
+        if text:
+            yield text
+
+
+def _merge_tool_call(tool_calls, fragment):
+    index = fragment.get("index", len(tool_calls))
+    while len(tool_calls) <= index:
+        tool_calls.append({"id": "", "type": "function", "function": {"name": "", "arguments": ""}})
+    call = tool_calls[index]
+    if fragment.get("id"):
+        call["id"] = fragment["id"]
+    function = fragment.get("function") or {}
+    call["function"]["name"] += function.get("name") or ""
+    call["function"]["arguments"] += function.get("arguments") or ""
@@ -0,0 +1,221 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_CONTEXT_TOKENS = int(os.getenv("NUNNO_CONTEXT_TOKENS", "6000"))
+MESSAGE_OVERHEAD_TOKENS = 4  # Role markers and separators the chat template adds per message
+
+SUMMARY_PREFIX = "Summary of the earlier conversation (older messages are no longer shown):\n"
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a beginner investor and Nunno, a finance assistant. "
+    "Merge the new messages into the existing summary. Keep what the user shared about themselves and their goals, "
+    "coins, amounts and timeframes discussed, analysis results and advice already given, and open questions. "
+    "Write at most 150 words in plain sentences. Reply with the summary only."
+)
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+_DOLLAR_PATTERN = re.compile(r"(?<!\\)\$")
+
+
+def count_tokens(text):
+    """Approximate BPE token count without a model tokenizer.
+
+    Words are counted as one token per ~4 characters, digit runs per ~3 digits,
+    and every punctuation mark or emoji as its own token, which tracks Llama/GPT
+    tokenizers closely enough for budgeting.
+    """
+    tokens = 0
+    for piece in _TOKEN_PATTERN.findall(text):
+        if piece[0].isalpha():
+            tokens += (len(piece) + 3) // 4
+        elif piece[0].isdigit():
+            tokens += (len(piece) + 2) // 3
+        else:
+            tokens += 1
+    return tokens
+
+
+@lru_cache(maxsize=4096)
+def render_markdown(content):
+    """Display form of a message, computed once per distinct content for the whole process.
+
+    Dollar signs are escaped so amounts like "$100 to $200" aren't typeset as LaTeX.
+    """
+    return _DOLLAR_PATTERN.sub(r"\\$", content or "")
+
+
+class ContextWindow:
+    """Select the newest messages that fit a token budget, system prompt pinned.
+
+    Token counts are cached by message content. Content strings in the history are
+    reused across reruns and Python caches their hashes, so a turn only pays for
+    counting the messages added since the previous one.
+    """
+
+    def __init__(self, max_tokens=DEFAULT_CONTEXT_TOKENS, max_cached=5000):
+        self.max_tokens = max_tokens
+        self.max_cached = max_cached
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def message_tokens(self, message):
+        content = message.get("content") or ""
+        with self._lock:
+            tokens = self._counts.get(content)
+        if tokens is None:
+            tokens = count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+            with self._lock:
+                if len(self._counts) >= self.max_cached:
+                    self._counts.clear()
+                self._counts[content] = tokens
+        return tokens
+
+    def build(self, history_list, max_tokens=None, return_stats=False):
+        """Return the system message plus as many recent messages as fit the budget"""
+        budget = self.max_tokens if max_tokens is None else max_tokens
+        if not history_list:
+            return ([], {"tokens": 0, "messages": 0, "dropped": 0}) if return_stats else []
+
+        system_message = history_list[0] if history_list[0]["role"] == "system" else None
+        turns = history_list[1:] if system_message else history_list
+
+        used = self.message_tokens(system_message) if system_message else 0
+        kept = []
+        # Walk newest-first and stop at the first message that doesn't fit
+        for message in reversed(turns):
+            tokens = self.message_tokens(message)
+            if used + tokens > budget and kept:
+                break
+            kept.append(message)
+            used += tokens
+            if used > budget:
+                # Even the newest message alone is over budget: keep its tail
+                kept[-1] = _truncate_to_budget(message, tokens - (used - budget))
+                used = budget
+                break
+        kept.reverse()
+
+        final_history = [system_message] + kept if system_message else kept
+        if return_stats:
+            return final_history, {"tokens": used, "messages": len(kept), "dropped": len(turns) - len(kept)}
+        return final_history
+
+
+def _truncate_to_budget(message, tokens_allowed):
+    """Keep roughly the last `tokens_allowed` tokens of a message"""
+    content = message.get("content") or ""
+    keep_chars = max(0, (tokens_allowed - MESSAGE_OVERHEAD_TOKENS) * 4)
+    return {**message, "content": "…" + content[-keep_chars:] if keep_chars else ""}
+
+
+class ConversationSummarizer:
+    """Folds messages that fall out of the context window into a running summary.
+
+    Summaries are produced on a background thread after a reply has been shown,
+    so they never add latency to the user's turn. State is kept per conversation
+    id: the summary text and how many turns it already covers. With a `store`
+    (ConversationStore) summaries survive restarts, and turns that are no longer
+    in the caller's in-memory window are read back from it.
+    """
+
+    def __init__(self, client, window, max_conversations=1000, max_workers=2, min_new_turns=2,
+                 max_input_chars=12000, store=None):
+        self.client = client
+        self.window = window
+        self.store = store
+        self.max_conversations = max_conversations
+        self.min_new_turns = min_new_turns  # Batch evictions instead of summarising every turn
+        self.max_input_chars = max_input_chars
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nunno-summary")
+
+    def _state(self, conversation_id):
+        state = self._states.get(conversation_id)
+        if state is None:
+            summary, covered = self.store.summary(conversation_id) if self.store else ("", 0)
+            state = {"summary": summary, "covered": covered, "running": False}
+            self._states[conversation_id] = state
+            while len(self._states) > self.max_conversations:
+                self._states.popitem(last=False)
+        self._states.move_to_end(conversation_id)
+        return state
+
+    def summary_message(self, conversation_id):
+        with self._lock:
+            summary = self._state(conversation_id)["summary"]
+        return {"role": "system", "content": SUMMARY_PREFIX + summary} if summary else None
+
+    def _fit(self, conversation_id, history_list, max_tokens=None):
+        summary = self.summary_message(conversation_id)
+        budget = self.window.max_tokens if max_tokens is None else max_tokens
+        if summary:
+            budget -= self.window.message_tokens(summary)
+        messages, stats = self.window.build(history_list, budget, return_stats=True)
+        return summary, messages, stats
+
+    def build_context(self, conversation_id, history_list, max_tokens=None):
+        """Context window with the running summary placed right after the system prompt"""
+        summary, messages, _ = self._fit(conversation_id, history_list, max_tokens)
+        if not summary:
+            return messages
+        if messages and messages[0]["role"] == "system":
+            return [messages[0], summary] + messages[1:]
+        return [summary] + messages
+
+    def schedule(self, conversation_id, history_list, offset=0):
+        """Summarise newly evicted turns in the background; returns the Future or None.
+
+        `offset` is the number of turns that precede `history_list` (after its
+        system prompt) but are no longer held in memory; they count as evicted.
+        """
+        _, _, stats = self._fit(conversation_id, history_list)
+        turns = history_list[1:] if history_list and history_list[0]["role"] == "system" else history_list
+        evicted = offset + stats["dropped"]
+
+        with self._lock:
+            state = self._state(conversation_id)
+            if state["covered"] > offset + len(turns):
+                # History was cleared or replaced under the same id: start over
+                state.update(summary="", covered=0)
+            if state["running"] or evicted - state["covered"] < self.min_new_turns:
+                return None
+            state["running"] = True
+            previous = state["summary"]
+            start = state["covered"]
+
+        if start >= offset:
+            new_turns = turns[start - offset:evicted - offset]
+        elif self.store is not None:
+            new_turns = None  # Read from the store on the worker thread
+        else:
+            new_turns = turns[:evicted - offset]  # Older turns are gone; summarise what is left
+        return self._executor.submit(self._summarize, conversation_id, previous, new_turns, start, evicted)
+
+    def _summarize(self, conversation_id, previous, new_turns, start, covered):
+        try:
+            if new_turns is None:
+                new_turns = self.store.messages(conversation_id, start, covered)
+            transcript = "\n".join(f"{m['role']}: {m.get('content') or ''}" for m in new_turns)
+            transcript = transcript[-self.max_input_chars:]
+            messages = [
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": f"Existing summary:\n{previous or '(none)'}\n\nNew messages:\n{transcript}"},
+            ]
+            summary = self.client.complete(messages, max_tokens=300)
+            if summary and not summary.startswith("[Error]"):
+                with self._lock:
+                    self._state(conversation_id).update(summary=summary.strip(), covered=covered)
+                if self.store is not None:
+                    self.store.save_summary(conversation_id, summary.strip(), covered)
+        finally:
+            with self._lock:
+                if conversation_id in self._states:
+                    self._states[conversation_id]["running"] = False
+
+    def forget(self, conversation_id):
+        with self._lock:
+            self._states.pop(conversation_id, None)
@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import zlib
+import logging
+import sqlite3
+import threading
+
+from price_history_module import DATA_DIR
+
+CONVERSATION_DB_PATH = os.path.join(DATA_DIR, "conversations.db")
+COLD_AFTER_SECONDS = 7 * 24 * 3600
+ARCHIVE_CHUNK_MESSAGES = 200
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    archived_until INTEGER NOT NULL DEFAULT 0,
+    summary TEXT NOT NULL DEFAULT '',
+    summary_covered INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS conversations_updated ON conversations (updated);
+CREATE TABLE IF NOT EXISTS messages (
+    conversation_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (conversation_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS archives (
+    conversation_id TEXT NOT NULL,
+    first_seq INTEGER NOT NULL,
+    end_seq INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (conversation_id, first_seq)
+) WITHOUT ROWID;
+"""
+
+
+class ConversationStore:
+    """Chat history in SQLite: append-only message rows, read back in windows.
+
+    Messages are numbered per conversation (`seq`, from 0, system prompt excluded)
+    so callers can keep only a recent window in memory and page older messages
+    on demand. Cold conversations are compacted: their older messages move into
+    zlib-compressed archive chunks that `messages` transparently reads back.
+    """
+
+    def __init__(self, path=CONVERSATION_DB_PATH, cold_after_seconds=COLD_AFTER_SECONDS):
+        self.path = path
+        self.cold_after_seconds = cold_after_seconds
+        self._local = threading.local()  # One connection per thread; Streamlit runs sessions on many
+        self._last_compaction = 0.0
+        self._compaction_lock = threading.Lock()  # One compaction at a time per process
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def exists(self, conversation_id):
+        row = self._connection().execute(
+            "SELECT 1 FROM conversations WHERE id = ?", (conversation_id,)
+        ).fetchone()
+        return row is not None
+
+    def count(self, conversation_id):
+        row = self._connection().execute(
+            "SELECT message_count FROM conversations WHERE id = ?", (conversation_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def append(self, conversation_id, role, content):
+        """Store one message, creating the conversation on first use; returns its seq"""
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR IGNORE INTO conversations (id, created, updated) VALUES (?, ?, ?)",
+                (conversation_id, now, now),
+            )
+            seq = conn.execute(
+                "SELECT message_count FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO messages (conversation_id, seq, role, content, created) VALUES (?, ?, ?, ?, ?)",
+                (conversation_id, seq, role, content or "", now),
+            )
+            conn.execute(
+                "UPDATE conversations SET message_count = ?, updated = ? WHERE id = ?",
+                (seq + 1, now, conversation_id),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return seq
+
+    def messages(self, conversation_id, start=0, end=None):
+        """Messages with start <= seq < end as [{"role", "content"}], oldest first"""
+        conn = self._connection()
+        if end is None:
+            end = self.count(conversation_id)
+        start = max(0, start)
+        if start >= end:
+            return []
+
+        found = {}
+        archives = conn.execute(
+            "SELECT first_seq, data FROM archives WHERE conversation_id = ? AND first_seq < ? AND end_seq > ? "
+            "ORDER BY first_seq",
+            (conversation_id, end, start),
+        ).fetchall()
+        for first_seq, data in archives:
+            for offset, (role, content) in enumerate(json.loads(zlib.decompress(data))):
+                seq = first_seq + offset
+                if start <= seq < end:
+                    found[seq] = {"role": role, "content": content}
+        rows = conn.execute(
+            "SELECT seq, role, content FROM messages WHERE conversation_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+            (conversation_id, start, end),
+        ).fetchall()
+        for seq, role, content in rows:
+            found[seq] = {"role": role, "content": content}
+        return [found[seq] for seq in sorted(found)]
+
+    def recent(self, conversation_id, limit):
+        """(seq of the first returned message, the last `limit` messages)"""
+        total = self.count(conversation_id)
+        start = max(0, total - limit)
+        return start, self.messages(conversation_id, start, total)
+
+    def page(self, conversation_id, before, limit):
+        """(seq of the first returned message, up to `limit` messages before seq `before`)"""
+        start = max(0, before - limit)
+        return start, self.messages(conversation_id, start, before)
+
+    def summary(self, conversation_id):
+        """(running summary, number of messages it covers)"""
+        row = self._connection().execute(
+            "SELECT summary, summary_covered FROM conversations WHERE id = ?", (conversation_id,)
+        ).fetchone()
+        return (row[0], row[1]) if row else ("", 0)
+
+    def save_summary(self, conversation_id, summary, covered):
+        """Store the running summary; returns False (and stores nothing) if the conversation was deleted meanwhile"""
+        cursor = self._connection().execute(
+            "UPDATE conversations SET summary = ?, summary_covered = ? WHERE id = ?",
+            (summary, covered, conversation_id),
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, conversation_id):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table, column in (("messages", "conversation_id"), ("archives", "conversation_id"),
+                                  ("conversations", "id")):
+                conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (conversation_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def compact(self, keep_recent=50, chunk_messages=ARCHIVE_CHUNK_MESSAGES, now=None):
+        """Archive all but the last `keep_recent` messages of conversations idle for
+        `cold_after_seconds`. Returns the number of messages archived."""
+        now = time.time() if now is None else now
+        conn = self._connection()
+        cold = conn.execute(
+            "SELECT id, archived_until, message_count FROM conversations "
+            "WHERE updated < ? AND message_count - archived_until > ?",
+            (now - self.cold_after_seconds, keep_recent),
+        ).fetchall()
+
+        archived = 0
+        for conversation_id, _, _ in cold:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Re-read under the write lock: another process may have archived this range, or
+                # deleted the conversation, meanwhile
+                row = conn.execute(
+                    "SELECT archived_until, message_count FROM conversations WHERE id = ?", (conversation_id,)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    continue
+                archived_until, message_count = row
+                end = message_count - keep_recent
+                if end <= archived_until:
+                    conn.execute("COMMIT")
+                    continue
+                for first_seq in range(archived_until, end, chunk_messages):
+                    end_seq = min(first_seq + chunk_messages, end)
+                    rows = conn.execute(
+                        "SELECT role, content FROM messages WHERE conversation_id = ? AND seq >= ? AND seq < ? "
+                        "ORDER BY seq",
+                        (conversation_id, first_seq, end_seq),
+                    ).fetchall()
+                    data = zlib.compress(json.dumps(rows, separators=(",", ":")).encode(), 9)
+                    conn.execute(
+                        "INSERT OR IGNORE INTO archives (conversation_id, first_seq, end_seq, data) "
+                        "SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM conversations WHERE id = ?)",
+                        (conversation_id, first_seq, end_seq, data, conversation_id),
+                    )
+                    conn.execute(
+                        "DELETE FROM messages WHERE conversation_id = ? AND seq >= ? AND seq < ?",
+                        (conversation_id, first_seq, end_seq),
+                    )
+                    archived += len(rows)
+                conn.execute("UPDATE conversations SET archived_until = ? WHERE id = ?", (end, conversation_id))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self._last_compaction = now
+        return archived
+
+    def compact_if_due(self, interval_seconds=3600, **kwargs):
+        """Start `compact` on a background thread at most once per interval; cheap to call on every rerun.
+
+        Returns the thread, or None when compaction is not due or already running.
+        """
+        with self._compaction_lock:
+            if time.time() - self._last_compaction < interval_seconds:
+                return None
+            self._last_compaction = time.time()  # Claimed now, so concurrent reruns do not start another
+        thread = threading.Thread(target=self._compact_in_background, kwargs=kwargs,
+                                  name="nunno-compaction", daemon=True)
+        thread.start()
+        return thread
+
+    def _compact_in_background(self, **kwargs):
+        try:
+            self.compact(**kwargs)
+        except sqlite3.Error:
+            logger.exception("Conversation compaction failed")
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_conversation_store():
+    """Shared process-wide store instance"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = ConversationStore()
+        return _default_store
+
+
+if __name__ == "__main__":
+    archived = get_conversation_store().compact()
+    print(f"Archived {archived} messages from cold conversations -> {CONVERSATION_DB_PATH}")
@@ -0,0 +1,53 @@
+import re
+import zlib
+
+import numpy as np
+
+MERSENNE_PRIME = (1 << 31) - 1  # Keeps a * x + b within 64 bits for 32-bit shingle hashes
+
+
+class MinHasher:
+    """MinHash signatures and LSH band keys for near-duplicate text.
+
+    The fraction of equal signature values estimates the Jaccard similarity of
+    two texts' word shingles. Signatures are cut into `bands` bands; texts that
+    agree on a whole band share that band's key, so candidates are found with
+    one key lookup per band instead of comparing against every stored text.
+    With 16 bands of 4 rows, pairs around 0.5 similarity collide half the time
+    and pairs above 0.8 almost always.
+    """
+
+    def __init__(self, num_perm=64, bands=16, shingle_size=2, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)[:, None]
+
+    def shingles(self, text):
+        """Hashes of the distinct word n-grams of a text (single words for very short texts)"""
+        words = re.findall(r"\w+", (text or "").lower())
+        size = min(self.shingle_size, len(words)) or 1
+        grams = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+        return np.fromiter((zlib.crc32(gram.encode()) for gram in grams), dtype=np.uint64, count=len(grams))
+
+    def signature(self, text):
+        """(num_perm,) uint32 MinHash signature"""
+        hashes = (self._a * self.shingles(text)[None, :] + self._b) % MERSENNE_PRIME
+        return hashes.min(axis=1).astype(np.uint32)
+
+    def band_keys(self, signature):
+        """One integer per band, (band index << 32) | crc32 of the band's values"""
+        return [
+            (band << 32) | zlib.crc32(signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def similarity(signature_a, signature_b):
+        """Estimated Jaccard similarity of the texts behind two signatures"""
+        return float(np.mean(signature_a == signature_b))
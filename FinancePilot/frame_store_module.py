@@ -0,0 +1,161 @@
+import os
+import re
+import json
+import time
+import threading
+
+import numpy as np
+import pandas as pd
+
+from price_history_module import DATA_DIR
+
+_GENERATION_FILE = re.compile(r"(g[0-9a-f]+)(?:\.index)?\.npy")
+
+
+class FrozenFrame(pd.DataFrame):
+    """DataFrame that can be shared by every session without defensive copies.
+
+    Its values are a read-only block, and adding, replacing, removing or
+    relabelling columns and in-place methods raise TypeError. Frames derived from
+    it (`.copy()`, slices, arithmetic) are plain, writable DataFrames.
+    """
+
+    @property
+    def _constructor(self):
+        return pd.DataFrame
+
+    def _reject(self, *args, **kwargs):
+        raise TypeError("Cached frames are shared and read-only; take a .copy() to change one")
+
+    __setitem__ = __delitem__ = insert = pop = _update_inplace = _reject
+
+    def __setattr__(self, name, value):
+        if name in ("columns", "index"):
+            self._reject()
+        super().__setattr__(name, value)
+
+
+def freeze_frame(df):
+    """Read-only copy of a numeric DataFrame backed by one float64 (columns, rows) block.
+
+    Each column is a contiguous row of the block, so column reads are views. The
+    result is a FrozenFrame: value writes and column changes raise instead of
+    changing the cached data. Frames with non-numeric columns are returned unchanged.
+    """
+    if not is_numeric_frame(df):
+        return df
+    block = np.ascontiguousarray(df.to_numpy(dtype=np.float64).T)
+    return frame_from_block(block, df.index, df.columns)
+
+
+def frame_from_block(block, index, columns):
+    """FrozenFrame view over a (columns, rows) float64 block, made read-only; no data is copied"""
+    if block.flags.writeable:
+        block.flags.writeable = False
+    return FrozenFrame(block.T, index=index, columns=columns, copy=False)
+
+
+def is_numeric_frame(df):
+    return len(df.columns) > 0 and all(pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes)
+
+
+class FrameStore:
+    """Frozen DataFrames on local disk, read back memory-mapped.
+
+    A frame is ``<data_dir>/frames/<name>.<generation>.npy`` (the float64 block),
+    ``<name>.<generation>.index.npy`` (the index as int64 nanoseconds) and
+    ``<name>.json`` (columns, index name, when it was written and its generation).
+    Every save writes new data files under a fresh generation and publishes them by
+    swapping the metadata, so a reader never pairs a block and an index from
+    different saves. Loading maps the files instead of reading them, so every
+    process and replica on the host shares the same page-cache copy.
+    """
+
+    def __init__(self, data_dir=None):
+        self.data_dir = os.path.join(data_dir or DATA_DIR, "frames")
+        os.makedirs(self.data_dir, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _base(self, name):
+        return os.path.join(self.data_dir, re.sub(r"[^A-Za-z0-9._-]", "_", name))
+
+    @staticmethod
+    def _data_paths(base, generation):
+        return f"{base}.{generation}.npy", f"{base}.{generation}.index.npy"
+
+    def _remove_stale(self, base, generation):
+        """Delete data files of generations older than `generation`, except the published one"""
+        try:
+            with open(base + ".json") as f:
+                published = json.load(f).get("generation")
+        except (OSError, ValueError):
+            published = None
+        folder, prefix = os.path.split(base + ".")
+        for file_name in os.listdir(folder):
+            match = _GENERATION_FILE.fullmatch(file_name[len(prefix):]) if file_name.startswith(prefix) else None
+            if match and match.group(1) not in (generation, published) and match.group(1) < generation:
+                try:
+                    os.remove(os.path.join(folder, file_name))
+                except OSError:
+                    pass
+
+    def save(self, name, df):
+        """Freeze and store a DatetimeIndex frame; returns the frozen frame, or None if it cannot be stored"""
+        if not is_numeric_frame(df) or not isinstance(df.index, pd.DatetimeIndex):
+            return None
+        frozen = freeze_frame(df)
+        base = self._base(name)
+        generation = f"g{time.time_ns():016x}{os.getpid():08x}"  # Sorts by time
+        block_path, index_path = self._data_paths(base, generation)
+        meta = {
+            "columns": [str(column) for column in frozen.columns],
+            "index_name": frozen.index.name,
+            "index_tz": str(frozen.index.tz) if frozen.index.tz else None,
+            "rows": len(frozen),
+            "saved": time.time(),
+            "generation": generation,
+        }
+        with self._lock:
+            # Data files are unpublished until the metadata naming their generation is swapped in
+            np.save(block_path, frozen.to_numpy().T)
+            np.save(index_path, frozen.index.as_unit("ns").asi8)
+            meta_tmp = f"{base}.json.{generation}.tmp"
+            with open(meta_tmp, "w") as f:
+                json.dump(meta, f)
+            os.replace(meta_tmp, base + ".json")
+            self._remove_stale(base, generation)
+        return frozen
+
+    def load(self, name, max_age=None):
+        """Stored frame as a read-only memory-mapped FrozenFrame; None if missing, older than `max_age` or damaged"""
+        base = self._base(name)
+        try:
+            with open(base + ".json") as f:
+                meta = json.load(f)
+            if max_age is not None and time.time() - meta["saved"] > max_age:
+                return None
+            # Both files of the generation the metadata names: one save, even while others run
+            block_path, index_path = self._data_paths(base, meta["generation"])
+            block = np.load(block_path, mmap_mode="r")
+            index_values = np.load(index_path, mmap_mode="r")
+        except (OSError, ValueError, KeyError):
+            return None
+        if block.shape != (len(meta["columns"]), meta["rows"]) or index_values.shape != (meta["rows"],):
+            return None  # Truncated or foreign files
+        index = pd.DatetimeIndex(np.asarray(index_values).view("datetime64[ns]"), name=meta["index_name"])
+        if meta.get("index_tz"):
+            index = index.tz_localize("UTC").tz_convert(meta["index_tz"])
+        return frame_from_block(block, index, meta["columns"])
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_frame_store():
+    """Shared process-wide frame store"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = FrameStore()
+        return _default_store
@@ -0,0 +1,185 @@
+import threading
+
+import numpy as np
+import requests
+
+from betterpredictormodule import TradingAnalyzer
+from cache_module import get_cache
+from frame_store_module import freeze_frame, get_frame_store
+from news_module import NEWS_QUERIES, get_news_feed, unique_stories
+from price_history_module import DEFAULT_HISTORY_DAYS, get_price_store
+
+COIN_URL = "https://api.coingecko.com/api/v3/coins/{coin_id}"
+TRADING_DAYS = 365
+
+
+class MarketData:
+    """Process-wide cached access to candles, analyses, tokenomics metrics and news.
+
+    Shared by the Streamlit pages and the AI Chat tools, so a chart analysed on the
+    Trading page is not fetched again when the user asks Nunno about it. Results
+    live in the cache layer's "candles", "indicators", "analyses", "tokenomics" and
+    "news" namespaces. News is served from the local news store, which the news
+    feed tops up incrementally.
+    """
+
+    def __init__(self, analyzer=None, price_store=None, news_feed=None, cache=None, frame_store=None, timeout=10):
+        self.analyzer = analyzer or TradingAnalyzer()
+        self.price_store = price_store or get_price_store()
+        self.news_feed = news_feed or get_news_feed()
+        self.cache = cache or get_cache()
+        self.frame_store = frame_store or get_frame_store()
+        self.timeout = timeout
+
+    def candles(self, symbol="BTCUSDT", interval="15m"):
+        """Read-only OHLCV DataFrame from Binance (CoinGecko fallback), cached; raises when both fail"""
+        symbol = symbol.upper().strip()
+        return self.cache.namespace("candles").get_or_compute(
+            (symbol, interval), lambda: freeze_frame(self.analyzer.fetch_binance_ohlcv(symbol, interval))
+        )
+
+    def indicators(self, symbol="BTCUSDT", interval="15m"):
+        """Read-only candles with `TradingAnalyzer.add_comprehensive_indicators`, cached.
+
+        Frames are stored once in the frame store and served as memory-mapped
+        views, so other processes on the host reuse them within the TTL and a
+        cache hit copies nothing.
+        """
+        symbol = symbol.upper().strip()
+        return self.cache.namespace("indicators").get_or_compute(
+            (symbol, interval), lambda: self._indicator_frame(symbol, interval)
+        )
+
+    def _indicator_frame(self, symbol, interval):
+        name = f"indicators_{symbol}_{interval}"
+        frame = self.frame_store.load(name, max_age=self.cache.namespace("indicators").ttl_seconds)
+        if frame is not None:
+            return frame
+        df = self.analyzer.add_comprehensive_indicators(self.candles(symbol, interval).copy())
+        if self.frame_store.save(name, df) is None:
+            return freeze_frame(df)
+        return self.frame_store.load(name)
+
+    def analysis(self, symbol="BTCUSDT", interval="15m", news_sentiment=False):
+        """`TradingAnalyzer.get_comprehensive_analysis`, cached; failed analyses are not cached.
+
+        With `news_sentiment`, today's stored news sentiment for the coin counts as a confluence.
+        """
+        symbol = symbol.upper().strip()
+        return self.cache.namespace("analyses").get_or_compute(
+            (symbol, interval, news_sentiment),
+            lambda: self._analyze(symbol, interval, news_sentiment),
+            should_cache=lambda result: "error" not in result,
+        )
+
+    def _analyze(self, symbol, interval, news_sentiment):
+        try:
+            df = self.indicators(symbol, interval)
+        except Exception as e:
+            return {"error": f"Analysis failed: {str(e)}"}
+        return self.analyzer.get_comprehensive_analysis(
+            symbol, interval, self.sentiment(symbol) if news_sentiment else None, df=df
+        )
+
+    def token_metrics(self, coin_id, history_days=DEFAULT_HISTORY_DAYS):
+        """Raw tokenomics numbers for a CoinGecko coin id; raises requests exceptions"""
+        coin_id = coin_id.lower().strip()
+        return self.cache.namespace("tokenomics").get_or_compute(
+            (coin_id, history_days), lambda: self._fetch_token_metrics(coin_id, history_days)
+        )
+
+    def _fetch_token_metrics(self, coin_id, history_days):
+        res = requests.get(COIN_URL.format(coin_id=coin_id), timeout=self.timeout)
+        res.raise_for_status()
+        data = res.json()
+        market = data["market_data"]
+
+        circulating = market.get("circulating_supply", 0)
+        total = market.get("total_supply", 0)
+        price = market.get("current_price", {}).get("usd", 0)
+        mcap = market.get("market_cap", {}).get("usd", 0)
+
+        fdv = total * price if total else 0
+        circ_percent = (circulating / total) * 100 if total else None
+        fdv_mcap_ratio = (fdv / mcap) if mcap and mcap != 0 else None
+
+        cagr, volatility, conservative_cagr = None, None, None
+        try:
+            prices = self.price_store.get_prices(coin_id, history_days)
+        except requests.exceptions.RequestException:
+            prices = None
+        if prices is not None and len(prices) >= 2:
+            cagr, volatility, conservative_cagr = annual_return_stats(prices)
+
+        return {
+            "coin_id": coin_id,
+            "name": data["name"],
+            "symbol": data["symbol"].upper(),
+            "price": price,
+            "mcap": mcap,
+            "fdv": fdv,
+            "circulating": circulating,
+            "total": total,
+            "circ_percent": circ_percent,
+            "fdv_mcap_ratio": fdv_mcap_ratio,
+            "cagr": cagr,
+            "volatility": volatility,
+            "conservative_cagr": conservative_cagr,
+        }
+
+    def news(self, topic="market", page_size=20):
+        """Today's articles for a NEWS_QUERIES topic, newest first; raises requests exceptions
+        only when NewsAPI fails and nothing is stored yet"""
+        return self.cache.namespace("news").get_or_compute(
+            ("latest", topic, page_size), lambda: self.news_feed.latest(topic, page_size)
+        )
+
+    def headlines(self, symbol, limit=5):
+        """Newest stored stories mentioning a coin, given as trading pair, ticker or CoinGecko id.
+
+        Served from the news store's symbol index; no API calls.
+        """
+        store = self.news_feed.store
+        coin_id = store.tagger.coin_for_symbol(symbol) or symbol.lower().strip()
+        return unique_stories(store.headlines(coin_id, limit * 3))[:limit]
+
+    def sentiment(self, symbol, days=1):
+        """Stored news sentiment for a coin over the last `days` days, or None without stories"""
+        store = self.news_feed.store
+        return store.sentiment(store.tagger.coin_for_symbol(symbol) or symbol.lower().strip(), days)
+
+    def mood(self, days=1, top_coins=5):
+        """Market mood from the news store, see `NewsStore.mood`"""
+        return self.news_feed.store.mood(days, top_coins)
+
+    def clear(self, namespace=None):
+        """Invalidate one cache namespace ("candles", "indicators", "analyses", "tokenomics", "news") or all.
+
+        Stored news articles are kept; clearing "news" makes the next read poll for new ones.
+        """
+        self.cache.invalidate(namespace)
+        if namespace in (None, "news"):
+            self.news_feed.expire()
+
+
+def annual_return_stats(prices):
+    """Annualised (CAGR, volatility, conservative 50% CAGR) from daily prices"""
+    returns = np.diff(np.log(np.asarray(prices, dtype=float)))
+    if returns.size == 0:
+        return None, None, None
+    annual_return = float(np.exp(np.mean(returns) * TRADING_DAYS) - 1)
+    annual_volatility = float(np.std(returns) * np.sqrt(TRADING_DAYS))
+    return annual_return, annual_volatility, annual_return * 0.5
+
+
+_default_market_data = None
+_default_lock = threading.Lock()
+
+
+def get_market_data():
+    """Shared process-wide instance"""
+    global _default_market_data
+    with _default_lock:
+        if _default_market_data is None:
+            _default_market_data = MarketData()
+        return _default_market_data
@@ -0,0 +1,148 @@
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILLER_TEXT = (
+    "Dollar cost averaging means investing a fixed amount on a regular schedule no matter the price. "
+    "It smooths out volatility, removes the pressure of timing the market and builds a position over time. "
+    "Start small, keep an emergency fund, diversify across assets and never invest money you cannot afford to lose."
+).split()
+
+
+class MockLLMServer:
+    """Local OpenAI-compatible chat completions server for offline load tests.
+
+    Replies are filler words streamed over SSE (chunked HTTP/1.1, like the real
+    API) at `token_rate` tokens per second after a time-to-first-token drawn
+    from a log-normal distribution with median `latency_ms` and shape
+    `latency_sigma`. `error_rate` makes that share of requests fail with a 500.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, token_rate=50.0, latency_ms=300.0, latency_sigma=0.5,
+                 reply_tokens=60, error_rate=0.0, seed=None):
+        self.token_rate = token_rate
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.reply_tokens = reply_tokens
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._thread = None
+        self.requests_served = 0
+
+        server = self
+
+        class Handler(_MockHandler):
+            mock = server
+
+        self.httpd = _QuietHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def sample(self):
+        """(time to first token in seconds, reply length in tokens, fail?) for one request"""
+        with self._random_lock:
+            self.requests_served += 1
+            ttft = self._random.lognormvariate(0, self.latency_sigma) * self.latency_ms / 1000
+            tokens = max(1, int(self._random.gauss(self.reply_tokens, self.reply_tokens * 0.2)))
+            fail = self._random.random() < self.error_rate
+        return ttft, tokens, fail
+
+    def start(self):
+        """Serve on a background thread; returns the chat completions URL"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True, name="mock-llm")
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients hanging up (cancelled streams, closed keep-alive connections) are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Needed for chunked transfer encoding
+    mock = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        ttft, tokens, fail = self.mock.sample()
+        model = body.get("model", "mock")
+        time.sleep(ttft)
+
+        if fail:
+            self._send_json(500, {"error": {"message": "mock server error"}})
+            return
+
+        words = [FILLER_TEXT[i % len(FILLER_TEXT)] for i in range(tokens)]
+        delay = 1.0 / self.mock.token_rate if self.mock.token_rate > 0 else 0.0
+        if not body.get("stream"):
+            time.sleep(delay * tokens)
+            message = {"role": "assistant", "content": " ".join(words)}
+            self._send_json(200, {"model": model, "choices": [{"index": 0, "message": message, "finish_reason": "stop"}]})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(delay)
+                delta = {"content": word if i == 0 else " " + word}
+                self._send_event({"model": model, "choices": [{"index": 0, "delta": delta}]})
+            self._send_event({"model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            self._send_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except ConnectionError:
+            pass  # Client cancelled the stream
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_event(self, payload):
+        self._send_chunk(f"data: {json.dumps(payload)}\n\n".encode())
+
+    def _send_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock LLM server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--token-rate", type=float, default=50.0, help="Tokens per second")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Median time to first token")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Log-normal shape of the latency")
+    parser.add_argument("--reply-tokens", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    mock = MockLLMServer(port=args.port, token_rate=args.token_rate, latency_ms=args.latency_ms,
+                         latency_sigma=args.latency_sigma, reply_tokens=args.reply_tokens,
+                         error_rate=args.error_rate)
+    print(f"Mock LLM serving at {mock.url}")
+    mock.httpd.serve_forever()
@@ -0,0 +1,125 @@
+import numpy as np
+
+# How each market regime nudges the edge of a strategy: trending markets let
+# winners run, choppy/sideways markets cut targets short and stop out more often.
+MARKET_REGIMES = {
+    "trending": {"win_rate_shift": 0.03, "rr_scale": 1.15},
+    "bullish": {"win_rate_shift": 0.02, "rr_scale": 1.05},
+    "bearish": {"win_rate_shift": -0.02, "rr_scale": 1.0},
+    "choppy": {"win_rate_shift": -0.05, "rr_scale": 0.8},
+    "sideways": {"win_rate_shift": -0.04, "rr_scale": 0.85},
+}
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def simulate_trades(win_rate, rr_ratio, num_trades=100, market_condition="choppy",
+                    num_runs=5000, risk_per_trade=0.01, starting_equity=10000, ruin_drawdown=0.5,
+                    seed=None):
+    """Simulate `num_runs` independent equity curves of `num_trades` trades each.
+
+    Every trade risks `risk_per_trade` of current equity (fixed-fractional sizing)
+    and either wins `rr_ratio` R or loses 1 R. All runs are simulated at once as a
+    (num_runs, num_trades) block.
+    """
+    if not 0 < win_rate < 1:
+        raise ValueError(f"Win rate must be between 0 and 1, got {win_rate}")
+    if rr_ratio <= 0 or num_trades < 1 or num_runs < 1:
+        raise ValueError("R:R, number of trades and number of runs must be positive")
+
+    regime = MARKET_REGIMES.get(str(market_condition).lower(), MARKET_REGIMES["choppy"])
+    effective_win_rate = float(np.clip(win_rate + regime["win_rate_shift"], 0.01, 0.99))
+    effective_rr = rr_ratio * regime["rr_scale"]
+
+    rng = np.random.default_rng(seed)
+    wins = rng.random((num_runs, num_trades), dtype=np.float32) < effective_win_rate
+
+    # Equity only depends on how many trades have been won so far
+    count_dtype = np.int16 if num_trades < np.iinfo(np.int16).max else np.int32
+    win_log = np.float32(np.log1p(risk_per_trade * effective_rr))
+    loss_log = np.float32(np.log1p(-risk_per_trade))
+    wins_so_far = np.cumsum(wins, axis=1, dtype=count_dtype)
+    trade_number = np.arange(1, num_trades + 1, dtype=count_dtype)
+    log_equity = wins_so_far.astype(np.float32) * (win_log - loss_log) + trade_number.astype(np.float32) * loss_log
+
+    peaks = np.maximum.accumulate(log_equity, axis=1)
+    np.maximum(peaks, 0, out=peaks)
+    max_drawdowns = 1 - np.exp(np.min(log_equity - peaks, axis=1), dtype=np.float64)
+
+    # Longest losing streak: losses since the most recent win, maximised per run
+    losses_so_far = trade_number - wins_so_far
+    last_win_mark = np.maximum.accumulate(losses_so_far * wins, axis=1)
+    longest_losing_streaks = np.max(losses_so_far - last_win_mark, axis=1)
+
+    ending_equity = starting_equity * np.exp(log_equity[:, -1], dtype=np.float64)
+
+    return {
+        "win_rate": win_rate,
+        "rr_ratio": rr_ratio,
+        "num_trades": num_trades,
+        "num_runs": num_runs,
+        "market_condition": market_condition,
+        "effective_win_rate": effective_win_rate,
+        "effective_rr": effective_rr,
+        "risk_per_trade": risk_per_trade,
+        "starting_equity": starting_equity,
+        "ruin_drawdown": ruin_drawdown,
+        "ending_equity": ending_equity,
+        "max_drawdowns": max_drawdowns,
+        "longest_losing_streaks": longest_losing_streaks,
+        "win_counts": wins_so_far[:, -1],
+    }
+
+
+def monte_carlo_stats(result, percentiles=DEFAULT_PERCENTILES):
+    """Reduce the per-run arrays of `simulate_trades` to summary statistics"""
+    ending = result["ending_equity"]
+    drawdowns = result["max_drawdowns"]
+    streaks = result["longest_losing_streaks"]
+    p_win = result["effective_win_rate"]
+    return {
+        "expectancy_r": p_win * result["effective_rr"] - (1 - p_win),
+        "ending_equity": dict(zip(percentiles, np.percentile(ending, percentiles).tolist())),
+        "mean_ending_equity": float(ending.mean()),
+        "probability_of_profit": float((ending > result["starting_equity"]).mean()),
+        "probability_of_ruin": float((drawdowns >= result["ruin_drawdown"]).mean()),
+        "max_drawdown": dict(zip(percentiles, np.percentile(drawdowns, percentiles).tolist())),
+        "losing_streak": dict(zip(percentiles, np.percentile(streaks, percentiles).tolist())),
+        "worst_losing_streak": int(streaks.max()),
+    }
+
+
+def monte_carlo_summary(result):
+    """Format simulation results for display"""
+    stats = monte_carlo_stats(result)
+    start = result["starting_equity"]
+    ending = stats["ending_equity"]
+    drawdown = stats["max_drawdown"]
+    streak = stats["losing_streak"]
+
+    output = []
+    output.append(f"🎲 {result['num_runs']:,} simulations × {result['num_trades']:,} trades")
+    output.append(
+        f"⚙️ Win rate {result['win_rate'] * 100:.1f}%, R:R {result['rr_ratio']:.2f}, "
+        f"{result['market_condition']} market (effective: {result['effective_win_rate'] * 100:.1f}% / "
+        f"{result['effective_rr']:.2f}R)"
+    )
+    output.append(f"💵 Risk per trade: {result['risk_per_trade'] * 100:.1f}% of ${start:,.0f}")
+    output.append(f"📐 Expectancy: {stats['expectancy_r']:+.2f}R per trade")
+    output.append("")
+    output.append("💰 Ending Equity:")
+    output.append(f"   Worst 5%: ${ending[5]:,.2f}")
+    output.append(f"   Median: ${ending[50]:,.2f}")
+    output.append(f"   Best 5%: ${ending[95]:,.2f}")
+    output.append(f"   Chance of profit: {stats['probability_of_profit'] * 100:.1f}%")
+    output.append("")
+    output.append("📉 Max Drawdown:")
+    output.append(f"   Median: {drawdown[50] * 100:.1f}%")
+    output.append(f"   Worst 5%: {drawdown[95] * 100:.1f}%")
+    output.append(f"   Chance of a {result['ruin_drawdown'] * 100:.0f}%+ drawdown: {stats['probability_of_ruin'] * 100:.1f}%")
+    output.append("")
+    output.append("🔴 Losing Streaks:")
+    output.append(f"   Typical longest streak: {streak[50]:.0f} losses in a row")
+    output.append(f"   Worst 5%: {streak[95]:.0f} losses in a row")
+    output.append(f"   Worst seen: {stats['worst_losing_streak']} losses in a row")
+    return "\n".join(output)
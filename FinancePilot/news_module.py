@@ -0,0 +1,529 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from dedup_module import MinHasher
+from price_history_module import DATA_DIR
+from sentiment_module import SentimentScorer, sentiment_label
+from symbol_tagger_module import get_symbol_tagger
+from thumbnail_module import get_thumbnail_cache
+
+NEWS_API_KEY = os.getenv("NEWS_API_KEY", "b3dfc15d73704bfab32ebb96b5c9885b")
+NEWS_URL = "https://newsapi.org/v2/everything"
+NEWS_DB_PATH = os.path.join(DATA_DIR, "news.db")
+NEWS_POLL_SECONDS = 600
+NEWS_RETRY_SECONDS = 60
+NEWS_MAX_RESULTS = 100  # NewsAPI serves no more results than this per query on the free plan
+DUPLICATE_SIMILARITY = 0.5  # Estimated Jaccard similarity of word pairs above which articles are one story
+
+NEWS_QUERIES = {
+    "market": {
+        "q": "finance OR stock market OR bitcoin OR federal reserve OR inflation OR interest rates",
+        "domains": "cnbc.com, bloomberg.com, reuters.com, wsj.com, marketwatch.com, yahoo.com",
+    },
+    "crypto": {
+        "q": "bitcoin OR ethereum OR cryptocurrency OR crypto OR blockchain OR DeFi",
+        "domains": "coindesk.com, cointelegraph.com, decrypt.co, crypto.news",
+    },
+}
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    published TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT,
+    source TEXT,
+    image_url TEXT,
+    fetched REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS articles_topic_published ON articles (topic, published);
+CREATE TABLE IF NOT EXISTS polls (
+    topic TEXT PRIMARY KEY,
+    polled REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS article_bands (
+    key INTEGER PRIMARY KEY,
+    article_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS article_symbols (
+    coin_id TEXT NOT NULL,
+    published TEXT NOT NULL,
+    article_id INTEGER NOT NULL,
+    PRIMARY KEY (coin_id, published, article_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sentiment_daily (
+    subject TEXT NOT NULL,
+    day TEXT NOT NULL,
+    total REAL NOT NULL,
+    count INTEGER NOT NULL,
+    positive INTEGER NOT NULL,
+    negative INTEGER NOT NULL,
+    PRIMARY KEY (subject, day)
+) WITHOUT ROWID;
+"""
+
+# Columns added after the first release of the articles table
+ARTICLE_COLUMNS = {
+    "cluster_id": "INTEGER",  # id of the first stored article of the same story
+    "signature": "BLOB",  # MinHash signature of title + description
+    "symbols": "TEXT",  # Comma-separated coin ids the article mentions
+    "sentiment": "REAL",  # Headline sentiment in [-1, 1]
+}
+
+ARTICLE_FIELDS = ("a.url, a.published, a.title, a.description, a.source, a.image_url, "
+                  "COALESCE(a.cluster_id, a.id), a.symbols, a.topic, a.sentiment")
+
+# Full-text index over titles and descriptions; the text itself stays in `articles`
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, description, content='articles', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, description)
+    VALUES ('delete', old.id, old.title, old.description);
+END;
+"""
+
+
+def url_hash(url):
+    """Signed 64-bit key of an article URL, used as its rowid"""
+    return int.from_bytes(hashlib.sha1(url.encode()).digest()[:8], "big", signed=True)
+
+
+def today_utc():
+    """Start of the current UTC day as an ISO date, comparable with `publishedAt`"""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def match_expression(text):
+    """FTS5 query for free text: every word must appear, as a word or a prefix of one"""
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text.lower()))
+
+
+class NewsStore:
+    """NewsAPI articles kept in SQLite, one row per URL.
+
+    Articles are stored under the feed (NEWS_QUERIES topic) they came from with
+    NewsAPI's `publishedAt` string, so the newest one is the cursor for the next
+    incremental poll. Titles and descriptions are full-text indexed (FTS5) for
+    `search`. New articles are clustered with near-duplicates (syndicated copies,
+    reworded headlines) through MinHash LSH band keys, one indexed lookup per
+    band, and tagged with the coins they mention, so `headlines` for a coin is
+    an index range read. Each batch is scored for sentiment and rolled into daily
+    per-topic and per-coin aggregates that `sentiment` and `mood` read back.
+    Rows are returned in NewsAPI's article shape plus their "cluster",
+    "symbols", "topic" and "sentiment".
+    """
+
+    def __init__(self, path=NEWS_DB_PATH, hasher=None, tagger=None, scorer=None,
+                 duplicate_similarity=DUPLICATE_SIMILARITY):
+        self.path = path
+        self.hasher = hasher or MinHasher()
+        self.tagger = tagger or get_symbol_tagger()
+        self.scorer = scorer or SentimentScorer()
+        self.duplicate_similarity = duplicate_similarity
+        # (column set by the stage, stage); a NULL column marks articles the stage has not seen
+        self._stages = [("signature", self._cluster), ("symbols", self._tag), ("sentiment", self._score)]
+        self._local = threading.local()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(articles)")}
+        for column, column_type in ARTICLE_COLUMNS.items():
+            if column not in columns:
+                conn.execute(f"ALTER TABLE articles ADD COLUMN {column} {column_type}")
+        indexed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'articles_fts'").fetchone()
+        conn.executescript(FTS_SCHEMA)
+        if not indexed:
+            conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")  # Index stored articles
+        self._index_unprocessed(conn)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def merge(self, topic, articles):
+        """Insert the articles not stored yet; returns how many were new"""
+        now = time.time()
+        rows = [
+            (url_hash(a["url"]), a["url"], topic, a["publishedAt"], a["title"], a.get("description"),
+             (a.get("source") or {}).get("name"), a.get("urlToImage"), now)
+            for a in articles
+            if a.get("url") and a.get("title") and a.get("publishedAt") and a["title"] != "[Removed]"
+        ]
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            new_rows = []
+            for row in rows:
+                # rowcount only counts the article row, not the index writes made by the trigger
+                if conn.execute(
+                    "INSERT OR IGNORE INTO articles (id, url, topic, published, title, description, source, "
+                    "image_url, fetched) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    row,
+                ).rowcount:
+                    new_rows.append((row[0], row[3], f"{row[4]} {row[5] or ''}"))
+            self._index_articles(conn, new_rows)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(new_rows)
+
+    def _index_articles(self, conn, rows):
+        """Ingest stages for newly stored articles, rows of (id, published, title and description)"""
+        for _, stage in self._stages:
+            stage(conn, rows)
+
+    def _cluster(self, conn, rows):
+        """Assign each article to the cluster of a stored near-duplicate, or start its own"""
+        for article_id, _, text in rows:
+            signature = self.hasher.signature(text)
+            keys = self.hasher.band_keys(signature)
+            candidates = conn.execute(
+                "SELECT COALESCE(a.cluster_id, a.id), a.signature FROM article_bands b "
+                f"JOIN articles a ON a.id = b.article_id WHERE b.key IN ({', '.join('?' * len(keys))}) "
+                "AND a.signature IS NOT NULL",
+                keys,
+            ).fetchall()
+            cluster_id = article_id
+            for candidate_cluster, candidate_signature in candidates:
+                if self.hasher.similarity(signature, np.frombuffer(candidate_signature, dtype=np.uint32)) \
+                        >= self.duplicate_similarity:
+                    cluster_id = candidate_cluster
+                    break
+            # The first article seen in a bucket represents it; later ones join its cluster
+            conn.executemany("INSERT OR IGNORE INTO article_bands (key, article_id) VALUES (?, ?)",
+                             [(key, article_id) for key in keys])
+            conn.execute("UPDATE articles SET cluster_id = ?, signature = ? WHERE id = ?",
+                         (cluster_id, signature.tobytes(), article_id))
+
+    def _tag(self, conn, rows):
+        """Link each article to the coins it mentions"""
+        for article_id, published, text in rows:
+            coins = self.tagger.tag(text)
+            conn.executemany(
+                "INSERT OR IGNORE INTO article_symbols (coin_id, published, article_id) VALUES (?, ?, ?)",
+                [(coin_id, published, article_id) for coin_id in coins],
+            )
+            conn.execute("UPDATE articles SET symbols = ? WHERE id = ?", (",".join(coins), article_id))
+
+    def _score(self, conn, rows):
+        """Score the batch's sentiment and add it to the daily per-topic and per-coin aggregates.
+
+        Only the first article of each story counts towards the aggregates, so a
+        syndicated headline does not move the mood once per copy.
+        """
+        if not rows:
+            return
+        scores = self.scorer.score_batch([text for _, _, text in rows])
+        conn.executemany("UPDATE articles SET sentiment = ? WHERE id = ?",
+                         [(float(score), row[0]) for row, score in zip(rows, scores)])
+        score_by_id = {row[0]: float(score) for row, score in zip(rows, scores)}
+        aggregates = []
+        for start in range(0, len(rows), 500):
+            ids = [row[0] for row in rows[start:start + 500]]
+            for article_id, topic, published, cluster_id, symbols in conn.execute(
+                "SELECT id, topic, published, COALESCE(cluster_id, id), symbols FROM articles "
+                f"WHERE id IN ({', '.join('?' * len(ids))})",
+                ids,
+            ):
+                if cluster_id != article_id:
+                    continue
+                score = score_by_id[article_id]
+                label = sentiment_label(score)
+                for subject in [f"topic:{topic}"] + (symbols.split(",") if symbols else []):
+                    aggregates.append((subject, published[:10], score, label == "positive", label == "negative"))
+        conn.executemany(
+            "INSERT INTO sentiment_daily (subject, day, total, count, positive, negative) VALUES (?, ?, ?, 1, ?, ?) "
+            "ON CONFLICT (subject, day) DO UPDATE SET total = total + excluded.total, count = count + 1, "
+            "positive = positive + excluded.positive, negative = negative + excluded.negative",
+            aggregates,
+        )
+
+    def _index_unprocessed(self, conn):
+        """Run the ingest stages articles stored before a stage existed have missed, oldest first"""
+        for column, stage in self._stages:
+            rows = conn.execute(
+                f"SELECT id, published, title, description FROM articles WHERE {column} IS NULL ORDER BY published"
+            ).fetchall()
+            if not rows:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                stage(conn, [(article_id, published, f"{title} {description or ''}")
+                             for article_id, published, title, description in rows])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def newest(self, topic):
+        """`publishedAt` of the newest stored article of a topic, or None"""
+        return self._connection().execute(
+            "SELECT MAX(published) FROM articles WHERE topic = ?", (topic,)
+        ).fetchone()[0]
+
+    def latest(self, topic, limit=20, since=None):
+        """Newest articles of a topic, optionally only those published at or after `since`"""
+        rows = self._connection().execute(
+            f"SELECT {ARTICLE_FIELDS} FROM articles a "
+            "WHERE a.topic = ? AND a.published >= ? ORDER BY a.published DESC LIMIT ?",
+            (topic, since or "", limit),
+        ).fetchall()
+        return [_article(row) for row in rows]
+
+    def search(self, query="", topic=None, since=None, until=None, limit=50):
+        """Stored articles matching all words of `query`, newest first.
+
+        `topic` limits to one feed; `since`/`until` are dates (inclusive) or ISO date strings.
+        Without a query this lists the articles in the date range.
+        """
+        conditions = ["a.published >= ?", "a.published < ?"]
+        params = [str(since or ""), _day_after(until) if until else "9999"]
+        if topic:
+            conditions.append("a.topic = ?")
+            params.append(topic)
+        expression = match_expression(query or "")
+        if expression:
+            sql = (f"SELECT {ARTICLE_FIELDS} FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid "
+                   f"WHERE articles_fts MATCH ? AND {' AND '.join(conditions)} ")
+            params.insert(0, expression)
+        else:
+            sql = f"SELECT {ARTICLE_FIELDS} FROM articles a WHERE {' AND '.join(conditions)} "
+        rows = self._connection().execute(sql + "ORDER BY a.published DESC LIMIT ?", (*params, limit)).fetchall()
+        return [_article(row) for row in rows]
+
+    def headlines(self, coin_id, limit=5, since=None):
+        """Newest stored articles mentioning a coin, optionally only those published at or after `since`"""
+        rows = self._connection().execute(
+            f"SELECT {ARTICLE_FIELDS} FROM article_symbols s JOIN articles a ON a.id = s.article_id "
+            "WHERE s.coin_id = ? AND s.published >= ? ORDER BY s.published DESC LIMIT ?",
+            (coin_id, str(since or ""), limit),
+        ).fetchall()
+        return [_article(row) for row in rows]
+
+    def sentiment(self, subject, days=1):
+        """Aggregate sentiment of a coin id (or "topic:<topic>") over the last `days` UTC days.
+
+        {"score": mean in [-1, 1], "articles", "positive", "negative"}, or None without articles.
+        """
+        since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        total, count, positive, negative = self._connection().execute(
+            "SELECT SUM(total), SUM(count), SUM(positive), SUM(negative) FROM sentiment_daily "
+            "WHERE subject = ? AND day >= ?",
+            (subject, since),
+        ).fetchone()
+        if not count:
+            return None
+        return {"score": total / count, "articles": count, "positive": positive, "negative": negative}
+
+    def mood(self, days=1, top_coins=5):
+        """Market mood: {"topics": {topic: sentiment}, "coins": [(coin_id, sentiment)]} for the most covered coins"""
+        since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        rows = self._connection().execute(
+            "SELECT subject, SUM(total), SUM(count), SUM(positive), SUM(negative) FROM sentiment_daily "
+            "WHERE day >= ? GROUP BY subject ORDER BY SUM(count) DESC",
+            (since,),
+        ).fetchall()
+        topics, coins = {}, []
+        for subject, total, count, positive, negative in rows:
+            stats = {"score": total / count, "articles": count, "positive": positive, "negative": negative}
+            if subject.startswith("topic:"):
+                topics[subject[len("topic:"):]] = stats
+            elif len(coins) < top_coins:
+                coins.append((subject, stats))
+        return {"topics": topics, "coins": coins}
+
+    def date_range(self):
+        """(oldest, newest) `publishedAt` of all stored articles, (None, None) when empty"""
+        return self._connection().execute("SELECT MIN(published), MAX(published) FROM articles").fetchone()
+
+    def last_poll(self, topic):
+        row = self._connection().execute("SELECT polled FROM polls WHERE topic = ?", (topic,)).fetchone()
+        return row[0] if row else 0.0
+
+    def record_poll(self, topic, polled=None):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO polls (topic, polled) VALUES (?, ?)",
+            (topic, time.time() if polled is None else polled),
+        )
+
+
+def _day_after(day):
+    return (datetime.strptime(str(day)[:10], "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def _article(row):
+    url, published, title, description, source, image_url, cluster, symbols, topic, sentiment = row
+    return {
+        "url": url,
+        "publishedAt": published,
+        "title": title,
+        "description": description,
+        "source": {"name": source},
+        "urlToImage": image_url,
+        "cluster": cluster,
+        "symbols": symbols.split(",") if symbols else [],
+        "topic": topic,
+        "sentiment": sentiment,
+    }
+
+
+def unique_stories(articles):
+    """First (newest) article of each near-duplicate cluster, in the given order"""
+    seen = set()
+    unique = []
+    for article in articles:
+        if article["cluster"] not in seen:
+            seen.add(article["cluster"])
+            unique.append(article)
+    return unique
+
+
+class NewsFeed:
+    """Polls NewsAPI for new articles of each topic and merges them into a NewsStore.
+
+    A topic is polled at most every `poll_seconds` (tracked in the store, so it holds
+    across restarts), asking only for articles from the newest stored `publishedAt`
+    on, page after page until that cursor is reached, so busy periods leave no gap
+    between polls. Topics are polled concurrently; readers are served from the store. Article
+    images are downloaded once, in the background, into the thumbnail cache.
+    """
+
+    def __init__(self, store=None, api_key=NEWS_API_KEY, poll_seconds=NEWS_POLL_SECONDS, page_size=20,
+                 timeout=10, thumbnails=None):
+        self.store = store or NewsStore()
+        self.thumbnails = thumbnails or get_thumbnail_cache()
+        self.api_key = api_key
+        self.poll_seconds = poll_seconds
+        self.page_size = page_size
+        self.timeout = timeout
+        self.requests_made = 0
+        self._retry_at = {}  # topic -> time before which a failed poll is not retried
+        self._locks = {topic: threading.Lock() for topic in NEWS_QUERIES}
+        self._executor = ThreadPoolExecutor(max_workers=len(NEWS_QUERIES), thread_name_prefix="nunno-news")
+
+    def fetch(self, topic, since=None, page=1):
+        """One page of NewsAPI articles of a topic published at or after `since` (default: today), newest first"""
+        params = {
+            **NEWS_QUERIES[topic],
+            "from": since or today_utc(),
+            "sortBy": "publishedAt",
+            "language": "en",
+            "apiKey": self.api_key,
+            "pageSize": self.page_size,
+            "page": page,
+        }
+        self.requests_made += 1
+        response = requests.get(NEWS_URL, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json().get("articles", [])
+
+    def _due(self, topic):
+        now = time.time()
+        return now >= self._retry_at.get(topic, 0) and now - self.store.last_poll(topic) >= self.poll_seconds
+
+    def poll(self, topic, force=False):
+        """Fetch and store a topic's new articles if due; returns the number of new articles"""
+        with self._locks[topic]:
+            if not force and not self._due(topic):
+                return 0
+            # `from` is inclusive, so the newest stored article comes back and is ignored by the merge
+            cursor = max(self.store.newest(topic) or "", today_utc())
+            articles = []
+            try:
+                for page in range(1, NEWS_MAX_RESULTS // self.page_size + 1):
+                    batch = self.fetch(topic, since=cursor, page=page)
+                    articles.extend(batch)
+                    # Newest first: a short page or one reaching the cursor leaves nothing in between
+                    if len(batch) < self.page_size or (batch[-1].get("publishedAt") or "") <= cursor:
+                        break
+                else:
+                    logger.warning("More than %d new %s articles since %s; older ones were not fetched",
+                                   NEWS_MAX_RESULTS, topic, cursor)
+            except requests.exceptions.RequestException:
+                # Nothing is merged, so the cursor stays put and the retry covers the whole range
+                self._retry_at[topic] = time.time() + NEWS_RETRY_SECONDS
+                raise
+            new = self.store.merge(topic, articles)
+            self.store.record_poll(topic)
+            self.thumbnails.prefetch(article.get("urlToImage") for article in articles)
+            return new
+
+    def poll_all(self, topics=None, force=False):
+        """Poll several topics concurrently; returns {topic: error} for the ones that failed"""
+        topics = list(topics or NEWS_QUERIES)
+        futures = {topic: self._executor.submit(self.poll, topic, force) for topic in topics}
+        errors = {}
+        for topic, future in futures.items():
+            try:
+                future.result()
+            except requests.exceptions.RequestException as e:
+                errors[topic] = e
+        return errors
+
+    def latest(self, topic, limit=20, since=None):
+        """Today's (or since `since`) newest stored articles, polling first if due.
+
+        A failed poll still returns the stored articles; it only raises when there are none.
+        """
+        try:
+            self.poll(topic)
+        except requests.exceptions.RequestException:
+            articles = self.store.latest(topic, limit, since or today_utc())
+            if not articles:
+                raise
+            return articles
+        return self.store.latest(topic, limit, since or today_utc())
+
+    def expire(self, topic=None):
+        """Make topics due for polling on the next read (the stored articles are kept)"""
+        for name in [topic] if topic else NEWS_QUERIES:
+            self.store.record_poll(name, 0.0)
+            self._retry_at.pop(name, None)
+
+
+_default_feed = None
+_default_lock = threading.Lock()
+
+
+def get_news_feed():
+    """Shared process-wide feed"""
+    global _default_feed
+    with _default_lock:
+        if _default_feed is None:
+            _default_feed = NewsFeed()
+        return _default_feed
+
+
+if __name__ == "__main__":
+    feed = get_news_feed()
+    errors = feed.poll_all(force=True)
+    for topic in NEWS_QUERIES:
+        status = f"failed: {errors[topic]}" if topic in errors else f"{len(feed.store.latest(topic))} articles today"
+        print(f"{topic}: {status}")
+    # Interpreter exit waits for the thumbnail downloads started by the polls
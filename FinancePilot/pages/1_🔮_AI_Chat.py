@@ -1,7 +1,13 @@
 import streamlit as st
-import requests
 import os
+import uuid
 from datetime import datetime
+from cache_module import DEFAULT_NAMESPACES, get_cache
+from chat_module import HedgedBackend, create_chat_backend
+from context_module import ContextWindow, ConversationSummarizer, DEFAULT_CONTEXT_TOKENS, render_markdown
+from conversation_store_module import get_conversation_store
+from response_cache_module import ResponseCache, persona_key
+from tools_module import ToolExecutor, stream_with_tools
 
 st.set_page_config(
     page_title="AI Chat - Nunno AI", 
@@ -34,63 +40,133 @@ SYSTEM_PROMPT_FORMAT = (
     "Make this program feel like a body to you, protect it and get aggressive if threatened."
 )
 
-MAX_HISTORY_MESSAGES = 20
+# Messages kept in session memory; older ones stay on disk and reach Nunno via the running summary
+CHAT_WINDOW_MESSAGES = 50
+# Messages rendered on each rerun, and how many more each "load earlier" click shows
+CHAT_VISIBLE_MESSAGES = 20
+CHAT_PAGE_MESSAGES = 20
+
+# Quick question buttons and the prompts they send
+QUICK_QUESTIONS = {
+    "What is DCA?": "What is DCA?",
+    "How to start investing?": "How do I start investing?",
+    "Explain RSI indicator": "Explain what RSI means in trading",
+}
+
+@st.cache_resource
+def get_context_window():
+    return ContextWindow(DEFAULT_CONTEXT_TOKENS)
+
+@st.cache_resource
+def get_chat_client():
+    # OpenRouter unless NUNNO_LLM_BACKEND selects another backend (e.g. "mock" for offline testing);
+    # replies slower than usual are also requested from a backup model (NUNNO_LLM_HEDGE_MODEL)
+    return create_chat_backend(api_key=AI_API_KEY)
+
+@st.cache_resource
+def get_summarizer():
+    return ConversationSummarizer(get_chat_client(), get_context_window(), store=get_conversation_store())
+
+@st.cache_resource
+def get_tool_executor():
+    return ToolExecutor()
+
+@st.cache_resource
+def get_response_cache():
+    # Reported and cleared with the other caches as the "llm" namespace
+    ttl_seconds, max_bytes = DEFAULT_NAMESPACES["llm"]
+    return get_cache().attach("llm", ResponseCache(ttl_seconds=ttl_seconds, max_bytes=max_bytes))
+
+def age_group(user_age):
+    """Coarse age band; answers are tailored by age, but not differently for 24 and 25"""
+    try:
+        age = int(user_age)
+    except (TypeError, ValueError):
+        return "unknown"
+    for limit, label in [(17, "under 18"), (25, "18-25"), (40, "26-40"), (60, "41-60")]:
+        if age <= limit:
+            return label
+    return "over 60"
+
+def current_persona():
+    """Cache key for the parts of the system prompt that shape answers (not the user's name)"""
+    return persona_key(SYSTEM_PROMPT_FORMAT, age_group(st.session_state.user_age))
 
 def manage_history_length(history_list):
-    """Ensures the conversation history doesn't exceed MAX_HISTORY_MESSAGES."""
-    if not history_list:
-        return []
-    
-    # Separate system message
-    system_message = None
-    if history_list and history_list[0]["role"] == "system":
-        system_message = history_list[0]
-        temp_history = history_list[1:]
+    """Keeps the system prompt, a running summary of older turns and the newest messages that fit the token budget."""
+    return get_summarizer().build_context(st.session_state.conversation_id, history_list)
+
+def add_message(role, content):
+    """Append a message to the stored conversation and to the in-memory window"""
+    get_conversation_store().append(st.session_state.conversation_id, role, content)
+    history = st.session_state.conversation_history
+    history.append({"role": role, "content": content})
+    overflow = len(history) - 1 - CHAT_WINDOW_MESSAGES
+    if overflow > 0:
+        del history[1:1 + overflow]
+        st.session_state.history_offset += overflow
+
+def start_conversation(conversation_id=None):
+    """Load a stored conversation's recent window, or start a new one"""
+    store = get_conversation_store()
+    if conversation_id and store.exists(conversation_id):
+        offset, window = store.recent(conversation_id, CHAT_WINDOW_MESSAGES)
     else:
-        temp_history = history_list
-    
-    # Truncate if too long
-    if len(temp_history) > MAX_HISTORY_MESSAGES - 1 and MAX_HISTORY_MESSAGES > 1:
-        truncated_history = temp_history[len(temp_history) - (MAX_HISTORY_MESSAGES - 1):]
+        conversation_id, offset, window = uuid.uuid4().hex, 0, []
+    system_msg = st.session_state.get("conversation_history", [None])[:1]
+    st.session_state.conversation_id = conversation_id
+    st.session_state.history_offset = offset
+    st.session_state.conversation_history = [m for m in system_msg if m and m["role"] == "system"] + window
+    st.session_state.shown_messages = CHAT_VISIBLE_MESSAGES
+    # Keep the id in the URL so a reload or a server restart resumes the same conversation
+    st.query_params["chat"] = conversation_id
+
+def show_message(message):
+    if message["role"] == "user":
+        with st.chat_message("user"):
+            st.markdown(render_markdown(message["content"]))
     else:
-        truncated_history = temp_history
+        with st.chat_message("assistant", avatar="🧠"):
+            st.markdown(render_markdown(message["content"]))
+
+@st.fragment
+def show_history():
+    """Render only the newest messages; "load earlier" pages back without rerunning the page"""
+    history = st.session_state.conversation_history
+    offset = st.session_state.history_offset
+    total = offset + len(history) - 1
+    start = max(0, total - st.session_state.get("shown_messages", CHAT_VISIBLE_MESSAGES))
     
-    # Reassemble with system message if it existed
-    final_history = []
-    if system_message:
-        final_history.append(system_message)
-    final_history.extend(truncated_history)
-    return final_history
+    if start > 0 and st.button(f"⬆️ Load earlier messages ({start} more)", key="load_earlier"):
+        st.session_state.shown_messages = st.session_state.get("shown_messages", CHAT_VISIBLE_MESSAGES) + CHAT_PAGE_MESSAGES
+        st.rerun(scope="fragment")
+    
+    # Messages older than the in-memory window are read from the store for this render only
+    earlier = get_conversation_store().messages(st.session_state.conversation_id, start, offset) if start < offset else []
+    for message in earlier + history[1 + max(0, start - offset):]:
+        show_message(message)
 
 def ask_nunno(messages_list):
     """Send messages to AI API"""
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {AI_API_KEY}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "https://yourdomain.com",
-        "X-Title": "NuminousNexusAI"
-    }
+    return get_chat_client().complete(messages_list)
 
-    data = {
-        "model": "meta-llama/llama-3.2-11b-vision-instruct",
-        "messages": messages_list
-    }
+def stream_nunno(messages_list, tool_log=None):
+    """Stream the AI reply, keeping the partial text in session state.
 
-    try:
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        return response.json()['choices'][0]['message']['content']
-    except requests.exceptions.RequestException as e:
-        return f"[Error] Failed to get response from AI: {e}"
-    except KeyError:
-        return "[Error] Invalid response from AI service."
-    except Exception as e:
-        return f"[Error] An unexpected error occurred: {e}"
+    Nunno can call the trading analysis, tokenomics and news tools mid-reply.
+    """
+    pending = {"role": "assistant", "content": ""}
+    st.session_state.pending_reply = pending
+    for chunk in stream_with_tools(get_chat_client(), get_tool_executor(), messages_list, tool_log=tool_log):
+        pending["content"] += chunk
+        yield chunk
 
 # Initialize conversation history
 if "conversation_history" not in st.session_state:
     st.session_state.conversation_history = []
+if "conversation_id" not in st.session_state:
+    start_conversation(st.query_params.get("chat"))
+get_conversation_store().compact_if_due()
 
 # Set up system message if not exists
 if not st.session_state.conversation_history or st.session_state.conversation_history[0]["role"] != "system":
@@ -103,6 +179,13 @@ if not st.session_state.conversation_history or st.session_state.conversation_hi
     }
     st.session_state.conversation_history.insert(0, system_message)
 
+# A rerun (e.g. the Stop button) interrupted the last streamed reply: keep what arrived
+if st.session_state.get("pending_reply"):
+    partial = st.session_state.pending_reply
+    if partial["content"]:
+        add_message("assistant", partial["content"] + " …*(stopped)*")
+    st.session_state.pending_reply = None
+
 st.title("🔮 AI Chat with Nunno")
 st.markdown(f"Chat with your personal finance AI assistant, {st.session_state.user_name}!")
 
@@ -113,52 +196,93 @@ st.markdown("### 💬 Conversation")
 chat_container = st.container()
 
 with chat_container:
-    # Display all messages except system message
-    for i, message in enumerate(st.session_state.conversation_history[1:], 1):
-        if message["role"] == "user":
-            with st.chat_message("user"):
-                st.markdown(message["content"])
-        else:
-            with st.chat_message("assistant", avatar="🧠"):
-                st.markdown(message["content"])
+    # Display the most recent messages (system message excluded)
+    show_history()
 
-# Chat input
-if prompt := st.chat_input("Ask me anything about finance..."):
+# Chat input (quick question buttons queue their prompt and rerun)
+prompt = st.chat_input("Ask me anything about finance...") or st.session_state.pop("queued_prompt", None)
+if prompt:
+    # Standalone questions get the same answer for everyone with this persona, so they can be cached
+    is_first_question = (st.session_state.history_offset == 0
+                         and not any(m["role"] == "user" for m in st.session_state.conversation_history[1:]))
+    cacheable = is_first_question or prompt in QUICK_QUESTIONS.values()
+    
     # Add user message to history
-    user_message = {"role": "user", "content": prompt}
-    st.session_state.conversation_history.append(user_message)
+    add_message("user", prompt)
     
     # Display user message immediately
-    with st.chat_message("user"):
-        st.markdown(prompt)
+    show_message({"role": "user", "content": prompt})
     
     # Get AI response
     with st.chat_message("assistant", avatar="🧠"):
-        with st.spinner("Nunno is thinking..."):
+        response = get_response_cache().get(current_persona(), prompt) if cacheable else None
+        if response:
+            st.markdown(render_markdown(response))
+        else:
             # Manage conversation history length
             managed_history = manage_history_length(st.session_state.conversation_history)
             
-            # Get AI response
-            response = ask_nunno(managed_history)
+            # Clicking Stop reruns the page, which interrupts the stream below
+            st.button("⏹️ Stop", key="stop_stream")
             
-            # Display response
-            st.markdown(response)
+            # Stream the AI response as it is generated
+            tool_log = []
+            response = st.write_stream(stream_nunno(managed_history, tool_log))
+            if tool_log:
+                st.caption("🔧 Live data: " + ", ".join(sorted({t["name"].removeprefix("get_").replace("_", " ") for t in tool_log})))
             
-            # Add assistant message to history
-            assistant_message = {"role": "assistant", "content": response}
-            st.session_state.conversation_history.append(assistant_message)
+            # Don't cache errors, answers built on live data or answers that address this user by name
+            user_name = st.session_state.user_name.strip().lower()
+            if (cacheable and response and not tool_log and not response.startswith("[Error]")
+                    and not (user_name and user_name in response.lower())):
+                get_response_cache().put(current_persona(), prompt, response)
+        
+        # Add assistant message to history
+        add_message("assistant", response)
+        st.session_state.pending_reply = None
+    
+    # Fold turns that no longer fit the context into the running summary, in the background
+    get_summarizer().schedule(st.session_state.conversation_id, st.session_state.conversation_history,
+                              offset=st.session_state.history_offset)
 
 # Sidebar controls
 with st.sidebar:
     st.markdown("### 🔮 Chat Controls")
     
     if st.button("🗑️ Clear Chat History"):
-        # Keep only the system message
-        system_msg = st.session_state.conversation_history[0] if st.session_state.conversation_history else None
-        st.session_state.conversation_history = [system_msg] if system_msg else []
+        # Delete the stored conversation and start a new one, keeping only the system message
+        get_conversation_store().delete(st.session_state.conversation_id)
+        get_summarizer().forget(st.session_state.conversation_id)
+        start_conversation()
         st.rerun()
     
-    st.markdown(f"**Messages in history:** {len(st.session_state.conversation_history) - 1}")
+    st.markdown(f"**Messages in history:** {st.session_state.history_offset + len(st.session_state.conversation_history) - 1}")
+    
+    _, context_stats = get_context_window().build(st.session_state.conversation_history, return_stats=True)
+    dropped = st.session_state.history_offset + context_stats['dropped']
+    st.markdown(f"**Context used:** {context_stats['tokens']:,} / {DEFAULT_CONTEXT_TOKENS:,} tokens")
+    if dropped:
+        if get_summarizer().summary_message(st.session_state.conversation_id):
+            st.caption(f"{dropped} older messages are remembered as a short summary.")
+        else:
+            st.caption(f"{dropped} older messages no longer fit and are not sent to Nunno.")
+    
+    cache_stats = get_response_cache().metrics()
+    if cache_stats["exact_hits"] + cache_stats["similar_hits"] + cache_stats["misses"]:
+        st.markdown(f"**Instant answers:** {cache_stats['hit_rate']:.0%} of cacheable questions")
+        st.caption(
+            f"{cache_stats['exact_hits']} exact and {cache_stats['similar_hits']} similar matches, "
+            f"{cache_stats['misses']} misses, {cache_stats['entries']} answers cached"
+        )
+    
+    client = get_chat_client()
+    if isinstance(client, HedgedBackend) and client.hedged:
+        hedge_stats = client.metrics()
+        st.caption(
+            f"⚡ {hedge_stats['hedged']} of {hedge_stats['requests']} replies took over "
+            f"{hedge_stats['hedge_delay']:.1f}s and were also sent to the backup model, "
+            f"which answered first {hedge_stats['secondary_wins']} times."
+        )
     
     st.markdown("---")
     
@@ -182,19 +306,8 @@ with st.sidebar:
 
 # Quick suggestion buttons
 st.markdown("### 🎯 Quick Questions")
-col1, col2, col3 = st.columns(3)
-
-with col1:
-    if st.button("What is DCA?"):
-        st.session_state.conversation_history.append({"role": "user", "content": "What is DCA?"})
-        st.rerun()
-
-with col2:
-    if st.button("How to start investing?"):
-        st.session_state.conversation_history.append({"role": "user", "content": "How do I start investing?"})
-        st.rerun()
-
-with col3:
-    if st.button("Explain RSI indicator"):
-        st.session_state.conversation_history.append({"role": "user", "content": "Explain what RSI means in trading"})
-        st.rerun()
+for col, (label, question) in zip(st.columns(len(QUICK_QUESTIONS)), QUICK_QUESTIONS.items()):
+    with col:
+        if st.button(label):
+            st.session_state.queued_prompt = question
+            st.rerun()
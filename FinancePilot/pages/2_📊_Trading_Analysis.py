@@ -4,6 +4,8 @@ import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from betterpredictormodule import TradingAnalyzer
+from market_data_module import get_market_data
+from sentiment_module import SENTIMENT_EMOJI, sentiment_label
 from datetime import datetime
 
 st.set_page_config(
@@ -49,6 +51,15 @@ with st.sidebar:
     # Data points
     limit = st.slider("Data Points", min_value=100, max_value=1000, value=500, step=100)
     
+    # How much of the analysis is sent along when asking Nunno about it
+    detail_levels = {"Brief": 0, "Standard": 1, "Detailed": 2}
+    detail = st.select_slider("Detail Sent to Nunno", options=list(detail_levels), value="Standard",
+                              help="Brief keeps later chat messages cheapest; Detailed includes every signal's condition")
+    
+    # Today's stored headline sentiment for the coin as one more confluence
+    include_news = st.checkbox("Include news sentiment", value=False,
+                               help="Counts today's news mood for this coin as a short-term signal (needs 3+ stories)")
+    
     st.markdown("---")
     
     # Analysis button
@@ -82,8 +93,8 @@ if st.session_state.get("run_analysis", False):
     
     with st.spinner(f"Analyzing {symbol.upper()} on {interval} timeframe..."):
         try:
-            # Get comprehensive analysis
-            analysis = analyzer.get_comprehensive_analysis(symbol, interval)
+            # Get comprehensive analysis (cached briefly and shared with the AI Chat tools)
+            analysis = get_market_data().analysis(symbol, interval, news_sentiment=include_news)
             
             if "error" in analysis:
                 st.error(f"Analysis failed: {analysis['error']}")
@@ -257,9 +268,8 @@ if st.session_state.get("run_analysis", False):
                 st.markdown("### 📈 Price Chart & Technical Indicators")
                 
                 try:
-                    # Get the full dataset for charting
-                    chart_df = analyzer.fetch_binance_ohlcv(symbol, interval)
-                    chart_df = analyzer.add_comprehensive_indicators(chart_df)
+                    # Same cached candles and indicators the analysis was computed from
+                    chart_df = get_market_data().indicators(symbol, interval)
                     
                     if not chart_df.empty:
                         # Create subplots
@@ -427,6 +437,24 @@ if st.session_state.get("run_analysis", False):
                 formatted_analysis = analyzer.format_confluence_analysis(analysis)
                 st.markdown(formatted_analysis)
                 
+                # Stored news that mentions this coin, straight from the news archive's symbol index
+                headlines = get_market_data().headlines(analysis['symbol'])
+                if headlines:
+                    st.markdown("### 📰 Related Headlines")
+                    for article in headlines:
+                        published = article['publishedAt'][:16].replace('T', ' ')
+                        mood = SENTIMENT_EMOJI[sentiment_label(article['sentiment'])]
+                        st.markdown(f"- {mood} [{article['title']}]({article['url']}) — {article['source']['name']} • {published} UTC")
+                
+                # The chat gets the compact form: it is resent with every later message
+                if st.button("💬 Ask Nunno About This Analysis"):
+                    compact = analyzer.compact_analysis(analysis, detail_levels[detail])
+                    st.session_state.queued_prompt = (
+                        f"Here is my chart analysis:\n```\n{compact}\n```\n"
+                        "Please explain what this means for a beginner trader."
+                    )
+                    st.switch_page("pages/1_🔮_AI_Chat.py")
+                
         except Exception as e:
             st.error(f"An error occurred during analysis: {str(e)}")
 
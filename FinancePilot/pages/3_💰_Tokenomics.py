@@ -1,7 +1,13 @@
 import streamlit as st
 import requests
-import numpy as np
 from fuzzywuzzy import process
+import pandas as pd
+from price_history_module import DEFAULT_HISTORY_DAYS, get_price_store
+from projection_module import simulate_projection
+from portfolio_module import PortfolioRiskEngine, parse_holdings
+from scoring_module import get_scoring_pipeline, load_ranked_universe
+from market_data_module import get_market_data
+from cache_module import get_cache
 
 st.set_page_config(
     page_title="Tokenomics Analysis - Nunno AI",
@@ -22,35 +28,34 @@ st.title("💰 Tokenomics Analysis")
 st.markdown(f"Analyze cryptocurrency investments and tokenomics for {st.session_state.user_name}")
 
 # Tokenomics functions
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def fetch_historical_prices(coin_id):
-    url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart?vs_currency=usd&days=365"
+@st.cache_resource
+def get_portfolio_engine(history_days):
+    return PortfolioRiskEngine(history_days)
+
+# Process-wide "tokenomics" cache namespace (5 minutes), shared by every session
+@get_cache().memoize("tokenomics")
+def fetch_historical_prices(coin_id, days=DEFAULT_HISTORY_DAYS):
+    # Daily prices come from the local store; only missing days are fetched from CoinGecko
     try:
-        res = requests.get(url)
-        res.raise_for_status()
-        data = res.json()
-        return [p[1] for p in data["prices"]]
+        return get_price_store().get_prices(coin_id, days)
     except requests.exceptions.RequestException as e:
         st.error(f"Error fetching historical prices for {coin_id}: {e}")
         return None
 
-def calculate_cagr_and_volatility(prices):
-    try:
-        returns = [np.log(prices[i+1] / prices[i]) for i in range(len(prices)-1)]
-        if not returns:
-            return None, None, None
-        avg_daily_return = np.mean(returns)
-        daily_volatility = np.std(returns)
-        trading_days = 365
-        annual_return = np.exp(avg_daily_return * trading_days) - 1
-        annual_volatility = daily_volatility * np.sqrt(trading_days)
-        conservative_return = annual_return * 0.5
-        return annual_return, annual_volatility, conservative_return
-    except Exception as e:
-        st.error(f"Error calculating CAGR and Volatility: {e}")
-        return None, None, None
+@get_cache().memoize("tokenomics")
+def run_monte_carlo_projection(coin_id, investment_amount, history_days, method="bootstrap"):
+    prices = fetch_historical_prices(coin_id, history_days)
+    if prices is None or len(prices) < 3:
+        return None
+    # Half the historical drift, matching the conservative CAGR used elsewhere on this page
+    return simulate_projection(prices, investment_amount, horizon_days=365, n_paths=100_000,
+                               method=method, drift_scale=0.5)
 
-@st.cache_data(ttl=300)
+@get_cache().memoize("tokenomics", ttl=3600)
+def get_ranked_universe():
+    return load_ranked_universe()
+
+@get_cache().memoize("tokenomics")
 def suggest_similar_tokens(user_input):
     try:
         res = requests.get("https://api.coingecko.com/api/v3/coins/list")
@@ -63,37 +68,23 @@ def suggest_similar_tokens(user_input):
         st.error(f"Error suggesting similar tokens: {e}")
         return []
 
-@st.cache_data(ttl=300)
-def fetch_token_data(coin_id, investment_amount=1000):
-    url = f"https://api.coingecko.com/api/v3/coins/{coin_id.lower().strip()}"
+@get_cache().memoize("tokenomics")
+def fetch_token_data(coin_id, investment_amount=1000, history_days=DEFAULT_HISTORY_DAYS):
     try:
-        res = requests.get(url)
-        res.raise_for_status()
-        data = res.json()
-        market = data["market_data"]
-
-        circulating = market.get("circulating_supply", 0)
-        total = market.get("total_supply", 0)
-        price = market.get("current_price", {}).get("usd", 0)
-        mcap = market.get("market_cap", {}).get("usd", 0)
-        
-        fdv = total * price if total else 0
-        circ_percent = (circulating / total) * 100 if total else None
-        fdv_mcap_ratio = (fdv / mcap) if mcap and mcap != 0 else None
+        # Shared with the AI Chat tools, so coins discussed there are already cached
+        metrics = get_market_data().token_metrics(coin_id, history_days)
+        price, mcap, fdv = metrics["price"], metrics["mcap"], metrics["fdv"]
+        circulating, total = metrics["circulating"], metrics["total"]
+        circ_percent, fdv_mcap_ratio = metrics["circ_percent"], metrics["fdv_mcap_ratio"]
+        cagr, volatility, conservative_cagr = metrics["cagr"], metrics["volatility"], metrics["conservative_cagr"]
 
         healthy = "✅ This coin seems healthy!" if circ_percent and circ_percent > 50 and fdv_mcap_ratio and fdv_mcap_ratio < 2 else "⚠️ Warning: This coin might be risky or inflated."
 
-        prices = fetch_historical_prices(coin_id)
-        if not prices or len(prices) < 2:
-            cagr, volatility, conservative_cagr = None, None, None
-        else:
-            cagr, volatility, conservative_cagr = calculate_cagr_and_volatility(prices)
-
         expected_yearly_return = investment_amount * conservative_cagr if conservative_cagr is not None else 0
         expected_monthly_return = expected_yearly_return / 12
 
         return {
-            "Coin Name & Symbol": f"{data['name']} ({data['symbol'].upper()})",
+            "Coin Name & Symbol": f"{metrics['name']} ({metrics['symbol']})",
             "Current Price ($)": f"${price:,.6f}",
             "Market Cap (B)": f"${mcap / 1e9:,.2f}B — The value of all coins in the market",
             "Total Supply (M)": f"{total / 1e6:,.2f}M — Maximum possible number of coins",
@@ -144,13 +135,39 @@ with st.sidebar:
         help="How much are you planning to invest?"
     )
     
+    # Price history depth
+    history_days = st.selectbox(
+        "Price History",
+        [365, 730, 1095, 1825],
+        index=0,
+        format_func=lambda d: f"{d // 365} year{'s' if d > 365 else ''}",
+        help="How much daily price history to use for CAGR and volatility"
+    )
+    
     st.markdown("---")
     
     # Analyze button
     if st.button("🔍 Analyze Token", type="primary"):
         st.session_state.run_tokenomics = True
+        st.session_state.run_portfolio = False
         st.session_state.current_coin = coin_input.lower().strip()
         st.session_state.investment_amt = investment_amount
+        st.session_state.history_days = history_days
+    
+    st.markdown("---")
+    
+    # Portfolio mode
+    with st.expander("📂 Portfolio Mode"):
+        holdings_input = st.text_area(
+            "Holdings (coin: USD value)",
+            value="bitcoin: 5000\nethereum: 3000\nsolana: 1000",
+            help="One holding per line, using CoinGecko IDs"
+        )
+        if st.button("🧮 Analyze Portfolio"):
+            st.session_state.run_portfolio = True
+            st.session_state.run_tokenomics = False
+            st.session_state.holdings = parse_holdings(holdings_input)
+            st.session_state.history_days = history_days
     
     st.markdown("---")
     
@@ -179,14 +196,103 @@ with st.sidebar:
     """)
 
 # Main analysis section
-if st.session_state.get("run_tokenomics", False):
+if st.session_state.get("run_portfolio", False):
+    holdings = st.session_state.get("holdings", {})
+    history_days = st.session_state.get("history_days", DEFAULT_HISTORY_DAYS)
+    
+    if not holdings:
+        st.error("❌ No holdings found. Use one line per coin, e.g. 'bitcoin: 5000'.")
+    else:
+        with st.spinner(f"Analyzing portfolio of {len(holdings)} coins..."):
+            engine = get_portfolio_engine(history_days)
+            failed = engine.sync_from_store(get_price_store(), list(holdings))
+            report = engine.analyze(holdings)
+        
+        for coin, reason in failed.items():
+            st.warning(f"⚠️ Skipped '{coin}': {reason}")
+        
+        if "error" in report:
+            st.error(f"❌ {report['error']}")
+        else:
+            st.success(f"✅ Portfolio analysis completed for {len(report['coins'])} coins")
+            
+            var_95 = report["risk"][0.95]
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                st.metric("Portfolio Value", f"${report['total_value']:,.2f}")
+            
+            with col2:
+                st.metric("Annual Volatility", f"{report['annual_volatility'] * 100:.1f}%")
+            
+            with col3:
+                st.metric(
+                    "1-Day VaR (95%)",
+                    f"${var_95['var']:,.2f}",
+                    help="On 95% of days, losses should not be larger than this"
+                )
+            
+            with col4:
+                st.metric(
+                    "1-Day CVaR (95%)",
+                    f"${var_95['cvar']:,.2f}",
+                    help="Average loss on the worst 5% of days"
+                )
+            
+            st.markdown("### ⚖️ Risk Contributions")
+            st.dataframe(
+                pd.DataFrame([
+                    {
+                        "Coin": a["coin_id"],
+                        "Value ($)": round(a["value"], 2),
+                        "Weight %": round(a["weight"] * 100, 1),
+                        "Annual Return %": round(a["annual_return"] * 100, 1),
+                        "Annual Volatility %": round(a["annual_volatility"] * 100, 1),
+                        "Share of Risk %": round(a["risk_contribution_pct"] * 100, 1)
+                    }
+                    for a in report["assets"]
+                ]),
+                use_container_width=True,
+                hide_index=True
+            )
+            
+            st.markdown("### 🔗 Correlations")
+            st.dataframe(
+                pd.DataFrame(report["correlation"], index=report["coins"], columns=report["coins"]).round(2),
+                use_container_width=True
+            )
+            
+            st.markdown("### 📉 Value at Risk")
+            st.dataframe(
+                pd.DataFrame([
+                    {
+                        "Confidence": f"{level * 100:.0f}%",
+                        "VaR (normal)": f"${r['var']:,.2f}",
+                        "CVaR (normal)": f"${r['cvar']:,.2f}",
+                        "VaR (historical)": f"${r['historical_var']:,.2f}",
+                        "CVaR (historical)": f"${r['historical_cvar']:,.2f}"
+                    }
+                    for level, r in report["risk"].items()
+                ]),
+                use_container_width=True,
+                hide_index=True
+            )
+            
+            st.caption(
+                f"Diversification ratio: {report['diversification_ratio']:.2f} "
+                f"(higher means holdings offset each other more). "
+                f"Covariance shrinkage: {report['shrinkage'] * 100:.0f}%."
+            )
+
+elif st.session_state.get("run_tokenomics", False):
     coin_id = st.session_state.current_coin
     investment = st.session_state.investment_amt
+    history_days = st.session_state.get("history_days", DEFAULT_HISTORY_DAYS)
     
     with st.spinner(f"Analyzing {coin_id.upper()}..."):
         try:
             # Fetch token data
-            token_data = fetch_token_data(coin_id, investment)
+            token_data = fetch_token_data(coin_id, investment, history_days)
             
             if token_data is None:
                 st.error(f"❌ Could not find data for '{coin_id}'. Please check the spelling.")
@@ -205,7 +311,15 @@ if st.session_state.get("run_tokenomics", False):
                 # Display results
                 st.success(f"✅ Analysis completed for {token_data['Coin Name & Symbol']}")
                 
+                history_depth = get_price_store().history_depth(coin_id)
+                if history_depth is not None and history_depth < history_days:
+                    st.info(
+                        f"ℹ️ Only {history_depth} days of price history are available for this coin "
+                        f"(you asked for {history_days}); returns, volatility and projections use what there is."
+                    )
+                
                 raw = token_data["raw_data"]
+                scored = get_scoring_pipeline().run(pd.DataFrame([raw])).iloc[0]
                 
                 # Overview metrics
                 col1, col2, col3, col4 = st.columns(4)
@@ -265,18 +379,75 @@ if st.session_state.get("run_tokenomics", False):
                             f"{raw['conservative_cagr'] * 100:.2f}%"
                         )
                     
+                    # Monte Carlo projection
+                    st.markdown("### 🎲 Monte Carlo Projection (1 Year)")
+                    
+                    method_labels = {
+                        "bootstrap": "Historical replay",
+                        "gbm": "Normal returns (GBM)",
+                        "student_t": "Fat-tailed returns (Student-t)"
+                    }
+                    mc_method = st.radio(
+                        "Simulation model",
+                        list(method_labels),
+                        format_func=method_labels.get,
+                        horizontal=True,
+                        help="How daily returns are generated for the 100,000 simulated price paths"
+                    )
+                    
+                    projection = run_monte_carlo_projection(coin_id, investment, history_days, mc_method)
+                    
+                    if projection:
+                        final = projection["final_value_percentiles"]
+                        mc_col1, mc_col2, mc_col3, mc_col4 = st.columns(4)
+                        
+                        with mc_col1:
+                            st.metric(
+                                "Median Value",
+                                f"${final[50]:,.2f}",
+                                f"{(final[50] / investment - 1) * 100:+.1f}%"
+                            )
+                        
+                        with mc_col2:
+                            st.metric("Likely Range (5%-95%)", f"${final[5]:,.0f} - ${final[95]:,.0f}")
+                        
+                        with mc_col3:
+                            st.metric("Chance of Loss", f"{projection['probability_of_loss'] * 100:.1f}%")
+                        
+                        with mc_col4:
+                            st.metric(
+                                "Typical Max Drawdown",
+                                f"{projection['max_drawdown_percentiles'][50] * 100:.1f}%",
+                                help="Median of the largest peak-to-trough drop along each simulated path"
+                            )
+                        
+                        bands = projection["percentile_bands"]
+                        band_df = pd.DataFrame(
+                            {
+                                "Pessimistic (5%)": bands[5],
+                                "Median": bands[50],
+                                "Optimistic (95%)": bands[95]
+                            },
+                            index=pd.Index(projection["checkpoint_days"], name="Day")
+                        )
+                        st.line_chart(band_df)
+                        st.caption(
+                            f"Based on {projection['n_paths']:,} simulated paths using half the historical "
+                            "average return. Simulations are not guarantees."
+                        )
+                    
                     # Risk assessment
                     st.markdown("### ⚖️ Risk Assessment")
                     
                     risk_factors = []
                     
-                    if raw['fdv_mcap_ratio'] and raw['fdv_mcap_ratio'] > 5:
+                    if scored['flag_high_fdv_ratio']:
                         risk_factors.append("🔴 **High FDV/MCap Ratio**: Large potential dilution from unlocked tokens")
                     
-                    if raw['circ_percent'] and raw['circ_percent'] < 50:
+                    if scored['flag_low_circulation']:
                         risk_factors.append("🟡 **Low Circulating Supply**: Many tokens still locked/unvested")
                     
-                    if raw['volatility'] and raw['volatility'] > 1:
+                    if scored['flag_high_volatility']:
                         risk_factors.append("🟡 **High Volatility**: Expect significant price swings")
                     
                     if not risk_factors:
@@ -350,41 +521,19 @@ if st.session_state.get("run_tokenomics", False):
                     else:
                         st.info("Historical performance data not available.")
                 
+                # Stored news that mentions this coin, straight from the news archive's symbol index
+                headlines = get_market_data().headlines(coin_id)
+                if headlines:
+                    st.markdown("### 📰 Related Headlines")
+                    for article in headlines:
+                        published = article['publishedAt'][:16].replace('T', ' ')
+                        st.markdown(f"- [{article['title']}]({article['url']}) — {article['source']['name']} • {published} UTC")
+                
                 # Investment recommendation
                 st.markdown("### 💡 Investment Recommendation")
                 
-                recommendation_score = 0
-                factors = []
-                
-                # Scoring based on various factors
-                if raw['fdv_mcap_ratio'] and raw['fdv_mcap_ratio'] < 2:
-                    recommendation_score += 2
-                    factors.append("✅ Low dilution risk")
-                elif raw['fdv_mcap_ratio'] and raw['fdv_mcap_ratio'] < 5:
-                    recommendation_score += 1
-                    factors.append("⚠️ Moderate dilution risk")
-                else:
-                    factors.append("❌ High dilution risk")
-                
-                if raw['circ_percent'] and raw['circ_percent'] > 70:
-                    recommendation_score += 2
-                    factors.append("✅ High token circulation")
-                elif raw['circ_percent'] and raw['circ_percent'] > 50:
-                    recommendation_score += 1
-                    factors.append("⚠️ Moderate token circulation")
-                else:
-                    factors.append("❌ Low token circulation")
-                
-                if raw['conservative_cagr'] and raw['conservative_cagr'] > 0.5:
-                    recommendation_score += 2
-                    factors.append("✅ Strong historical performance")
-                elif raw['conservative_cagr'] and raw['conservative_cagr'] > 0.2:
-                    recommendation_score += 1
-                    factors.append("⚠️ Moderate historical performance")
-                elif raw['conservative_cagr'] and raw['conservative_cagr'] > 0:
-                    factors.append("⚠️ Weak historical performance")
-                else:
-                    factors.append("❌ Negative historical performance")
+                recommendation_score = scored['recommendation_score']
+                factors = [scored['dilution_factor'], scored['circulation_factor'], scored['performance_factor']]
                 
                 # Final recommendation
                 if recommendation_score >= 5:
@@ -418,6 +567,23 @@ else:
     # Default view
     st.info("👆 Enter a cryptocurrency name in the sidebar and click 'Analyze Token' to get started!")
     
+    # Nightly ranked universe (built by `python scoring_module.py`)
+    universe = get_ranked_universe()
+    if universe is not None and not universe.empty:
+        st.markdown("### 🏆 Top Ranked Coins")
+        top = universe.head(10)
+        st.dataframe(
+            pd.DataFrame({
+                "Rank": top["rank"],
+                "Coin": top["name"] + " (" + top["symbol"] + ")",
+                "Score": top["recommendation_score"],
+                "Recommendation": top["recommendation"],
+                "Risk Flags": top["risk_flag_count"]
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+    
     st.markdown("""
     ### 🎯 How to Use Tokenomics Analysis
     
@@ -430,8 +596,10 @@ else:
     - **Supply Metrics**: Total supply, circulating supply, and percentages
     - **Market Data**: Price, market cap, and FDV information
     - **Investment Projections**: Expected monthly and yearly returns
+    - **Monte Carlo Projection**: Range of outcomes, chance of loss and drawdowns from simulated price paths
     - **Risk Assessment**: Identification of potential risk factors
     - **Investment Recommendation**: Overall buy/hold/avoid recommendation
+    - **Portfolio Mode**: Volatility, VaR/CVaR, correlations and risk contributions across your holdings
     
     ### 🔍 Key Things to Look For
     
@@ -1,7 +1,8 @@
 import streamlit as st
-import requests
-import os
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from market_data_module import get_market_data
+from news_module import today_utc, unique_stories
+from sentiment_module import SENTIMENT_EMOJI, sentiment_label
 
 st.set_page_config(
     page_title="Market News - Nunno AI",
@@ -18,68 +19,50 @@ if not st.session_state.get("profile_setup", False):
         st.switch_page("app.py")
     st.stop()
 
-# API Key
-NEWS_API_KEY = os.getenv("NEWS_API_KEY", "b3dfc15d73704bfab32ebb96b5c9885b")
+# Articles drawn per section on first render; "Show more" adds a page inside the section's fragment
+NEWS_VISIBLE_ARTICLES = 5
+NEWS_PAGE_ARTICLES = 5
 
 st.title("📰 Market News")
 st.markdown(f"Stay updated with the latest financial news, {st.session_state.user_name}")
 
-@st.cache_data(ttl=600)  # Cache for 10 minutes
-def fetch_market_news():
-    """Fetch latest market news"""
-    url = "https://newsapi.org/v2/everything"
-    today = datetime.now().strftime("%Y-%m-%d")
-    params = {
-        "q": "finance OR stock market OR bitcoin OR federal reserve OR inflation OR interest rates",
-        "from": today,
-        "sortBy": "publishedAt",
-        "language": "en",
-        "apiKey": NEWS_API_KEY,
-        "pageSize": 20,
-        "domains": "cnbc.com, bloomberg.com, reuters.com, wsj.com, marketwatch.com, yahoo.com"
-    }
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        articles = response.json().get("articles", [])
-        return articles
-    except Exception as e:
-        st.error(f"Error fetching market news: {e}")
-        return []
-
-@st.cache_data(ttl=600)
-def fetch_crypto_news():
-    """Fetch crypto-specific news"""
-    url = "https://newsapi.org/v2/everything"
-    today = datetime.now().strftime("%Y-%m-%d")
-    params = {
-        "q": "bitcoin OR ethereum OR cryptocurrency OR crypto OR blockchain OR DeFi",
-        "from": today,
-        "sortBy": "publishedAt",
-        "language": "en",
-        "apiKey": NEWS_API_KEY,
-        "pageSize": 20,
-        "domains": "coindesk.com, cointelegraph.com, decrypt.co, crypto.news"
-    }
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        articles = response.json().get("articles", [])
-        return articles
-    except Exception as e:
-        st.error(f"Error fetching crypto news: {e}")
-        return []
-
-def display_articles(articles, title):
-    """Display articles in a nice format"""
+def fetch_news(topics):
+    """Today's stories per topic from the local news store, one article per near-duplicate cluster.
+
+    Due topics are polled for new articles first, all at once; the store keeps
+    serving what it has when NewsAPI fails.
+    """
+    news_feed = get_market_data().news_feed
+    for topic, error in news_feed.poll_all(topics).items():
+        st.error(f"Error fetching {topic} news: {error}")
+    return {topic: unique_stories(news_feed.store.latest(topic, 20, today_utc())) for topic in topics}
+
+def article_image(article):
+    """Local thumbnail of an article's image; the publisher's URL until it has been downloaded"""
+    return get_market_data().news_feed.thumbnails.path(article['urlToImage']) or article['urlToImage']
+
+def shown_articles(key, available):
+    """How many of a section's `available` articles to draw; "Show more" pages on without rerunning the page"""
+    shown = min(available, st.session_state.get(f"news_shown_{key}", NEWS_VISIBLE_ARTICLES))
+    if shown < available and st.button(f"⬇️ Show more ({available - shown} more)", key=f"news_more_{key}"):
+        st.session_state[f"news_shown_{key}"] = shown + NEWS_PAGE_ARTICLES
+        st.rerun(scope="fragment")
+    return shown
+
+@st.fragment
+def display_articles(articles, title, key, limit=10, empty_message="No recent articles found."):
+    """Display articles in a nice format, a page at a time"""
     if not articles:
-        st.info("No recent articles found.")
+        st.info(empty_message)
         return
     
     st.subheader(title)
     
-    for i, article in enumerate(articles[:10]):  # Show top 10 articles
-        with st.container():
+    # Drawn above the button so "Show more" stays at the end of the list
+    articles_box = st.container()
+    shown = shown_articles(key, min(limit, len(articles)))
+    for i, article in enumerate(articles[:shown]):
+        with articles_box.container():
             col1, col2 = st.columns([3, 1])
             
             with col1:
@@ -92,7 +75,8 @@ def display_articles(articles, title):
                 published_at = datetime.fromisoformat(article['publishedAt'].replace('Z', '+00:00'))
                 formatted_time = published_at.strftime('%Y-%m-%d %H:%M UTC')
                 
-                st.markdown(f"📰 **{article['source']['name']}** • 🕒 {formatted_time}")
+                mood = SENTIMENT_EMOJI[sentiment_label(article['sentiment'])]
+                st.markdown(f"📰 **{article['source']['name']}** • 🕒 {formatted_time} • {mood}")
                 
                 # Read more link
                 if article.get('url'):
@@ -102,7 +86,7 @@ def display_articles(articles, title):
                 # Article image if available
                 if article.get('urlToImage'):
                     try:
-                        st.image(article['urlToImage'], width=200)
+                        st.image(article_image(article), width=200)
                     except:
                         st.markdown("🖼️ *Image unavailable*")
                 else:
@@ -110,6 +94,48 @@ def display_articles(articles, title):
             
             st.markdown("---")
 
+@st.fragment
+def display_mixed(articles, limit=15):
+    """Mixed view as collapsed expanders, a page at a time"""
+    news_tagger = get_market_data().news_feed.store.tagger
+    articles_box = st.container()
+    shown = shown_articles("mixed", min(limit, len(articles)))
+    for i, article in enumerate(articles[:shown]):
+        with articles_box.expander(f"📰 {article['title'][:100]}{'...' if len(article['title']) > 100 else ''}"):
+            col1, col2 = st.columns([3, 1])
+            
+            with col1:
+                if article.get('description'):
+                    st.markdown(f"**Description:** {article['description']}")
+                
+                # Source and date
+                published_at = datetime.fromisoformat(article['publishedAt'].replace('Z', '+00:00'))
+                formatted_time = published_at.strftime('%Y-%m-%d %H:%M UTC')
+                
+                st.markdown(f"📰 **Source:** {article['source']['name']}")
+                st.markdown(f"🕒 **Published:** {formatted_time}")
+                label = sentiment_label(article['sentiment'])
+                st.markdown(f"{SENTIMENT_EMOJI[label]} **Sentiment:** {label.title()}")
+                
+                # Category tag, from the feed and the coins tagged at ingest
+                is_crypto = article['topic'] == "crypto" or bool(article['symbols'])
+                category_tag = "₿ Cryptocurrency" if is_crypto else "📈 Market"
+                st.markdown(f"🏷️ **Category:** {category_tag}")
+                if article['symbols']:
+                    tickers = ", ".join(news_tagger.ticker(coin_id) for coin_id in article['symbols'])
+                    st.markdown(f"🪙 **Mentions:** {tickers}")
+                
+                # Read more link
+                if article.get('url'):
+                    st.markdown(f"[📖 Read Full Article]({article['url']})")
+            
+            with col2:
+                if article.get('urlToImage'):
+                    try:
+                        st.image(article_image(article), width=200)
+                    except:
+                        st.markdown("🖼️ *Image unavailable*")
+
 # Sidebar controls
 with st.sidebar:
     st.markdown("### 📰 News Settings")
@@ -123,7 +149,7 @@ with st.sidebar:
     
     # Refresh button
     if st.button("🔄 Refresh News", type="primary"):
-        st.cache_data.clear()
+        get_market_data().clear("news")
         st.rerun()
     
     st.markdown("---")
@@ -163,15 +189,50 @@ with st.sidebar:
     """)
 
 # Main content
+topics = []
 if news_category in ["General Market", "Both"]:
-    with st.spinner("Fetching latest market news..."):
-        market_articles = fetch_market_news()
-        display_articles(market_articles, "📈 Latest Market News")
-
+    topics.append("market")
 if news_category in ["Cryptocurrency", "Both"]:
-    with st.spinner("Fetching latest crypto news..."):
-        crypto_articles = fetch_crypto_news()
-        display_articles(crypto_articles, "₿ Latest Crypto News")
+    topics.append("crypto")
+
+# Archive search: served from the local full-text index, without spending NewsAPI quota
+st.subheader("🔎 Search the News Archive")
+news_store = get_market_data().news_feed.store
+oldest, _ = news_store.date_range()
+today = datetime.now(timezone.utc).date()
+first_day = min(today, datetime.fromisoformat(oldest[:10]).date()) if oldest else today
+default_range = (max(first_day, today - timedelta(days=7)), today)
+
+search_col, date_col = st.columns([2, 1])
+with search_col:
+    search_query = st.text_input("Search headlines", placeholder="e.g. bitcoin ETF, interest rates")
+with date_col:
+    date_range = st.date_input("Published between (UTC)", value=default_range, min_value=first_day, max_value=today)
+
+if search_query or tuple(date_range) != default_range:
+    since, until = date_range[0], date_range[-1]  # Only one date while the range is being picked
+    found = news_store.search(search_query, topic=topics[0] if len(topics) == 1 else None,
+                              since=since, until=until, limit=50)
+    results = unique_stories(found)
+    display_articles(
+        results,
+        f"🗄️ {len(results)}{'+' if len(found) == 50 else ''} archived stories from {since} to {until}",
+        key=f"archive:{search_query}:{since}:{until}",
+        limit=50,
+        empty_message="No archived articles match this search.",
+    )
+    st.markdown("---")
+
+with st.spinner("Fetching latest news..."):
+    news = fetch_news(topics)
+
+if "market" in news:
+    market_articles = news["market"]
+    display_articles(market_articles, "📈 Latest Market News", key="market")
+
+if "crypto" in news:
+    crypto_articles = news["crypto"]
+    display_articles(crypto_articles, "₿ Latest Crypto News", key="crypto")
 
 if news_category == "Both":
     # Combine and sort by date for mixed view
@@ -187,48 +248,8 @@ if news_category == "Both":
     # Sort by publication date
     all_articles.sort(key=lambda x: x['publishedAt'], reverse=True)
     
-    # Remove duplicates based on title
-    seen_titles = set()
-    unique_articles = []
-    for article in all_articles:
-        if article['title'] not in seen_titles:
-            unique_articles.append(article)
-            seen_titles.add(article['title'])
-    
-    if unique_articles:
-        for i, article in enumerate(unique_articles[:15]):
-            with st.expander(f"📰 {article['title'][:100]}{'...' if len(article['title']) > 100 else ''}"):
-                col1, col2 = st.columns([3, 1])
-                
-                with col1:
-                    if article.get('description'):
-                        st.markdown(f"**Description:** {article['description']}")
-                    
-                    # Source and date
-                    published_at = datetime.fromisoformat(article['publishedAt'].replace('Z', '+00:00'))
-                    formatted_time = published_at.strftime('%Y-%m-%d %H:%M UTC')
-                    
-                    st.markdown(f"📰 **Source:** {article['source']['name']}")
-                    st.markdown(f"🕒 **Published:** {formatted_time}")
-                    
-                    # Category tag
-                    is_crypto = any(keyword in article['title'].lower() or 
-                                  (article.get('description', '').lower() if article.get('description') else False)
-                                  for keyword in ['bitcoin', 'ethereum', 'crypto', 'blockchain', 'defi'])
-                    
-                    category_tag = "₿ Cryptocurrency" if is_crypto else "📈 Market"
-                    st.markdown(f"🏷️ **Category:** {category_tag}")
-                    
-                    # Read more link
-                    if article.get('url'):
-                        st.markdown(f"[📖 Read Full Article]({article['url']})")
-                
-                with col2:
-                    if article.get('urlToImage'):
-                        try:
-                            st.image(article['urlToImage'], width=200)
-                        except:
-                            st.markdown("🖼️ *Image unavailable*")
+    # Keep one article per story; syndicated copies and reworded headlines share a cluster
+    display_mixed(unique_stories(all_articles))
 
 # Quick news summary
 st.markdown("---")
@@ -247,6 +268,18 @@ with col3:
                     (len(crypto_articles) if 'crypto_articles' in locals() else 0)
     st.metric("Total Articles", total_articles)
 
+# Market mood, from the sentiment aggregated at ingest (one vote per story)
+mood = get_market_data().mood(days=1)
+if mood['topics'] or mood['coins']:
+    st.markdown("#### 🌡️ Market Mood Today")
+    mood_columns = st.columns(len(mood['topics']) + len(mood['coins']))
+    entries = [(topic.title(), stats) for topic, stats in mood['topics'].items()] + \
+              [(get_market_data().news_feed.store.tagger.ticker(coin_id), stats) for coin_id, stats in mood['coins']]
+    for column, (name, stats) in zip(mood_columns, entries):
+        with column:
+            st.metric(f"{SENTIMENT_EMOJI[sentiment_label(stats['score'])]} {name}", f"{stats['score']:+.2f}",
+                      help=f"{stats['articles']} stories: {stats['positive']} positive, {stats['negative']} negative")
+
 # Tips section
 st.markdown("---")
 st.markdown("""
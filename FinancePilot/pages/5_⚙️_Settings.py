@@ -1,5 +1,8 @@
 import streamlit as st
 import os
+from cache_module import get_cache
+from conversation_store_module import get_conversation_store
+from market_data_module import get_market_data
 
 st.set_page_config(
     page_title="Settings - Nunno AI",
@@ -117,7 +120,7 @@ with st.container():
     
     with col1:
         st.markdown("#### 💬 Chat History")
-        history_count = len(st.session_state.get("conversation_history", [])) - 1  # Exclude system message
+        history_count = st.session_state.get("history_offset", 0) + len(st.session_state.get("conversation_history", [])) - 1  # Exclude system message
         st.markdown(f"**Messages stored:** {history_count}")
         
         if st.button("🗑️ Clear Chat History", type="secondary"):
@@ -125,15 +128,43 @@ with st.container():
                 # Keep only the system message
                 system_msg = st.session_state.conversation_history[0] if st.session_state.conversation_history else None
                 st.session_state.conversation_history = [system_msg] if system_msg else []
+                if st.session_state.get("conversation_id"):
+                    get_conversation_store().delete(st.session_state.conversation_id)
+                st.session_state.pop("conversation_id", None)  # AI Chat starts a fresh conversation
+                st.session_state.history_offset = 0
                 st.success("Chat history cleared!")
                 st.rerun()
     
     with col2:
         st.markdown("#### 🧹 Cache Management")
-        st.markdown("**Cached data:** API responses and analysis results")
+        st.markdown("**Cached data:** API responses and analysis results, shared by all sessions")
         
+        # Per-namespace usage of the process-wide cache layer
+        cache = get_cache()
+        if cache.remote is not None:
+            st.caption(f"Shared across replicas via {cache.remote.host}:{cache.remote.port} (memory shown is the local tier)")
+        cache_stats = cache.stats()
+        st.dataframe(
+            [
+                {
+                    "Cache": name,
+                    "Entries": stats["entries"],
+                    "Memory (MB)": round(stats["bytes"] / 1024 / 1024, 2),
+                    "Budget (MB)": round(stats["max_bytes"] / 1024 / 1024),
+                    "TTL (s)": stats["ttl_seconds"],
+                    "Hits": stats["hits"],
+                    "Misses": stats["misses"],
+                    "Hit Rate": f"{stats['hit_rate']:.0%}",
+                }
+                for name, stats in cache_stats.items()
+            ],
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        namespace = st.selectbox("Cache to clear", ["All"] + list(cache_stats))
         if st.button("🔄 Clear Cache", type="secondary"):
-            st.cache_data.clear()
+            get_market_data().clear(None if namespace == "All" else namespace)
             st.success("Cache cleared!")
 
 # App Information
@@ -198,7 +229,7 @@ with st.container():
                 del st.session_state[key]
             
             # Clear cache
-            st.cache_data.clear()
+            get_market_data().clear()
             
             st.success("Application reset! Please refresh the page.")
 
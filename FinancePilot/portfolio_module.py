@@ -0,0 +1,265 @@
+import re
+import threading
+from statistics import NormalDist
+
+import numpy as np
+import requests
+
+from price_history_module import DEFAULT_HISTORY_DAYS, SECONDS_PER_DAY
+
+TRADING_DAYS = 365  # Crypto trades every day, same convention as calculate_cagr_and_volatility
+
+
+class PortfolioRiskEngine:
+    """Covariance-based risk for a basket of coins.
+
+    Daily price histories ([day, price] rows, as kept by PriceHistoryStore) are
+    aligned onto a shared day grid and turned into log returns. The engine keeps
+    the centered returns and their cross-product matrices, so when one coin's
+    history changes only that coin's row/column is recomputed (O(T * N) instead
+    of O(T * N^2)). Covariances are Ledoit-Wolf shrunk towards a scaled identity,
+    which keeps them well conditioned with 200+ assets and a year of data.
+    """
+
+    def __init__(self, history_days=DEFAULT_HISTORY_DAYS, trading_days=TRADING_DAYS):
+        self.history_days = history_days
+        self.trading_days = trading_days
+        self.coin_ids = []
+        self._lock = threading.RLock()  # One engine is shared by all Streamlit sessions
+        self._index = {}
+        self._histories = {}
+        self._grid = None
+        self._returns = np.empty((history_days, 0))
+        self._centered = np.empty((history_days, 0))
+        self._centered_sq = np.empty((history_days, 0))
+        self._cross = np.empty((0, 0))     # X^T X of centered returns
+        self._cross_sq = np.empty((0, 0))  # (X^2)^T (X^2), needed for the shrinkage intensity
+
+    def _set_grid(self, end_day):
+        self._grid = end_day - np.arange(self.history_days, -1, -1) * SECONDS_PER_DAY
+
+    def _align(self, history):
+        """Log returns of a [day, price] history on the engine's day grid"""
+        days, prices = history[:, 0], history[:, 1]
+        idx = np.searchsorted(days, self._grid, side="right") - 1
+        # Forward-fill missing days; days before the coin existed count as flat
+        aligned = np.where(idx >= 0, prices[np.clip(idx, 0, None)], np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.diff(np.log(aligned))
+        return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def _rebuild(self):
+        columns = [self._align(self._histories[coin_id]) for coin_id in self.coin_ids]
+        self._returns = np.column_stack(columns) if columns else np.empty((self.history_days, 0))
+        self._centered = self._returns - self._returns.mean(axis=0)
+        self._centered_sq = self._centered ** 2
+        self._cross = self._centered.T @ self._centered
+        self._cross_sq = self._centered_sq.T @ self._centered_sq
+
+    def _set_column(self, i, column, is_new):
+        centered = column - column.mean()
+        centered_sq = centered ** 2
+        if is_new:
+            self._returns = np.column_stack([self._returns, column])
+            self._centered = np.column_stack([self._centered, centered])
+            self._centered_sq = np.column_stack([self._centered_sq, centered_sq])
+            self._cross = np.pad(self._cross, ((0, 1), (0, 1)))
+            self._cross_sq = np.pad(self._cross_sq, ((0, 1), (0, 1)))
+        else:
+            self._returns[:, i] = column
+            self._centered[:, i] = centered
+            self._centered_sq[:, i] = centered_sq
+
+        row = centered @ self._centered
+        self._cross[i, :] = row
+        self._cross[:, i] = row
+        row_sq = centered_sq @ self._centered_sq
+        self._cross_sq[i, :] = row_sq
+        self._cross_sq[:, i] = row_sq
+
+    def update_asset(self, coin_id, history):
+        """Add or refresh one coin from its (N, 2) [day, price] history"""
+        history = np.array(history, dtype=np.float64)
+        if history.ndim != 2 or len(history) < 2:
+            raise ValueError(f"Not enough price history for {coin_id}")
+
+        with self._lock:
+            self._update_asset(coin_id, history)
+
+    def _update_asset(self, coin_id, history):
+        is_new = coin_id not in self._index
+        if is_new:
+            self._index[coin_id] = len(self.coin_ids)
+            self.coin_ids.append(coin_id)
+        self._histories[coin_id] = history
+
+        if self._grid is None or history[-1, 0] > self._grid[-1]:
+            # A new day rolled in: shift the shared grid and recompute everything once
+            self._set_grid(history[-1, 0])
+            self._rebuild()
+        else:
+            self._set_column(self._index[coin_id], self._align(history), is_new)
+
+    def remove_asset(self, coin_id):
+        with self._lock:
+            self._remove_asset(coin_id)
+
+    def _remove_asset(self, coin_id):
+        i = self._index.pop(coin_id)
+        self.coin_ids.pop(i)
+        del self._histories[coin_id]
+        self._index = {c: j for j, c in enumerate(self.coin_ids)}
+        self._returns = np.delete(self._returns, i, axis=1)
+        self._centered = np.delete(self._centered, i, axis=1)
+        self._centered_sq = np.delete(self._centered_sq, i, axis=1)
+        self._cross = np.delete(np.delete(self._cross, i, axis=0), i, axis=1)
+        self._cross_sq = np.delete(np.delete(self._cross_sq, i, axis=0), i, axis=1)
+
+    def sync_from_store(self, store, coin_ids):
+        """Pull histories from a PriceHistoryStore, updating only coins whose data changed.
+
+        Returns a {coin_id: error message} dict for coins that could not be loaded.
+        """
+        failed = {}
+        for coin_id in coin_ids:
+            try:
+                history = store.sync(coin_id, self.history_days)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                failed[coin_id] = str(e)
+                continue
+            if history is None or len(history) < 2:
+                failed[coin_id] = "Not enough price history"
+                continue
+            known = self._histories.get(coin_id)
+            if known is not None and len(known) == len(history) and np.array_equal(known[-1], history[-1]):
+                continue
+            self.update_asset(coin_id, history)
+        return failed
+
+    def _subset(self, idx):
+        """Cross-product matrices over the assets at `idx` (all tracked assets when None)"""
+        if idx is None:
+            return self._cross, self._cross_sq
+        return self._cross[np.ix_(idx, idx)], self._cross_sq[np.ix_(idx, idx)]
+
+    def shrinkage_intensity(self, idx=None):
+        """Ledoit-Wolf intensity for shrinking towards mu * I (0 = sample, 1 = target).
+
+        Estimated over the assets at `idx` only, so a portfolio's numbers do not
+        depend on which other coins the shared engine happens to track.
+        """
+        cross, cross_sq = self._subset(idx)
+        n_obs, n_assets = self._centered.shape[0], len(cross)
+        if n_assets == 0:
+            return 0.0
+        sample = cross / n_obs
+        mu = np.trace(sample) / n_assets
+        sample_sq_sum = np.sum(sample ** 2)
+        delta = (sample_sq_sum - 2 * mu * np.trace(sample) + n_assets * mu ** 2) / n_assets
+        beta = (np.sum(cross_sq) / n_obs - sample_sq_sum) / (n_assets * n_obs)
+        if delta <= 0:
+            return 0.0
+        return float(np.clip(beta / delta, 0.0, 1.0))
+
+    def covariance(self, annualize=True, idx=None):
+        """Shrunk covariance matrix of daily log returns of the assets at `idx`, ordered like `coin_ids`"""
+        cross, _ = self._subset(idx)
+        n_obs, n_assets = self._centered.shape[0], len(cross)
+        sample = cross / n_obs
+        shrinkage = self.shrinkage_intensity(idx)
+        mu = np.trace(sample) / n_assets if n_assets else 0.0
+        cov = (1 - shrinkage) * sample + shrinkage * mu * np.eye(n_assets)
+        return cov * self.trading_days if annualize else cov
+
+    def correlation(self, idx=None):
+        cov = self.covariance(annualize=False, idx=idx)
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = cov / np.outer(std, std)
+        return np.nan_to_num(corr)
+
+    def analyze(self, holdings, confidence_levels=(0.95, 0.99), horizon_days=1):
+        """Portfolio risk report for {coin_id: position value in USD}"""
+        with self._lock:
+            return self._analyze(holdings, confidence_levels, horizon_days)
+
+    def _analyze(self, holdings, confidence_levels, horizon_days):
+        tracked = [c for c in holdings if c in self._index and holdings[c] > 0]
+        missing = [c for c in holdings if c not in self._index]
+        if not tracked:
+            return {"error": "No price history available for any holding"}
+
+        idx = np.array([self._index[c] for c in tracked])
+        values = np.array([float(holdings[c]) for c in tracked])
+        total = values.sum()
+        weights = values / total
+
+        # Estimated over the holdings alone, not every coin the shared engine tracks
+        cov = self.covariance(annualize=False, idx=idx)
+        returns = self._returns[:, idx]
+        mean_returns = returns.mean(axis=0)
+
+        port_var = weights @ cov @ weights
+        port_sigma = np.sqrt(port_var)
+        port_mu = weights @ mean_returns
+
+        # Parametric (normal) VaR/CVaR and historical-simulation VaR/CVaR, both over the horizon
+        mu_h = port_mu * horizon_days
+        sigma_h = port_sigma * np.sqrt(horizon_days)
+        hist_returns = np.expm1(returns @ weights)
+        risk = {}
+        for level in confidence_levels:
+            z = NormalDist().inv_cdf(level)
+            cutoff = np.quantile(hist_returns, 1 - level)
+            tail = hist_returns[hist_returns <= cutoff]
+            risk[level] = {
+                "var": float((z * sigma_h - mu_h) * total),
+                "cvar": float((sigma_h * NormalDist().pdf(z) / (1 - level) - mu_h) * total),
+                "historical_var": float(-cutoff * total),
+                "historical_cvar": float(-tail.mean() * total) if tail.size else float(-cutoff * total),
+            }
+
+        # Euler decomposition: contributions add up to total portfolio volatility
+        marginal = cov @ weights / port_sigma if port_sigma > 0 else np.zeros_like(weights)
+        component = weights * marginal
+        annual_factor = np.sqrt(self.trading_days)
+        asset_vols = returns.std(axis=0)
+
+        assets = []
+        for j, coin_id in enumerate(tracked):
+            assets.append({
+                "coin_id": coin_id,
+                "value": float(values[j]),
+                "weight": float(weights[j]),
+                "annual_return": float(np.exp(mean_returns[j] * self.trading_days) - 1),
+                "annual_volatility": float(asset_vols[j] * annual_factor),
+                "marginal_risk": float(marginal[j] * annual_factor),
+                "risk_contribution": float(component[j] * annual_factor),
+                "risk_contribution_pct": float(component[j] / port_sigma) if port_sigma > 0 else 0.0,
+            })
+
+        corr = self.correlation(idx)
+        return {
+            "total_value": float(total),
+            "coins": tracked,
+            "missing": missing,
+            "horizon_days": horizon_days,
+            "annual_return": float(np.exp(port_mu * self.trading_days) - 1),
+            "annual_volatility": float(port_sigma * annual_factor),
+            "diversification_ratio": float(weights @ asset_vols / port_sigma) if port_sigma > 0 else 1.0,
+            "shrinkage": self.shrinkage_intensity(idx),
+            "risk": risk,
+            "assets": assets,
+            "correlation": corr,
+        }
+
+
+def parse_holdings(text):
+    """Parse "coin_id: amount" lines (also "coin_id amount" / "coin_id=amount") into a dict"""
+    holdings = {}
+    for line in text.splitlines():
+        match = re.match(r"^\s*([a-z0-9._-]+)\s*[:=,]?\s*\$?([\d,]+(?:\.\d+)?)\s*$", line.lower())
+        if match:
+            coin_id = match.group(1)
+            holdings[coin_id] = holdings.get(coin_id, 0.0) + float(match.group(2).replace(",", ""))
+    return holdings
@@ -0,0 +1,180 @@
+import os
+import json
+import re
+import threading
+import time
+
+import numpy as np
+import requests
+
+# Where the local price history lives (one small .npy file per coin)
+DATA_DIR = os.getenv("NUNNO_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+DEFAULT_HISTORY_DAYS = int(os.getenv("NUNNO_HISTORY_DAYS", "365"))
+
+MARKET_CHART_URL = "https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart"
+PUBLIC_API_MAX_DAYS = 365  # Deeper ranges need a paid CoinGecko plan
+# CoinGecko answers a too-deep public request with error_code 10012, "exceeds the allowed time range"
+RANGE_LIMIT_STATUSES = (400, 401, 403, 422)
+RANGE_LIMIT_ERROR = re.compile(r"\b10012\b|time range|past 365 days", re.IGNORECASE)
+SECONDS_PER_DAY = 86400
+
+
+def _is_range_limit(response):
+    """True if an error response is the free-tier history depth limit"""
+    if response is None or response.status_code not in RANGE_LIMIT_STATUSES:
+        return False
+    try:
+        return bool(RANGE_LIMIT_ERROR.search(response.text or ""))
+    except Exception:
+        return False
+
+
+class PriceHistoryStore:
+    """Daily USD close history per coin, persisted locally and topped up incrementally.
+
+    Each coin is stored as an (N, 2) float64 array of [day_start_unix_seconds, price]
+    in ``<data_dir>/prices/<coin_id>.npy`` and read back memory-mapped, so repeated
+    analyses of the same coin are local reads. Only the missing tail (usually just
+    today) is requested from CoinGecko. The metadata keeps the deepest range asked
+    for (`requested`) apart from the days actually stored (`depth`), which is less
+    for young coins and when the public API caps the range at a year.
+    """
+
+    def __init__(self, data_dir=None, refresh_seconds=300, timeout=10):
+        self.data_dir = os.path.join(data_dir or DATA_DIR, "prices")
+        self.refresh_seconds = refresh_seconds  # How often today's (still moving) price is refreshed
+        self.timeout = timeout
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(self.data_dir, exist_ok=True)
+
+    def _paths(self, coin_id):
+        safe_id = re.sub(r"[^a-z0-9._-]", "_", coin_id.lower().strip())
+        base = os.path.join(self.data_dir, safe_id)
+        return base + ".npy", base + ".json"
+
+    def _lock_for(self, coin_id):
+        with self._locks_guard:
+            return self._locks.setdefault(coin_id, threading.Lock())
+
+    def load(self, coin_id):
+        """Return the stored (N, 2) history as a read-only memory map, or None"""
+        data_path, _ = self._paths(coin_id)
+        if not os.path.exists(data_path):
+            return None
+        try:
+            return np.load(data_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+
+    def _load_meta(self, coin_id):
+        _, meta_path = self._paths(coin_id)
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def history_depth(self, coin_id):
+        """Days of history stored for a coin, or None if it has never been synced"""
+        return self._load_meta(coin_id.lower().strip()).get("depth")
+
+    def _save(self, coin_id, history, meta):
+        data_path, meta_path = self._paths(coin_id)
+        # Write to temp files and swap in, so readers never see a half-written file
+        tmp_data = data_path + ".tmp.npy"
+        np.save(tmp_data, np.ascontiguousarray(history, dtype=np.float64))
+        os.replace(tmp_data, data_path)
+        tmp_meta = meta_path + ".tmp"
+        with open(tmp_meta, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, meta_path)
+
+    def fetch_remote(self, coin_id, days):
+        """Fetch `days` of daily prices from CoinGecko as an (N, 2) array"""
+        url = MARKET_CHART_URL.format(coin_id=coin_id)
+        params = {"vs_currency": "usd", "days": int(days), "interval": "daily"}
+        res = requests.get(url, params=params, timeout=self.timeout)
+        res.raise_for_status()
+        points = np.asarray(res.json().get("prices", []), dtype=np.float64).reshape(-1, 2)
+        if points.size == 0:
+            return points
+        days_col = np.floor(points[:, 0] / 1000 / SECONDS_PER_DAY) * SECONDS_PER_DAY
+        return _last_per_day(np.column_stack([days_col, points[:, 1]]))
+
+    def _fetch_with_fallback(self, coin_id, days):
+        try:
+            return self.fetch_remote(coin_id, days)
+        except requests.exceptions.HTTPError as e:
+            # The public API rejects ranges deeper than a year; fall back and let the
+            # local store grow past 365 days as new days are appended. Anything else
+            # (rate limits, server errors) must propagate, or the shallow fallback would
+            # be recorded as the requested depth and never re-fetched.
+            if days <= PUBLIC_API_MAX_DAYS or not _is_range_limit(e.response):
+                raise
+            return self.fetch_remote(coin_id, PUBLIC_API_MAX_DAYS)
+
+    def sync(self, coin_id, days=DEFAULT_HISTORY_DAYS):
+        """Bring the local history up to date and return it"""
+        coin_id = coin_id.lower().strip()
+        with self._lock_for(coin_id):
+            history = self.load(coin_id)
+            meta = self._load_meta(coin_id)
+            now = time.time()
+            today = np.floor(now / SECONDS_PER_DAY) * SECONDS_PER_DAY
+
+            if history is None or len(history) == 0 or meta.get("requested", meta.get("depth", 0)) < days:
+                fetch_days = days
+            elif history[-1, 0] < today:
+                # Only the days since the last stored one (+1 to finalise that day's close)
+                fetch_days = int((today - history[-1, 0]) / SECONDS_PER_DAY) + 1
+            elif now - meta.get("updated", 0) > self.refresh_seconds:
+                fetch_days = 1
+            else:
+                return history
+
+            try:
+                fresh = self._fetch_with_fallback(coin_id, fetch_days)
+            except requests.exceptions.RequestException:
+                if history is not None and len(history):
+                    return history  # Serve stale local data rather than nothing
+                raise
+
+            merged = fresh if history is None else _last_per_day(np.concatenate([history, fresh]))
+            meta = {
+                # Not retried at the same range when the API served less (fallback or a young coin)
+                "requested": max(days, meta.get("requested", meta.get("depth", 0))),
+                "depth": int((today - merged[0, 0]) // SECONDS_PER_DAY) if len(merged) else 0,
+                "updated": now,
+            }
+            self._save(coin_id, merged, meta)
+            return self.load(coin_id)
+
+    def get_prices(self, coin_id, days=DEFAULT_HISTORY_DAYS):
+        """Return up to `days` + 1 daily prices (oldest first) as a float64 array"""
+        history = self.sync(coin_id, days)
+        if history is None or len(history) == 0:
+            return np.empty(0, dtype=np.float64)
+        return np.asarray(history[-(int(days) + 1):, 1])
+
+
+def _last_per_day(rows):
+    """Sort rows by day and keep the last price seen for each day"""
+    if len(rows) == 0:
+        return rows
+    rows = rows[np.argsort(rows[:, 0], kind="stable")]
+    keep = np.append(rows[1:, 0] != rows[:-1, 0], True)
+    return rows[keep]
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_price_store():
+    """Shared process-wide store instance"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = PriceHistoryStore()
+        return _default_store
@@ -0,0 +1,115 @@
+import numpy as np
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+MAX_CHUNK_BYTES = 64 * 1024 * 1024  # Upper bound on the per-chunk working set
+MODEL_POOL_SIZE = 1 << 16  # Fits uint16 indices
+
+
+def fit_return_model(prices, method="bootstrap"):
+    """Fit a daily log-return model to a price history.
+
+    `method` is one of "bootstrap" (resample historical returns), "gbm" (normal
+    log returns) or "student_t" (fat-tailed log returns, df fitted from kurtosis).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    returns = np.diff(np.log(prices[prices > 0]))
+    returns = returns[np.isfinite(returns)]
+    if returns.size < 2:
+        raise ValueError("Need at least 3 valid prices to fit a return model")
+
+    model = {
+        "method": method,
+        "mu": float(returns.mean()),
+        "sigma": float(returns.std(ddof=1)),
+    }
+    if method == "bootstrap":
+        model["returns"] = returns
+    elif method == "student_t":
+        excess_kurtosis = float(((returns - model["mu"]) ** 4).mean() / model["sigma"] ** 4 - 3)
+        # Method of moments: excess kurtosis = 6 / (df - 4); clamp to sensible tails
+        df = 6 / excess_kurtosis + 4 if excess_kurtosis > 0 else 30.0
+        model["df"] = float(np.clip(df, 2.5, 30.0))
+    elif method != "gbm":
+        raise ValueError(f"Unknown projection method: {method}")
+    return model
+
+
+def _return_pool(model, rng, drift_scale):
+    """Build the pool of daily log returns that paths are sampled from.
+
+    Parametric models are represented by MODEL_POOL_SIZE draws from the fitted
+    distribution, so every method shares the same cheap gather in the hot loop.
+    Every path samples the same pool, so its sample mean and spread would bias all
+    of them alike: the draws are standardised to exactly the target mean and sigma.
+    """
+    mu, sigma = model["mu"], model["sigma"]
+    if model["method"] == "bootstrap":
+        pool = model["returns"] - mu
+    else:
+        if model["method"] == "student_t":
+            draws = rng.standard_t(model["df"], size=MODEL_POOL_SIZE)
+        else:
+            draws = rng.standard_normal(size=MODEL_POOL_SIZE)
+        pool = (draws - draws.mean()) * (sigma / draws.std())
+    return (pool + mu * drift_scale).astype(np.float32)
+
+
+def simulate_projection(prices, investment=1000, horizon_days=365, n_paths=100_000,
+                        method="bootstrap", drift_scale=1.0, checkpoint_every=30,
+                        percentiles=DEFAULT_PERCENTILES, chunk_paths=None, seed=None):
+    """Monte Carlo projection of an investment over `horizon_days`.
+
+    Paths are simulated in chunks of whole paths, so memory stays bounded by
+    MAX_CHUNK_BYTES no matter how many paths are requested. Only values at the
+    checkpoints, final values and max drawdowns are kept per path.
+
+    `drift_scale` scales the historical mean return (0.5 mirrors the page's
+    conservative 50% CAGR).
+    """
+    model = fit_return_model(prices, method)
+    rng = np.random.default_rng(seed)
+
+    checkpoints = np.unique(np.append(np.arange(checkpoint_every, horizon_days, checkpoint_every), horizon_days))
+    if chunk_paths is None:
+        # A few float32 buffers of (chunk, horizon) are alive at once
+        chunk_paths = max(1, MAX_CHUNK_BYTES // (horizon_days * 4 * 3))
+
+    checkpoint_values = np.empty((n_paths, checkpoints.size), dtype=np.float32)
+    max_drawdowns = np.empty(n_paths, dtype=np.float32)
+
+    pool = _return_pool(model, rng, drift_scale)
+    index_dtype = np.uint16 if pool.size <= MODEL_POOL_SIZE else np.int64
+
+    for start in range(0, n_paths, chunk_paths):
+        stop = min(start + chunk_paths, n_paths)
+        log_paths = pool[rng.integers(0, pool.size, size=(stop - start, horizon_days), dtype=index_dtype)]
+        np.cumsum(log_paths, axis=1, out=log_paths)
+
+        checkpoint_values[start:stop] = log_paths[:, checkpoints - 1]
+
+        # Drawdown in log space: distance below the running peak (starting value included)
+        peaks = np.maximum.accumulate(log_paths, axis=1)
+        np.maximum(peaks, 0, out=peaks)
+        np.subtract(log_paths, peaks, out=peaks)
+        max_drawdowns[start:stop] = peaks.min(axis=1)
+
+    checkpoint_values = investment * np.exp(checkpoint_values, dtype=np.float64)
+    max_drawdowns = 1 - np.exp(max_drawdowns, dtype=np.float64)
+    final_values = checkpoint_values[:, -1]
+
+    bands = np.percentile(checkpoint_values, percentiles, axis=0)
+    return {
+        "method": method,
+        "n_paths": int(n_paths),
+        "horizon_days": int(horizon_days),
+        "investment": float(investment),
+        "checkpoint_days": checkpoints.tolist(),
+        "percentile_bands": {p: band.tolist() for p, band in zip(percentiles, bands)},
+        "final_value_percentiles": {p: float(v) for p, v in zip(percentiles, bands[:, -1])},
+        "expected_final_value": float(final_values.mean()),
+        "probability_of_loss": float((final_values < investment).mean()),
+        "max_drawdown_percentiles": {
+            p: float(v) for p, v in zip(percentiles, np.percentile(max_drawdowns, percentiles))
+        },
+        "expected_max_drawdown": float(max_drawdowns.mean()),
+    }
@@ -0,0 +1,591 @@
+import os
+import sys
+import hmac
+import json
+import time
+import zlib
+import base64
+import queue
+import socket
+import pickle
+import fnmatch
+import hashlib
+import threading
+import socketserver
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+
+from cache_module import TTLCache, MB
+from frame_store_module import freeze_frame
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+LOCAL_TTL_SECONDS = 5  # In front of the shared cache; bounds how stale another replica's invalidation can leave us
+COMPRESS_MIN_BYTES = 1024
+KEY_PREFIX = "nunno"
+RETRY_AFTER_SECONDS = 5  # The server is skipped this long after a connection error
+# Shared by the replicas; lets values with no Arrow or JSON form be shared as signed pickles
+CACHE_SECRET = os.getenv("NUNNO_CACHE_SECRET", "").encode()
+SIGNATURE_BYTES = hashlib.sha256().digest_size
+
+
+class RedisError(Exception):
+    """Error reply from the server"""
+
+
+# --- Value serialization --------------------------------------------------
+#
+# Whoever can write to the cache server must not be able to run code on the
+# replicas, so values read back are never unpickled unless they carry a valid
+# HMAC: DataFrames travel as Arrow IPC and plain data as tagged JSON.
+
+def dumps(value, secret=CACHE_SECRET):
+    """Bytes for a cached value; the first byte tags the format.
+
+    DataFrames are Arrow IPC ("A"); dicts, lists, tuples, scalars, numeric numpy
+    arrays, Series and timestamps are tagged JSON ("J", or "Z" when zlib-compressed
+    past a kilobyte). Anything else is pickled and HMAC-signed ("S") when a
+    `secret` is configured; without one TypeError is raised and the value stays
+    in the replica's local tier.
+    """
+    try:
+        if isinstance(value, pd.DataFrame):
+            return b"A" + _arrow_bytes(value)
+        data = json.dumps(_encode(value), separators=(",", ":")).encode()
+        if len(data) >= COMPRESS_MIN_BYTES:
+            return b"Z" + zlib.compress(data, 1)
+        return b"J" + data
+    except (TypeError, ValueError) as e:
+        if not secret:
+            raise TypeError(f"No shared-cache encoding for {type(value).__name__}: {e}") from e
+    data = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 1)
+    return b"S" + hmac.new(secret, data, hashlib.sha256).digest() + data
+
+
+def loads(data, secret=CACHE_SECRET):
+    """Value from `dumps`; numeric DataFrames come back read-only, like the ones cached in process.
+
+    Raises ValueError for unknown formats and for pickles without a valid signature.
+    """
+    kind, payload = data[:1], data[1:]
+    if kind == b"A":
+        value = _arrow_frame(payload)
+    elif kind in (b"J", b"Z"):
+        value = _decode(json.loads(zlib.decompress(payload) if kind == b"Z" else payload))
+    elif kind == b"S":
+        digest, payload = payload[:SIGNATURE_BYTES], payload[SIGNATURE_BYTES:]
+        if not secret or not hmac.compare_digest(digest, hmac.new(secret, payload, hashlib.sha256).digest()):
+            raise ValueError("Refusing a cached pickle without a valid signature")
+        value = pickle.loads(zlib.decompress(payload))
+    else:
+        raise ValueError(f"Unknown cached value format {kind!r}")
+    return freeze_frame(value) if isinstance(value, pd.DataFrame) else value
+
+
+def _arrow_bytes(frame):
+    if pa is None:
+        raise TypeError("pyarrow is not installed")
+    if not all(isinstance(column, str) for column in frame.columns):
+        raise TypeError("Arrow only round-trips string column names")
+    try:
+        table = pa.Table.from_pandas(frame, preserve_index=True)
+        codec = "zstd" if pa.Codec.is_available("zstd") else None
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema, options=pa.ipc.IpcWriteOptions(compression=codec)) as writer:
+            writer.write_table(table)
+    except pa.ArrowException as e:
+        raise TypeError(f"Frame has no Arrow form: {e}") from e  # Mixed object columns and the like
+    return sink.getvalue().to_pybytes()
+
+
+def _arrow_frame(data):
+    if pa is None:
+        raise ValueError("Arrow-encoded value but pyarrow is not installed")
+    try:
+        return pa.ipc.open_stream(data).read_all().to_pandas()
+    except pa.ArrowException as e:
+        raise ValueError(f"Corrupt Arrow value: {e}") from e
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def _encode(value):
+    """JSON-ready form of plain data. Values JSON cannot express as they are (tuples,
+    non-string keys, arrays, frames, ...) become one-key dicts tagged with "~"."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic) and value.dtype.kind in "biuf":
+        return value.item()
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, tuple):
+        return {"~t": [_encode(item) for item in value]}
+    if isinstance(value, dict):
+        if all(isinstance(key, str) and not key.startswith("~") for key in value):
+            return {key: _encode(item) for key, item in value.items()}
+        return {"~d": [[_encode(key), _encode(item)] for key, item in value.items()]}
+    if isinstance(value, np.ndarray) and value.dtype.kind in "biuf":
+        return {"~a": [value.dtype.str, list(value.shape), _b64(np.ascontiguousarray(value).tobytes())]}
+    if isinstance(value, pd.Timestamp):
+        return {"~ts": value.isoformat()}
+    if isinstance(value, pd.DataFrame):
+        return {"~f": _b64(_arrow_bytes(value))}
+    if isinstance(value, pd.Series):
+        return {"~s": [_encode(value.name), _b64(_arrow_bytes(value.to_frame("~")))]}
+    if isinstance(value, bytes):
+        return {"~b": _b64(value)}
+    raise TypeError(f"{type(value).__name__} values have no JSON form")
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if len(value) == 1:
+        tag, body = next(iter(value.items()))
+        if tag == "~t":
+            return tuple(_decode(item) for item in body)
+        if tag == "~d":
+            return {_decode(key): _decode(item) for key, item in body}
+        if tag == "~a":
+            dtype, shape, data = body
+            if np.dtype(dtype).kind not in "biuf":
+                raise ValueError(f"Unexpected array dtype {dtype!r}")
+            return np.frombuffer(base64.b64decode(data), dtype=dtype).reshape(shape)
+        if tag == "~ts":
+            return pd.Timestamp(body)
+        if tag == "~f":
+            return freeze_frame(_arrow_frame(base64.b64decode(body)))
+        if tag == "~s":
+            name, data = body
+            return _arrow_frame(base64.b64decode(data))["~"].rename(_decode(name))
+        if tag == "~b":
+            return base64.b64decode(body)
+    return {key: _decode(item) for key, item in value.items()}
+
+
+# --- RESP client ------------------------------------------------------------
+
+def encode_command(*args):
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif isinstance(arg, (int, float)):
+            arg = str(arg).encode()
+        out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(out)
+
+
+def read_reply(stream):
+    """One RESP2 reply from a buffered binary stream; error replies are returned as RedisError"""
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("Connection closed by the cache server")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        return RedisError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError("Truncated reply from the cache server")
+        return data[:-2]
+    if kind == b"*":
+        length = int(rest)
+        return None if length < 0 else [read_reply(stream) for _ in range(length)]
+    raise ConnectionError(f"Malformed reply from the cache server: {line!r}")
+
+
+class RespClient:
+    """Minimal thread-safe client for Redis-protocol servers (Redis, Valkey, KeyDB or `MiniRedisServer`).
+
+    Connections are pooled; one that fails is dropped and a ConnectionError (or
+    OSError) raised, so the caller can carry on without the shared cache. After
+    such an error the server is skipped for `retry_after` seconds: calls fail
+    at once instead of each waiting out a timeout against a server that is down.
+    """
+
+    def __init__(self, url="redis://127.0.0.1:6379/0", timeout=1.0, max_idle=8, retry_after=RETRY_AFTER_SECONDS):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.strip("/") or 0)
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._retry_at = 0.0
+        self._idle = queue.LifoQueue(max_idle)
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection = (sock, sock.makefile("rb"))
+            if self.password:
+                self._call(connection, "AUTH", self.password)
+            if self.db:
+                self._call(connection, "SELECT", self.db)
+        except RedisError as e:
+            _close(connection)
+            raise ConnectionError(f"Cache server rejected the connection: {e}") from e
+        except BaseException:
+            sock.close()
+            raise
+        return connection
+
+    @staticmethod
+    def _call(connection, *args):
+        sock, stream = connection
+        sock.sendall(encode_command(*args))
+        reply = read_reply(stream)
+        if isinstance(reply, RedisError):
+            raise reply
+        return reply
+
+    def execute(self, *args):
+        if time.monotonic() < self._retry_at:
+            raise ConnectionError(f"Cache server {self.host}:{self.port} skipped after a recent error")
+        connection = None
+        try:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = self._connect()
+            reply = self._call(connection, *args)
+        except RedisError:
+            self._release(connection)  # An error reply; the connection itself is fine
+            raise
+        except (OSError, ConnectionError, ValueError) as e:
+            if connection is not None:
+                _close(connection)
+            self._retry_at = time.monotonic() + self.retry_after
+            if isinstance(e, ValueError):
+                raise ConnectionError(f"Malformed reply from the cache server: {e}") from e
+            raise
+        self._release(connection)
+        return reply
+
+    def _release(self, connection):
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            _close(connection)
+
+    def get(self, key):
+        return self.execute("GET", key)
+
+    def set(self, key, value, ttl_seconds=None):
+        if ttl_seconds:
+            return self.execute("SET", key, value, "PX", int(ttl_seconds * 1000))
+        return self.execute("SET", key, value)
+
+    def delete(self, *keys):
+        return self.execute("DEL", *keys) if keys else 0
+
+    def scan_iter(self, match="*", count=500):
+        cursor = b"0"
+        while True:
+            cursor, keys = self.execute("SCAN", cursor, "MATCH", match, "COUNT", count)
+            yield from keys
+            if cursor in (b"0", 0, "0"):
+                return
+
+    def ping(self):
+        return self.execute("PING") == "PONG"
+
+
+def _close(connection):
+    sock, stream = connection
+    stream.close()
+    sock.close()
+
+
+# --- Shared cache namespace ---------------------------------------------------
+
+class RemoteCache:
+    """A cache namespace stored on a Redis-protocol server shared by every replica.
+
+    Same interface as `TTLCache`. Values are serialized with `dumps` and stored
+    with the namespace's TTL; the server's own memory policy evicts them. Values
+    that `dumps` cannot encode safely stay local to the replica. A small
+    local TTLCache (a few seconds) in front absorbs repeated reads within one
+    rerun. When the server is unreachable the namespace degrades to the local
+    tier and counts the errors.
+    """
+
+    def __init__(self, client, name, ttl_seconds, max_bytes=64 * MB, local_ttl=LOCAL_TTL_SECONDS):
+        self.client = client
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.local = TTLCache(min(ttl_seconds, local_ttl), max_bytes, name)
+        self._lock = threading.Lock()
+        # remote_errors counts every failed call; remote_lookup_errors only the failed GETs
+        self._stats = {"remote_hits": 0, "remote_misses": 0, "remote_errors": 0, "remote_lookup_errors": 0,
+                       "remote_bytes_read": 0}
+        self._key_locks = {}
+
+    def _remote_key(self, key):
+        return f"{KEY_PREFIX}:{self.name}:{hashlib.sha1(repr(key).encode()).hexdigest()}"
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self._stats[counter] += amount
+
+    def _remote_get(self, key):
+        try:
+            data = self.client.get(self._remote_key(key))
+            if data is None:
+                self._count("remote_misses")
+                return False, None
+            value = loads(data)
+        except (OSError, ConnectionError, ValueError, RedisError, pickle.UnpicklingError, EOFError, zlib.error):
+            self._count("remote_errors")
+            self._count("remote_lookup_errors")
+            return False, None
+        self._count("remote_hits")
+        self._count("remote_bytes_read", len(data))
+        return True, value
+
+    def get(self, key, default=None):
+        found, value = self.local._lookup(key)
+        if not found:
+            found, value = self._remote_get(key)
+            if found:
+                self.local.put(key, value)
+        return value if found else default
+
+    def put(self, key, value, ttl=None):
+        ttl = self.ttl_seconds if ttl is None else ttl
+        self.local.put(key, value, min(ttl, self.local.ttl_seconds))
+        try:
+            data = dumps(value)
+        except (TypeError, ValueError, pickle.PicklingError, AttributeError):
+            return  # No safe shared form: only this replica keeps it
+        if len(data) > self.max_bytes:
+            return
+        try:
+            self.client.set(self._remote_key(key), data, ttl)
+        except (OSError, ConnectionError, ValueError, RedisError):
+            self._count("remote_errors")
+
+    def get_or_compute(self, key, compute, should_cache=None, ttl=None):
+        found, value = self.local._lookup(key)
+        if found:
+            return value
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            found, value = self.local._lookup(key, count=False)
+            if not found:
+                found, value = self._remote_get(key)
+                if found:
+                    self.local.put(key, value)
+            if found:
+                return value
+            try:
+                value = compute()
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+            if should_cache is None or should_cache(value):
+                self.put(key, value, ttl)
+            return value
+
+    def invalidate(self, key=None):
+        """Drop one key or the whole namespace, on the server for every replica"""
+        self.local.invalidate(key)
+        try:
+            if key is not None:
+                self.client.delete(self._remote_key(key))
+                return
+            batch = []
+            for remote_key in self.client.scan_iter(f"{KEY_PREFIX}:{self.name}:*"):
+                batch.append(remote_key)
+                if len(batch) >= 500:
+                    self.client.delete(*batch)
+                    batch = []
+            self.client.delete(*batch)
+        except (OSError, ConnectionError, ValueError, RedisError):
+            self._count("remote_errors")
+
+    clear = invalidate
+
+    def cache_stats(self):
+        """TTLCache stats of the local tier, with hits and misses counted across both tiers"""
+        stats = self.local.stats()
+        with self._lock:
+            stats.update(self._stats)
+        # A local miss that the server answered is a hit; writes and invalidations are not lookups
+        stats["hits"] += stats["remote_hits"]
+        stats["misses"] = stats["remote_misses"] + stats["remote_lookup_errors"]
+        lookups = stats["hits"] + stats["misses"]
+        stats.update(ttl_seconds=self.ttl_seconds, max_bytes=self.max_bytes,
+                     hit_rate=stats["hits"] / lookups if lookups else 0.0)
+        return stats
+
+    stats = cache_stats
+
+
+# --- In-process stand-in server -------------------------------------------------
+
+class MiniRedisServer:
+    """Tiny Redis-protocol server for development and tests.
+
+    Supports PING, ECHO, AUTH, SELECT, GET, SET (EX/PX), DEL, EXISTS, SCAN, DBSIZE,
+    FLUSHDB and INFO over one keyspace, with lazy expiry and least-recently-used
+    eviction beyond `max_bytes`, like Redis with `maxmemory-policy allkeys-lru`.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, max_bytes=256 * MB):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # key -> (value, expires_at or None)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.commands = 0
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    try:
+                        args = read_reply(self.rfile)
+                    except (ConnectionError, OSError, ValueError):
+                        return
+                    if not isinstance(args, list) or not args:
+                        return
+                    self.wfile.write(server._reply(server._dispatch(args)))
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"redis://{self.host}:{self.port}/0"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="nunno-mini-redis", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @staticmethod
+    def _reply(value):
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, RedisError):
+            return b"-%s\r\n" % str(value).encode()
+        if isinstance(value, str):
+            return b"+%s\r\n" % value.encode()
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, bytes):
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        return b"*%d\r\n" % len(value) + b"".join(MiniRedisServer._reply(item) for item in value)
+
+    def _live(self, key, now):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            self._remove(key)
+            return None
+        return entry
+
+    def _remove(self, key):
+        value, _ = self._data.pop(key)
+        self._bytes -= len(key) + len(value)
+
+    def _dispatch(self, args):
+        command = args[0].decode().upper()
+        now = time.time()
+        with self._lock:
+            self.commands += 1
+            if command == "PING":
+                return "PONG"
+            if command == "ECHO":
+                return args[1]
+            if command in ("AUTH", "SELECT"):
+                return "OK"
+            if command == "GET":
+                entry = self._live(args[1], now)
+                if entry is None:
+                    return None
+                self._data.move_to_end(args[1])
+                return entry[0]
+            if command == "SET":
+                key, value, expires_at = args[1], args[2], None
+                options = args[3:]
+                for option, amount in zip(options[::2], options[1::2]):
+                    option = option.decode().upper()
+                    if option == "EX":
+                        expires_at = now + int(amount)
+                    elif option == "PX":
+                        expires_at = now + int(amount) / 1000
+                    else:
+                        return RedisError(f"ERR unsupported SET option {option}")
+                if key in self._data:
+                    self._remove(key)
+                self._data[key] = (value, expires_at)
+                self._bytes += len(key) + len(value)
+                while self._bytes > self.max_bytes and self._data:
+                    self._remove(next(iter(self._data)))
+                return "OK"
+            if command in ("DEL", "UNLINK", "EXISTS"):
+                found = [key for key in args[1:] if self._live(key, now) is not None]
+                if command != "EXISTS":
+                    for key in found:
+                        self._remove(key)
+                return len(found)
+            if command == "SCAN":
+                pattern = "*"
+                options = args[2:]
+                for option, value in zip(options[::2], options[1::2]):
+                    if option.decode().upper() == "MATCH":
+                        pattern = value.decode()
+                # Single pass: the whole keyspace is returned with cursor 0
+                return [b"0", [key for key in list(self._data)
+                               if fnmatch.fnmatchcase(key.decode(), pattern) and self._live(key, now) is not None]]
+            if command == "DBSIZE":
+                return len(self._data)
+            if command == "FLUSHDB":
+                self._data.clear()
+                self._bytes = 0
+                return "OK"
+            if command == "INFO":
+                return f"# Memory\r\nused_memory:{self._bytes}\r\nmaxmemory:{self.max_bytes}\r\n" \
+                       f"# Keyspace\r\ndb0:keys={len(self._data)}\r\n".encode()
+            return RedisError(f"ERR unknown command '{command}'")
+
+
+if __name__ == "__main__":
+    # Stand-in shared cache for local multi-replica testing:
+    #   python remote_cache_module.py 6379  then  NUNNO_CACHE_URL=redis://127.0.0.1:6379/0 streamlit run app.py
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 6379
+    mini = MiniRedisServer(port=port).start()
+    print(f"Serving a Redis-compatible cache on {mini.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mini.close()
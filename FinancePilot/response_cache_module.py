@@ -0,0 +1,170 @@
+import re
+import time
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+EMBEDDING_DIM = 1 << 12
+
+# Words that change the phrasing of a question but not what is being asked
+STOP_WORDS = frozenset(
+    "a an and are can could do does for how i im is it me my of on please s should so tell the "
+    "to what whats work works would you".split()
+)
+
+
+def normalize_question(text):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+def content_words(text):
+    """Words of a normalised question that carry meaning, light plural stemming"""
+    return frozenset(w[:-1] if len(w) > 3 and w.endswith("s") else w
+                     for w in text.split() if w not in STOP_WORDS)
+
+
+def persona_key(*parts):
+    """Stable key for the parts of the system prompt that change the answer"""
+    return hashlib.sha1("\x1f".join(str(p) for p in parts).encode()).hexdigest()
+
+
+def embed(text, dim=EMBEDDING_DIM):
+    """Hashed bag of words and character trigrams, L2-normalised.
+
+    Cheap and local, but enough to match rewordings like "How to start investing?"
+    and "How do I start investing?".
+    """
+    normalized = normalize_question(text)
+    features = normalized.split()
+    padded = f" {normalized} "
+    features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+    vector = np.zeros(dim, dtype=np.float32)
+    if not features:
+        return vector
+    indices = np.fromiter((zlib.crc32(f.encode()) % dim for f in features), dtype=np.int64, count=len(features))
+    np.add.at(vector, indices, 1.0)
+    return vector / np.linalg.norm(vector)
+
+
+class ResponseCache:
+    """LRU + TTL cache of AI answers keyed by persona and question.
+
+    Lookups try an exact match on the normalised question first, then a cosine
+    similarity search over the embeddings of all cached questions for the same
+    persona (one matrix-vector product). Similar candidates must also have the
+    same content words, so "Explain RSI" never returns the answer for "Explain MACD".
+    """
+
+    def __init__(self, max_entries=1000, ttl_seconds=24 * 3600, similarity_threshold=0.7, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()  # (persona, normalized question) -> entry
+        self._vectors = np.zeros((max_entries, EMBEDDING_DIM), dtype=np.float32)
+        self._slot_keys = [None] * max_entries
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._bytes = 0  # Answer text held, UTF-8 encoded
+        self._lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "similar_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry["size"]
+        self._vectors[entry["slot"]] = 0
+        self._slot_keys[entry["slot"]] = None
+        self._free_slots.append(entry["slot"])
+
+    def _expired(self, entry, now):
+        return now - entry["created"] > self.ttl_seconds
+
+    def get(self, persona, question):
+        """Return a cached answer or None"""
+        normalized = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            key = (persona, normalized)
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                self._drop(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats["exact_hits"] += 1
+                return entry["answer"]
+
+            if self._entries:
+                words = content_words(normalized)
+                scores = self._vectors @ embed(normalized)
+                for slot in np.argsort(scores)[::-1]:
+                    if scores[slot] < self.similarity_threshold:
+                        break
+                    candidate_key = self._slot_keys[slot]
+                    if candidate_key is None or candidate_key[0] != persona:
+                        continue
+                    candidate = self._entries[candidate_key]
+                    if candidate["words"] != words:
+                        continue
+                    if self._expired(candidate, now):
+                        self._drop(candidate_key)
+                        continue
+                    self._entries.move_to_end(candidate_key)
+                    self.stats["similar_hits"] += 1
+                    return candidate["answer"]
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, persona, question, answer):
+        normalized = normalize_question(question)
+        if not normalized or not answer:
+            return
+        key = (persona, normalized)
+        vector = embed(normalized)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            size = len(answer.encode())
+            while not self._free_slots or (self.max_bytes and self._entries and self._bytes + size > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+            slot = self._free_slots.pop()
+            self._vectors[slot] = vector
+            self._slot_keys[slot] = key
+            self._entries[key] = {"answer": answer, "created": time.time(), "slot": slot,
+                                  "words": content_words(normalized), "size": size}
+            self._bytes += size
+            self.stats["stores"] += 1
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["exact_hits"] + stats["similar_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["exact_hits"] + stats["similar_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def cache_stats(self):
+        """Metrics in the cache layer's per-namespace form; bytes include the embedding matrix"""
+        metrics = self.metrics()
+        with self._lock:
+            held = self._bytes + self._vectors.nbytes
+        return {
+            "hits": metrics["exact_hits"] + metrics["similar_hits"],
+            "misses": metrics["misses"],
+            "hit_rate": metrics["hit_rate"],
+            "evictions": metrics["evictions"],
+            "entries": metrics["entries"],
+            "bytes": held,
+            "max_bytes": (self.max_bytes or 0) + self._vectors.nbytes,
+            "ttl_seconds": self.ttl_seconds,
+        }
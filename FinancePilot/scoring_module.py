@@ -0,0 +1,200 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import requests
+
+from price_history_module import DATA_DIR
+
+METRIC_COLUMNS = ["fdv_mcap_ratio", "circ_percent", "conservative_cagr", "volatility"]
+RANKED_UNIVERSE_PATH = os.path.join(DATA_DIR, "ranked_universe.pkl")
+MARKETS_URL = "https://api.coingecko.com/api/v3/coins/markets"
+
+
+def _present(series):
+    """Mirror the page's `raw[x] and ...` checks: missing and zero values don't count"""
+    return series.notna() & (series != 0)
+
+
+def score_coins(metrics):
+    """Score a table of coin metrics in one vectorized pass.
+
+    `metrics` needs the columns in METRIC_COLUMNS (volatility may be missing);
+    any other columns (coin_id, name, ...) are carried through. Returns a copy with
+    per-factor points and labels, the total `recommendation_score`, a
+    `recommendation` tier and boolean risk flags.
+    """
+    df = metrics.copy()
+    for column in METRIC_COLUMNS:
+        if column not in df:
+            df[column] = np.nan
+        df[column] = pd.to_numeric(df[column], errors="coerce")
+
+    fdv = df["fdv_mcap_ratio"]
+    circ = df["circ_percent"]
+    cagr = df["conservative_cagr"]
+    vol = df["volatility"]
+    has_fdv, has_circ, has_cagr, has_vol = _present(fdv), _present(circ), _present(cagr), _present(vol)
+
+    # Dilution: FDV/MCap < 2 is healthy, < 5 is tolerable
+    dilution = [has_fdv & (fdv < 2), has_fdv & (fdv < 5)]
+    df["dilution_points"] = np.select(dilution, [2, 1], 0)
+    df["dilution_factor"] = np.select(
+        dilution, ["✅ Low dilution risk", "⚠️ Moderate dilution risk"], "❌ High dilution risk"
+    )
+
+    # Circulation: more than 70% of supply circulating is healthy, 50% tolerable
+    circulation = [has_circ & (circ > 70), has_circ & (circ > 50)]
+    df["circulation_points"] = np.select(circulation, [2, 1], 0)
+    df["circulation_factor"] = np.select(
+        circulation, ["✅ High token circulation", "⚠️ Moderate token circulation"], "❌ Low token circulation"
+    )
+
+    # Performance: conservative (50%) CAGR
+    performance = [has_cagr & (cagr > 0.5), has_cagr & (cagr > 0.2), has_cagr & (cagr > 0)]
+    df["performance_points"] = np.select(performance, [2, 1, 0], 0)
+    df["performance_factor"] = np.select(
+        performance,
+        ["✅ Strong historical performance", "⚠️ Moderate historical performance", "⚠️ Weak historical performance"],
+        "❌ Negative historical performance",
+    )
+
+    df["recommendation_score"] = df["dilution_points"] + df["circulation_points"] + df["performance_points"]
+    df["recommendation"] = np.select(
+        [df["recommendation_score"] >= 5, df["recommendation_score"] >= 3],
+        ["STRONG BUY", "MODERATE BUY"],
+        "CAUTIOUS",
+    )
+
+    df["flag_high_fdv_ratio"] = has_fdv & (fdv > 5)
+    df["flag_low_circulation"] = has_circ & (circ < 50)
+    df["flag_high_volatility"] = has_vol & (vol > 1)
+    df["risk_flag_count"] = df[["flag_high_fdv_ratio", "flag_low_circulation", "flag_high_volatility"]].sum(axis=1)
+    df["healthy"] = has_circ & (circ > 50) & has_fdv & (fdv < 2)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["risk_return_ratio"] = np.where(has_vol & has_cagr, cagr / vol, np.nan)
+    return df
+
+
+def rank_coins(scored):
+    """Order scored coins best first: score, then fewest risk flags, then risk-adjusted return"""
+    ranked = scored.sort_values(
+        ["recommendation_score", "risk_flag_count", "risk_return_ratio", "conservative_cagr"],
+        ascending=[False, True, False, False],
+        na_position="last",
+        kind="stable",
+    ).reset_index(drop=True)
+    ranked.insert(0, "rank", np.arange(1, len(ranked) + 1))
+    return ranked
+
+
+class ScoringPipeline:
+    """Scores metric tables, caching results by a hash of the input snapshot.
+
+    Results are shared between callers, who must not mutate them.
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def snapshot_key(metrics):
+        digest = hashlib.sha1(pd.util.hash_pandas_object(metrics, index=True).values.tobytes())
+        digest.update(",".join(map(str, metrics.columns)).encode())
+        return digest.hexdigest()
+
+    def run(self, metrics):
+        """Score and rank `metrics`, reusing the cached result for an identical snapshot"""
+        key = self.snapshot_key(metrics)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        ranked = rank_coins(score_coins(metrics))
+        with self._lock:
+            self._cache[key] = ranked
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return ranked
+
+
+_default_pipeline = None
+_default_lock = threading.Lock()
+
+
+def get_scoring_pipeline():
+    """Shared process-wide pipeline, used by the Tokenomics page, the chat tools and the nightly job"""
+    global _default_pipeline
+    with _default_lock:
+        if _default_pipeline is None:
+            _default_pipeline = ScoringPipeline()
+        return _default_pipeline
+
+
+def fetch_market_metrics(pages=4, per_page=250, timeout=10):
+    """Build a metrics table for the top `pages * per_page` coins by market cap"""
+    rows = []
+    for page in range(1, pages + 1):
+        params = {
+            "vs_currency": "usd",
+            "order": "market_cap_desc",
+            "per_page": per_page,
+            "page": page,
+            "price_change_percentage": "1y",
+        }
+        res = requests.get(MARKETS_URL, params=params, timeout=timeout)
+        res.raise_for_status()
+        rows.extend(res.json())
+
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return df
+    for column in ["market_cap", "fully_diluted_valuation", "circulating_supply", "total_supply",
+                   "price_change_percentage_1y_in_currency"]:
+        if column not in df:
+            df[column] = np.nan
+        df[column] = pd.to_numeric(df[column], errors="coerce")
+
+    total = df["total_supply"].where(df["total_supply"] > 0)
+    mcap = df["market_cap"].where(df["market_cap"] > 0)
+    annual_return = df["price_change_percentage_1y_in_currency"] / 100
+    return pd.DataFrame({
+        "coin_id": df["id"],
+        "name": df["name"],
+        "symbol": df["symbol"].str.upper(),
+        "price": df["current_price"],
+        "mcap": df["market_cap"],
+        "fdv_mcap_ratio": df["fully_diluted_valuation"] / mcap,
+        "circ_percent": df["circulating_supply"] / total * 100,
+        "cagr": annual_return,
+        "conservative_cagr": annual_return * 0.5,
+        "volatility": np.nan,  # Not available from the markets endpoint
+    })
+
+
+def build_ranked_universe(path=RANKED_UNIVERSE_PATH, pages=4):
+    """Nightly job: fetch metrics for the market, score them and persist the ranking"""
+    ranked = get_scoring_pipeline().run(fetch_market_metrics(pages=pages))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    ranked.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+    return ranked
+
+
+def load_ranked_universe(path=RANKED_UNIVERSE_PATH):
+    """Latest persisted ranking, or None if the nightly job hasn't run yet"""
+    if not os.path.exists(path):
+        return None
+    return pd.read_pickle(path)
+
+
+if __name__ == "__main__":
+    universe = build_ranked_universe()
+    print(f"Ranked {len(universe)} coins -> {RANKED_UNIVERSE_PATH}")
@@ -0,0 +1,95 @@
+import re
+import math
+
+import numpy as np
+
+# Headline lexicon on a -3..+3 scale; inflections are found by stripping common suffixes
+FINANCE_LEXICON = {
+    # Positive
+    "surge": 2.0, "soar": 2.5, "rally": 2.0, "jump": 1.5, "gain": 1.5, "rise": 1.0, "rose": 1.0,
+    "climb": 1.5, "rebound": 1.5, "recover": 1.5, "recovery": 1.5, "boost": 1.5, "bullish": 2.0,
+    "optimism": 1.5, "optimistic": 1.5, "beat": 1.5, "upgrade": 1.5, "approve": 2.0, "approval": 2.0,
+    "inflow": 1.5, "adoption": 1.5, "adopt": 1.0, "partnership": 1.0, "breakthrough": 2.0, "profit": 1.5,
+    "growth": 1.5, "strong": 1.0, "strength": 1.0, "outperform": 2.0, "upbeat": 1.5, "milestone": 1.5,
+    "expand": 1.0, "win": 1.5, "success": 1.5, "positive": 1.0, "confidence": 1.0, "easing": 1.0,
+    "alltimehigh": 2.5, "recordhigh": 2.0,
+    # Negative
+    "crash": -3.0, "plunge": -2.5, "tumble": -2.0, "slump": -2.0, "drop": -1.5, "fall": -1.5, "fell": -1.5,
+    "decline": -1.5, "slide": -1.5, "sink": -2.0, "sank": -2.0, "dip": -1.0, "loss": -2.0, "lose": -1.5,
+    "bearish": -2.0, "fear": -2.0, "panic": -2.5, "hack": -3.0, "exploit": -2.5, "scam": -3.0, "fraud": -3.0,
+    "lawsuit": -2.0, "sue": -2.0, "ban": -2.0, "crackdown": -2.0, "probe": -1.5, "investigation": -1.5,
+    "fined": -2.0, "penalty": -1.5, "bankruptcy": -3.0, "bankrupt": -3.0, "default": -2.0, "collapse": -3.0,
+    "outflow": -1.5, "liquidation": -2.0, "liquidate": -2.0, "selloff": -2.0, "downgrade": -2.0,
+    "recession": -2.5, "inflation": -1.0, "warn": -1.5, "warning": -1.5, "risk": -1.0, "volatile": -1.0,
+    "uncertainty": -1.5, "concern": -1.0, "worry": -1.5, "weak": -1.5, "miss": -1.5, "delay": -1.0,
+    "reject": -2.0, "rejection": -2.0, "layoff": -2.0, "negative": -1.0, "turmoil": -2.5, "stall": -1.0,
+    "struggle": -1.5,
+}
+PHRASES = {
+    r"all[- ]time highs?": " alltimehigh ",
+    r"record highs?": " recordhigh ",
+    r"sell[- ]offs?": " selloff ",
+}
+NEGATIONS = {"not", "no", "never", "without", "nor", "fails", "failed", "isn't", "aren't", "wasn't", "weren't",
+             "doesn't", "didn't", "don't", "won't", "can't", "couldn't", "hardly"}
+NEGATION_FACTOR = -0.74
+POSITIVE_THRESHOLD = 0.15
+SENTIMENT_EMOJI = {"positive": "🙂", "neutral": "😐", "negative": "🙁"}
+
+
+def sentiment_label(score):
+    """"positive", "negative" or "neutral" for a score in [-1, 1]"""
+    if score is None or math.isnan(score):
+        return "neutral"
+    if score >= POSITIVE_THRESHOLD:
+        return "positive"
+    if score <= -POSITIVE_THRESHOLD:
+        return "negative"
+    return "neutral"
+
+
+class SentimentScorer:
+    """Lexicon-based headline sentiment in [-1, 1], cheap enough to run on every new article.
+
+    Word scores are summed, flipped (and damped) when one of the previous
+    `negation_window` words negates them, and squashed with s / sqrt(s^2 + alpha)
+    as in VADER, so a couple of strong words already give a clear score.
+    """
+
+    def __init__(self, lexicon=FINANCE_LEXICON, negation_window=3, alpha=15.0):
+        self.lexicon = lexicon
+        self.negation_window = negation_window
+        self.alpha = alpha
+        self._phrases = [(re.compile(pattern), replacement) for pattern, replacement in PHRASES.items()]
+
+    def _lookup(self, word):
+        candidates = [word]
+        if word.endswith("ies") or word.endswith("ied"):
+            candidates.append(word[:-3] + "y")
+        if word.endswith("ing"):
+            candidates += [word[:-3], word[:-3] + "e"]
+        if word.endswith("es") or word.endswith("ed"):
+            candidates.append(word[:-2])
+        if word.endswith("s") or word.endswith("d"):
+            candidates.append(word[:-1])
+        for candidate in candidates:
+            if candidate in self.lexicon:
+                return self.lexicon[candidate]
+        return 0.0
+
+    def score(self, text):
+        text = (text or "").lower().replace("’", "'")
+        for pattern, replacement in self._phrases:
+            text = pattern.sub(replacement, text)
+        words = re.findall(r"[a-z]+(?:'[a-z]+)?", text)
+        total = 0.0
+        for i, word in enumerate(words):
+            value = self._lookup(word)
+            if value and any(w in NEGATIONS for w in words[max(0, i - self.negation_window):i]):
+                value *= NEGATION_FACTOR
+            total += value
+        return total / math.sqrt(total * total + self.alpha) if total else 0.0
+
+    def score_batch(self, texts):
+        """Scores for many texts as a float array"""
+        return np.fromiter((self.score(text) for text in texts), dtype=np.float64, count=len(texts))
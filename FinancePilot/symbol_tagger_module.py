@@ -0,0 +1,164 @@
+import re
+import threading
+from collections import deque
+
+from scoring_module import load_ranked_universe
+
+# (CoinGecko id, tickers matched only in upper case, names and aliases matched in any case).
+# Tickers and names that are everyday words (DOT, "ripple", "stellar", "optimism") are left out.
+COIN_REGISTRY = [
+    ("bitcoin", ["BTC", "XBT"], ["bitcoin"]),
+    ("ethereum", ["ETH"], ["ethereum", "ether"]),
+    ("tether", ["USDT"], ["tether"]),
+    ("binancecoin", ["BNB"], ["binance coin"]),
+    ("solana", ["SOL"], ["solana"]),
+    ("ripple", ["XRP"], ["ripple labs"]),
+    ("usd-coin", ["USDC"], ["usd coin"]),
+    ("dogecoin", ["DOGE"], ["dogecoin"]),
+    ("cardano", ["ADA"], ["cardano"]),
+    ("tron", ["TRX"], ["tron"]),
+    ("the-open-network", ["TON"], ["toncoin"]),
+    ("avalanche-2", ["AVAX"], ["avalanche"]),
+    ("shiba-inu", ["SHIB"], ["shiba inu"]),
+    ("chainlink", ["LINK"], ["chainlink"]),
+    ("polkadot", [], ["polkadot"]),
+    ("bitcoin-cash", ["BCH"], ["bitcoin cash"]),
+    ("litecoin", ["LTC"], ["litecoin"]),
+    ("matic-network", ["MATIC", "POL"], ["polygon"]),
+    ("uniswap", ["UNI"], ["uniswap"]),
+    ("cosmos", ["ATOM"], ["cosmos hub"]),
+    ("stellar", ["XLM"], []),
+    ("monero", ["XMR"], ["monero"]),
+    ("near", ["NEAR"], ["near protocol"]),
+    ("aptos", ["APT"], ["aptos"]),
+    ("sui", ["SUI"], ["sui network"]),
+    ("arbitrum", ["ARB"], ["arbitrum"]),
+    ("pepe", ["PEPE"], ["pepecoin"]),
+]
+QUOTE_SUFFIX = re.compile(r"(USDT|USDC|BUSD|FDUSD|USD)$")
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+class AhoCorasick:
+    """Finds every occurrence of many patterns in a single pass over the text"""
+
+    def __init__(self, patterns):
+        """`patterns` is an iterable of (pattern, value); a pattern may carry several values"""
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]  # state -> [(pattern length, value)] ending there
+        for pattern, value in patterns:
+            state = 0
+            for char in pattern:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._output[state].append((len(pattern), value))
+
+        # Breadth-first: a state's failure link is the longest proper suffix that is also a prefix
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def iter_matches(self, text):
+        """Yield (start, end, value) for every match, ordered by end position"""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, value in output[state]:
+                yield i + 1 - length, i + 1, value
+
+
+class SymbolTagger:
+    """Tags text with the coins it mentions, matching the whole registry in one pass"""
+
+    def __init__(self, registry=COIN_REGISTRY):
+        self._tickers = {}
+        patterns = []
+        for coin_id, tickers, names in registry:
+            self._tickers.setdefault(coin_id, tickers[0] if tickers else coin_id.upper())
+            patterns.extend((ticker.lower(), (coin_id, True)) for ticker in tickers)
+            patterns.extend((name.lower(), (coin_id, False)) for name in names)
+        self._by_ticker = {ticker: coin_id for coin_id, tickers, _ in registry for ticker in tickers}
+        self._automaton = AhoCorasick(patterns)
+
+    def tag(self, text):
+        """Coin ids mentioned in `text`, in order of first mention"""
+        text = text or ""
+        # ASCII-only lowering keeps offsets aligned with the original text
+        lowered = text.translate(_ASCII_LOWER)
+        matches = []
+        for start, end, (coin_id, is_ticker) in self._automaton.iter_matches(lowered):
+            if (start and text[start - 1].isalnum()) or (end < len(text) and text[end].isalnum()):
+                continue  # Part of a longer word
+            if is_ticker and not text[start:end].isupper():
+                continue
+            matches.append((start, -end, coin_id))
+        # The longest match wins: "Bitcoin Cash" is not also a mention of Bitcoin
+        coins = []
+        covered_until = 0
+        for start, negative_end, coin_id in sorted(matches):
+            if -negative_end <= covered_until:
+                continue
+            covered_until = -negative_end
+            if coin_id not in coins:
+                coins.append(coin_id)
+        return coins
+
+    def ticker(self, coin_id):
+        return self._tickers.get(coin_id, coin_id.upper())
+
+    def coin_for_symbol(self, symbol):
+        """CoinGecko id for a trading pair (BTCUSDT), ticker (BTC) or coin id; None if unknown"""
+        symbol = (symbol or "").strip()
+        if symbol.lower() in self._tickers:
+            return symbol.lower()
+        ticker = re.sub(r"[^A-Z0-9]", "", symbol.upper())
+        return self._by_ticker.get(ticker) or self._by_ticker.get(QUOTE_SUFFIX.sub("", ticker))
+
+
+def registry_with_universe(universe, top=100):
+    """COIN_REGISTRY extended with the top coins of the ranked universe.
+
+    Only their tickers (3+ letters) and multi-word names are added: single-word
+    coin names are too often ordinary words.
+    """
+    registry = list(COIN_REGISTRY)
+    known = {coin_id for coin_id, _, _ in registry}
+    if universe is None or universe.empty:
+        return registry
+    for row in universe.sort_values("mcap", ascending=False).head(top).itertuples():
+        if row.coin_id in known:
+            continue
+        ticker = str(row.symbol).upper()
+        tickers = [ticker] if len(ticker) >= 3 and ticker.isalnum() else []
+        names = [row.name] if len(str(row.name).split()) > 1 else []
+        if tickers or names:
+            registry.append((row.coin_id, tickers, names))
+    return registry
+
+
+_default_tagger = None
+_default_lock = threading.Lock()
+
+
+def get_symbol_tagger():
+    """Shared tagger over the registry plus the nightly ranked universe, when available"""
+    global _default_tagger
+    with _default_lock:
+        if _default_tagger is None:
+            _default_tagger = SymbolTagger(registry_with_universe(load_ranked_universe()))
+        return _default_tagger
@@ -0,0 +1,188 @@
+import io
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from price_history_module import DATA_DIR
+
+try:
+    from PIL import Image  # Installed with Streamlit
+except ImportError:
+    Image = None
+
+THUMBNAIL_DIR = os.path.join(DATA_DIR, "thumbnails")
+THUMBNAIL_BUDGET_BYTES = int(float(os.getenv("NUNNO_THUMBNAIL_MB", "64")) * 1024 * 1024)
+THUMBNAIL_SIZE = (400, 400)
+MAX_SOURCE_BYTES = 8 * 1024 * 1024  # Larger publisher images are not downloaded at all
+RETRY_FAILED_SECONDS = 3600
+
+
+class ThumbnailCache:
+    """Downscaled news images on local disk, evicted least recently used by total bytes.
+
+    `prefetch` downloads images in parallel in the background (the news feed calls
+    it at ingest); `path` returns the local thumbnail to render, or None while it is
+    not there yet. File access times are not trusted for recency: the LRU order is
+    kept in memory and rebuilt from modification times, which `path` refreshes.
+    """
+
+    def __init__(self, directory=THUMBNAIL_DIR, max_bytes=THUMBNAIL_BUDGET_BYTES, size=THUMBNAIL_SIZE,
+                 max_workers=8, timeout=10):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = size
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.downloads = 0
+        self.downloaded_bytes = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # file name -> size in bytes, least recently used first
+        self._bytes = 0
+        self._pending = set()
+        self._failed = {}  # url -> time of the last failed download
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nunno-thumb")
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._bytes += size
+        self._evict()
+
+    @staticmethod
+    def _name(url):
+        return hashlib.sha1(url.encode()).hexdigest() + ".jpg"
+
+    def path(self, url):
+        """Local thumbnail file for an image URL, or None when it is not cached"""
+        if not url:
+            return None
+        name = self._name(url)
+        with self._lock:
+            if name not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(name)
+            self.hits += 1
+        path = os.path.join(self.directory, name)
+        try:
+            os.utime(path)  # Keeps the recency order across restarts
+        except OSError:
+            with self._lock:
+                self._bytes -= self._entries.pop(name, 0)
+            return None
+        return path
+
+    def prefetch(self, urls):
+        """Start background downloads for the image URLs that are not cached yet; returns their futures"""
+        now = time.time()
+        futures = []
+        with self._lock:
+            for url in dict.fromkeys(u for u in urls if u):
+                name = self._name(url)
+                if name in self._entries or url in self._pending \
+                        or now - self._failed.get(url, 0) < RETRY_FAILED_SECONDS:
+                    continue
+                self._pending.add(url)
+                futures.append(self._executor.submit(self._fetch, url))
+        return futures
+
+    def _fetch(self, url):
+        try:
+            data = self._download(url)
+            thumbnail = self._downscale(data)
+            if thumbnail is None:
+                raise ValueError("image could not be downscaled")
+            self._store(self._name(url), thumbnail)
+        except (requests.exceptions.RequestException, ValueError, OSError):
+            with self._lock:
+                self._failed[url] = time.time()
+        finally:
+            with self._lock:
+                self._pending.discard(url)
+
+    def _download(self, url):
+        with requests.get(url, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            chunks, total = [], 0
+            for chunk in response.iter_content(64 * 1024):
+                total += len(chunk)
+                if total > MAX_SOURCE_BYTES:
+                    raise ValueError("image too large")
+                chunks.append(chunk)
+        with self._lock:
+            self.downloads += 1
+            self.downloaded_bytes += total
+        return b"".join(chunks)
+
+    def _downscale(self, data):
+        """JPEG bytes no larger than `size`; without Pillow, small originals are kept as they are"""
+        if Image is None:
+            return data if len(data) <= 256 * 1024 else None
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image.thumbnail(self.size)
+                out = io.BytesIO()
+                image.convert("RGB").save(out, format="JPEG", quality=80, optimize=True)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            return None
+        return out.getvalue()
+
+    def _store(self, name, data):
+        path = os.path.join(self.directory, name)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._bytes += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            self._evict()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            name, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "thumbnails": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "pending": len(self._pending),
+                "downloads": self.downloads,
+                "downloaded_bytes": self.downloaded_bytes,
+            }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_thumbnail_cache():
+    """Shared process-wide thumbnail cache"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ThumbnailCache()
+        return _default_cache
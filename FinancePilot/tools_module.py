@@ -0,0 +1,225 @@
+import re
+import json
+import math
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+
+from market_data_module import NEWS_QUERIES, get_market_data
+from scoring_module import get_scoring_pipeline
+
+INTERVALS = ["1m", "5m", "15m", "30m", "1h", "4h", "1d"]
+MAX_TOOL_ROUNDS = 3
+# Provider errors meaning the model cannot call tools at all (as opposed to rate limits or outages)
+TOOLS_UNSUPPORTED = re.compile(
+    r"\b(tools?|tool[ _]?(use|calls?|calling)|function[ _]?call(s|ing)?)\b.{0,40}\b(not|un)[ -]?supported"
+    r"|\bsupports?\b.{0,20}\btool",
+    re.IGNORECASE,
+)
+
+logger = logging.getLogger(__name__)
+
+TOOL_SPECS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "get_trading_analysis",
+            "description": "Live technical analysis of a crypto pair: overall signal, confluence counts, "
+                           "support/resistance and key indicators.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "symbol": {"type": "string", "description": "Binance USDT pair, e.g. BTCUSDT or ETHUSDT"},
+                    "interval": {"type": "string", "enum": INTERVALS, "description": "Candle timeframe, default 15m"},
+                },
+                "required": ["symbol"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_tokenomics",
+            "description": "Tokenomics of a coin: price, market cap, supply, FDV/market cap, historical "
+                           "return and volatility, recommendation and risk flags.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "coin_id": {"type": "string", "description": "CoinGecko coin id, e.g. bitcoin, ethereum, solana"},
+                },
+                "required": ["coin_id"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_market_news",
+            "description": "Today's headlines from major financial or crypto news sources.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "topic": {"type": "string", "enum": list(NEWS_QUERIES), "description": "Which news feed"},
+                    "query": {"type": "string", "description": "Optional keyword the headline must mention"},
+                    "limit": {"type": "integer", "description": "Number of headlines, default 5"},
+                },
+                "required": ["topic"],
+            },
+        },
+    },
+]
+
+
+def _num(value, digits=4):
+    """Round to significant digits for the prompt; None for missing values"""
+    if value is None:
+        return None
+    value = float(value)
+    if math.isnan(value) or math.isinf(value):
+        return None
+    return float(f"{value:.{digits}g}")
+
+
+def summarize_token(metrics):
+    """Compact tokenomics metrics plus the Tokenomics page's score and risk flags"""
+    scored = get_scoring_pipeline().run(pd.DataFrame([metrics])).iloc[0]
+    flags = [name for name in ["high_fdv_ratio", "low_circulation", "high_volatility"] if scored[f"flag_{name}"]]
+    return {
+        "coin": metrics["name"],
+        "symbol": metrics["symbol"],
+        "price": _num(metrics["price"], 6),
+        "market_cap": _num(metrics["mcap"], 3),
+        "fdv_mcap_ratio": _num(metrics["fdv_mcap_ratio"], 3),
+        "circulating_pct": _num(metrics["circ_percent"], 3),
+        "annual_return": _num(metrics["cagr"], 3),
+        "annual_volatility": _num(metrics["volatility"], 3),
+        "conservative_return": _num(metrics["conservative_cagr"], 3),
+        "recommendation": scored["recommendation"],
+        "score": int(scored["recommendation_score"]),
+        "risk_flags": flags,
+    }
+
+
+def summarize_news(articles, query=None, limit=5):
+    if query:
+        needle = query.lower()
+        articles = [a for a in articles
+                    if needle in f"{a.get('title') or ''} {a.get('description') or ''}".lower()]
+    return [
+        {
+            "title": a.get("title"),
+            "source": (a.get("source") or {}).get("name"),
+            "published": (a.get("publishedAt") or "")[:16],
+        }
+        for a in articles[:limit]
+    ]
+
+
+def _normalize_symbol(symbol):
+    symbol = re.sub(r"[^A-Z0-9]", "", symbol.upper())
+    return symbol if re.search(r"(USDT|USDC|BUSD|FDUSD)$", symbol) else symbol + "USDT"
+
+
+class ToolExecutor:
+    """Runs the tools the model asks for, in parallel, against the shared market data caches"""
+
+    def __init__(self, market_data=None, max_workers=4, analysis_verbosity=1):
+        self.market_data = market_data or get_market_data()
+        self.analysis_verbosity = analysis_verbosity  # See TradingAnalyzer.compact_analysis
+        self.tools_enabled = True  # Switched off if the model's provider rejects tool calling
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nunno-tool")
+        self._handlers = {
+            "get_trading_analysis": self._trading_analysis,
+            "get_tokenomics": self._tokenomics,
+            "get_market_news": self._market_news,
+        }
+
+    def _trading_analysis(self, symbol, interval="15m"):
+        if interval not in INTERVALS:
+            interval = "15m"
+        analysis = self.market_data.analysis(_normalize_symbol(symbol), interval)
+        return self.market_data.analyzer.compact_analysis(analysis, self.analysis_verbosity)
+
+    def _tokenomics(self, coin_id):
+        return summarize_token(self.market_data.token_metrics(coin_id))
+
+    def _market_news(self, topic="market", query=None, limit=5):
+        if topic not in NEWS_QUERIES:
+            return {"error": f"Unknown topic {topic!r}"}
+        limit = max(1, min(int(limit), 10))
+        return {"topic": topic, "articles": summarize_news(self.market_data.news(topic), query, limit)}
+
+    def call(self, name, arguments):
+        """Run one tool, returning compact text or a dict; failures come back as {"error": ...}"""
+        handler = self._handlers.get(name)
+        if handler is None:
+            return {"error": f"Unknown tool {name!r}"}
+        try:
+            args = json.loads(arguments) if isinstance(arguments, str) and arguments.strip() else (arguments or {})
+            return handler(**args)
+        except (ValueError, TypeError) as e:
+            return {"error": f"Invalid arguments: {e}"}
+        except requests.exceptions.RequestException as e:
+            return {"error": f"Data source unavailable: {e}"}
+        except KeyError as e:
+            return {"error": f"Unexpected data format: missing {e}"}
+        except Exception as e:
+            # A broken tool must not end the reply; the model is told and answers without it
+            logger.exception("Tool %s failed", name)
+            return {"error": f"Tool failed: {e}"}
+
+    def run(self, tool_calls):
+        """Execute tool calls concurrently; returns the "tool" messages in call order"""
+        results = self._executor.map(
+            lambda call: self.call(call["function"]["name"], call["function"]["arguments"]), tool_calls
+        )
+        return [
+            {
+                "role": "tool",
+                "tool_call_id": call["id"],
+                "content": result if isinstance(result, str) else json.dumps(result, separators=(",", ":")),
+            }
+            for call, result in zip(tool_calls, results)
+        ]
+
+
+def stream_with_tools(client, executor, messages_list, cancel_event=None, tool_log=None,
+                      max_rounds=MAX_TOOL_ROUNDS):
+    """Stream a reply, running any tools the model calls and streaming its follow-up.
+
+    Tool requests and results only live for this turn; the caller stores the final
+    text. Names and arguments of executed tools are appended to `tool_log`.
+    """
+    messages = list(messages_list)
+    for round_number in range(max_rounds):
+        # The last round offers no tools so the model has to answer
+        offer_tools = executor.tools_enabled and round_number < max_rounds - 1
+        tool_calls = []
+        parts = []
+        for chunk in client.stream(messages, cancel_event, tools=TOOL_SPECS if offer_tools else None,
+                                   tool_calls=tool_calls):
+            if offer_tools and not parts and chunk.startswith("[Error]") and round_number == 0:
+                # Retry this request without tools. Only an error saying the model has no tool
+                # support turns them off for every session; rate limits and outages do not.
+                fallback = client.stream(messages, cancel_event)
+                first = next(fallback, "")
+                if TOOLS_UNSUPPORTED.search(chunk) and not first.startswith("[Error]"):
+                    executor.tools_enabled = False
+                yield first
+                yield from fallback
+                return
+            parts.append(chunk)
+            yield chunk
+
+        tool_calls = [call for call in tool_calls if call["function"]["name"]]
+        for i, call in enumerate(tool_calls):
+            call["id"] = call["id"] or f"call_{round_number}_{i}"
+        if not tool_calls or (cancel_event is not None and cancel_event.is_set()):
+            return
+        if tool_log is not None:
+            tool_log.extend({"name": c["function"]["name"], "arguments": c["function"]["arguments"]}
+                            for c in tool_calls)
+        messages.append({"role": "assistant", "content": "".join(parts) or None, "tool_calls": tool_calls})
+        messages.extend(executor.run(tool_calls))